@@ -1,11 +1,69 @@
 import json
 import math
+import os
+import time
+from collections import Counter, deque
 import numpy as np
 from haversine import haversine
 from ortools.constraint_solver import pywrapcp, routing_enums_pb2
+from . import fleet, heuristics, merging, plan_edits, road_network, spatial
 
 EARTH_RADIUS_KM = 6371.0
 
+# Default search time budget, scaled with the number of employees
+SECONDS_PER_EMPLOYEE = 0.05
+MIN_TIME_LIMIT_SECONDS = 1.0
+MAX_TIME_LIMIT_SECONDS = 30.0
+
+# Stop early once the best objective improved by no more than this fraction
+# over the last STAGNATION_WINDOW solutions
+STAGNATION_WINDOW = int(os.getenv("SOLVER_STAGNATION_WINDOW", "50"))
+STAGNATION_TOLERANCE = float(os.getenv("SOLVER_STAGNATION_TOLERANCE", "0.001"))
+
+# Matrix rows computed at a time; bounds the float64 temporaries to
+# MATRIX_BLOCK_ROWS x N instead of N x N
+MATRIX_BLOCK_ROWS = int(os.getenv("MATRIX_BLOCK_ROWS", "128"))
+
+# Shifts solved as one model with more employees than this only search arcs
+# to each employee's nearest neighbours and the HQ; 0 searches every arc
+SPARSE_GRAPH_THRESHOLD = int(os.getenv("SPARSE_GRAPH_THRESHOLD", "1000"))
+# Nearest neighbours each employee keeps arcs to in the sparse graph
+SPARSE_GRAPH_NEIGHBOURS = int(os.getenv("SPARSE_GRAPH_NEIGHBOURS", "20"))
+
+# Minimum seconds between improving solutions reported while the search runs
+PROGRESS_INTERVAL_SECONDS = float(os.getenv("SOLVER_PROGRESS_INTERVAL_SECONDS", "0.2"))
+
+# Named search configurations: first-solution strategy and metaheuristic by
+# their OR-Tools enum names, and the guided local search penalty factor
+SOLVER_STRATEGIES = {
+    "cheapest_arc_gls": {
+        "first_solution": "PATH_CHEAPEST_ARC",
+        "metaheuristic": "GUIDED_LOCAL_SEARCH",
+        "gls_lambda": 0.5,
+    },
+    "savings_gls": {
+        "first_solution": "SAVINGS",
+        "metaheuristic": "GUIDED_LOCAL_SEARCH",
+        "gls_lambda": 0.5,
+    },
+    "insertion_gls": {
+        "first_solution": "PARALLEL_CHEAPEST_INSERTION",
+        "metaheuristic": "GUIDED_LOCAL_SEARCH",
+        "gls_lambda": 0.2,
+    },
+    "cheapest_arc_tabu": {
+        "first_solution": "PATH_CHEAPEST_ARC",
+        "metaheuristic": "TABU_SEARCH",
+        "gls_lambda": 0.5,
+    },
+    "christofides_annealing": {
+        "first_solution": "CHRISTOFIDES",
+        "metaheuristic": "SIMULATED_ANNEALING",
+        "gls_lambda": 0.5,
+    },
+}
+DEFAULT_STRATEGY = "cheapest_arc_gls"
+
 def calculate_bearing(pointA, pointB):
     """
     Calculates the bearing from pointA to pointB with enhanced precision.
@@ -30,49 +88,401 @@ def calculate_bearing(pointA, pointB):
 
     return compass_bearing
 
-def calculate_distance_and_bearing_matrix(locations):
-    coords = np.radians(np.array(locations))  # shape (N, 2)
-    lat = coords[:, 0]
-    lon = coords[:, 1]
+def calculate_bearings_from(origin, points):
+    """
+    Vectorized bearing from one origin to many points.
 
-    # Precompute sines & cosines
-    sin_lat = np.sin(lat)
-    cos_lat = np.cos(lat)
-
-    # Create broadcastable grids
-    lat1 = lat[:, np.newaxis]
-    lon1 = lon[:, np.newaxis]
-    lat2 = lat[np.newaxis, :]
-    lon2 = lon[np.newaxis, :]
-    sin_lat1 = sin_lat[:, np.newaxis]
-    cos_lat1 = cos_lat[:, np.newaxis]
-    sin_lat2 = sin_lat[np.newaxis, :]
-    cos_lat2 = cos_lat[np.newaxis, :]
-
-    # Compute differences
-    dlat = lat2 - lat1
+    Args:
+        origin (List[float]): [latitude, longitude] of the origin.
+        points (array-like): M x 2 array of [latitude, longitude] pairs.
+
+    Returns:
+        np.ndarray: Bearings in degrees in [0, 360), shape (M,).
+    """
+    lat1, lon1 = np.radians(origin[0]), np.radians(origin[1])
+    coords = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+    lat2, lon2 = coords[:, 0], coords[:, 1]
     dlon = lon2 - lon1
 
-    # Haversine distance
+    x = np.sin(dlon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return (np.degrees(np.arctan2(x, y)) + 360.0) % 360.0
+
+def project_to_plane(locations, origin=None):
+    """
+    Projects [latitude, longitude] pairs onto a local equirectangular plane.
+
+    Accurate to well under a percent over a city, which is all spatial
+    grouping needs.
+
+    Args:
+        locations (array-like): N x 2 array of [latitude, longitude] pairs.
+        origin (List[float], optional): Projection origin; defaults to the first location.
+
+    Returns:
+        np.ndarray: N x 2 array of (x, y) coordinates in kilometres.
+    """
+    coords = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+    if origin is None:
+        origin = coords[0]
+    lat0 = np.radians(origin[0])
+    y = np.radians(coords[:, 0] - origin[0]) * EARTH_RADIUS_KM
+    x = np.radians(coords[:, 1] - origin[1]) * EARTH_RADIUS_KM * np.cos(lat0)
+    return np.column_stack((x, y))
+
+def _haversine_distance(lat1, lon1, lat2, lon2):
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
     a = (np.sin(dlat / 2)**2
-         + cos_lat1 * cos_lat2 * np.sin(dlon / 2)**2)
+         + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2)**2)
     c = 2.0 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
-    distance_matrix = EARTH_RADIUS_KM * c
+    return EARTH_RADIUS_KM * c
 
-    # Bearing
+def _initial_bearing(lat1, lon1, lat2, lon2):
+    dlon = lon2 - lon1
+    cos_lat2 = np.cos(lat2)
     x = np.sin(dlon) * cos_lat2
-    y = (cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * np.cos(dlon))
-    initial_bearing = np.arctan2(x, y)
-    initial_bearing_deg = np.degrees(initial_bearing)
-    bearing_matrix = (initial_bearing_deg + 360.0) % 360.0
+    y = (np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * cos_lat2 * np.cos(dlon))
+    return (np.degrees(np.arctan2(x, y)) + 360.0) % 360.0
+
+def calculate_distance_and_bearing_pairs(from_locations, to_locations):
+    """
+    Haversine distances and initial bearings between pairs of locations.
+
+    The inputs broadcast against each other like NumPy arrays, so the same
+    math serves a block of matrix rows or a list of arcs.
+
+    Args:
+        from_locations (array-like): ... x 2 array of departure [lat, lon] pairs.
+        to_locations (array-like): ... x 2 array of arrival [lat, lon] pairs.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Distances in kilometres and bearings
+        in degrees, in the broadcast shape of the inputs.
+    """
+    origin = np.radians(np.asarray(from_locations, dtype=np.float64))
+    target = np.radians(np.asarray(to_locations, dtype=np.float64))
+    lat1, lon1 = origin[..., 0], origin[..., 1]
+    lat2, lon2 = target[..., 0], target[..., 1]
+    return (_haversine_distance(lat1, lon1, lat2, lon2),
+            _initial_bearing(lat1, lon1, lat2, lon2))
+
+def travel_distance_and_bearing_pairs(from_locations, to_locations):
+    """
+    Travel distances and initial bearings between pairs of locations.
+
+    Distances follow the road network when one is loaded (see
+    road_network.get_network()) and are haversine otherwise. Bearings stay
+    straight-line, as the turn penalty of the arc costs is based on them.
+
+    Args:
+        from_locations (array-like): ... x 2 array of departure [lat, lon] pairs.
+        to_locations (array-like): ... x 2 array of arrival [lat, lon] pairs.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Distances in kilometres and bearings
+        in degrees, in the broadcast shape of the inputs.
+    """
+    distance, bearing = calculate_distance_and_bearing_pairs(from_locations, to_locations)
+    network = road_network.get_network()
+    if network is not None:
+        distance = network.distances(from_locations, to_locations)
+    return distance, bearing
+
+def calculate_distance_and_bearing_matrix(locations, block_rows=MATRIX_BLOCK_ROWS):
+    """
+    Computes the N x N distance and bearing matrices.
+
+    Rows are computed in blocks so float64 temporaries stay at block size,
+    distances are computed for the upper triangle only and mirrored, and the
+    results are stored as float32. With a road network loaded, distances
+    are shortest road paths instead, which need not be symmetric.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        block_rows (int): Rows computed at a time.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: float32 distances in kilometres and
+        bearings in degrees; both have a zero diagonal.
+    """
+    coords = np.radians(np.asarray(locations, dtype=np.float64).reshape(-1, 2))
+    lat = coords[:, 0]
+    lon = coords[:, 1]
+    num_locations = len(coords)
+    distance_matrix = np.empty((num_locations, num_locations), dtype=np.float32)
+    bearing_matrix = np.empty((num_locations, num_locations), dtype=np.float32)
+
+    for start in range(0, num_locations, block_rows):
+        stop = min(start + block_rows, num_locations)
+        lat1 = lat[start:stop, np.newaxis]
+        lon1 = lon[start:stop, np.newaxis]
+
+        # The distance matrix is symmetric: fill the block's row and column
+        distance = _haversine_distance(lat1, lon1, lat[start:], lon[start:])
+        distance_matrix[start:stop, start:] = distance
+        distance_matrix[start:, start:stop] = distance.T
+
+        bearing_matrix[start:stop] = _initial_bearing(lat1, lon1, lat, lon)
+
+    network = road_network.get_network()
+    if network is not None:
+        points = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+        for start in range(0, num_locations, block_rows):
+            distance_matrix[start:start + block_rows] = network.distances(
+                points[start:start + block_rows, np.newaxis], points[np.newaxis, :]
+            )
 
-    # Optionally zero out diagonals
     np.fill_diagonal(distance_matrix, 0.0)
     np.fill_diagonal(bearing_matrix, 0.0)
 
-    return distance_matrix.tolist(), bearing_matrix.tolist()
+    return distance_matrix, bearing_matrix
+
+def calculate_arc_costs(distance, bearing, prev_bearing):
+    """
+    Combined distance/bearing cost of arcs.
+
+    Args:
+        distance (array-like): Arc distances in kilometres.
+        bearing (array-like): Arc bearings in degrees.
+        prev_bearing (array-like): Bearing from the HQ to each arc's departure
+            node (0 for arcs leaving the HQ); broadcasts against the others.
+
+    Returns:
+        np.ndarray: int32 arc costs in the broadcast shape of the inputs.
+    """
+    distance = np.asarray(distance, dtype=np.float64)
+    bearing = np.asarray(bearing, dtype=np.float64)
+
+    # Bearing change in degrees, folded into [0, 180]
+    bearing_change = np.minimum(np.mod(bearing - prev_bearing, 360.0),
+                                np.mod(prev_bearing - bearing, 360.0))
+
+    # Encourage closer stops and discourage very long distances
+    distance_factor = (np.where(distance > 3, 1.2, 1.0)
+                       * np.where(distance > 5, 1.3, 1.0))
+    bearing_penalty = (bearing_change / 180.0) * distance * 0.8
+    # Discourage sharp turns
+    bearing_penalty = np.where(bearing_change > 120, bearing_penalty * 1.5, bearing_penalty)
+
+    base_cost = distance * distance_factor * 1000
+    return (base_cost + bearing_penalty * 800).astype(np.int32)
+
+def build_cost_matrix(distance_matrix, bearing_matrix, block_rows=MATRIX_BLOCK_ROWS):
+    """
+    Builds the combined distance/bearing arc-cost matrix used by the solver.
+
+    The bearing penalty for an arc leaving a non-HQ node is measured against
+    the bearing from the HQ to that node, so every arc cost depends only on
+    its (from, to) pair and the whole matrix can be computed once up front
+    instead of inside a per-arc Python callback.
+
+    Args:
+        distance_matrix (array-like): N x N distances in kilometres.
+        bearing_matrix (array-like): N x N bearings in degrees.
+        block_rows (int): Rows computed at a time.
+
+    Returns:
+        np.ndarray: N x N int32 matrix of arc costs.
+    """
+    distance = np.asarray(distance_matrix, dtype=np.float32)
+    bearing = np.asarray(bearing_matrix, dtype=np.float32)
+
+    # Bearing from the HQ to each departure node (0 for the HQ itself)
+    prev_bearing = bearing[0, :].astype(np.float64)
+    prev_bearing[0] = 0.0
+
+    cost_matrix = np.empty(distance.shape, dtype=np.int32)
+    for start in range(0, len(distance), block_rows):
+        stop = start + block_rows
+        cost_matrix[start:stop] = calculate_arc_costs(
+            distance[start:stop], bearing[start:stop], prev_bearing[start:stop, np.newaxis]
+        )
+    return cost_matrix
+
+def calculate_cost_matrix(locations, block_rows=MATRIX_BLOCK_ROWS, out=None):
+    """
+    Computes the arc-cost matrix straight from coordinates.
+
+    Equivalent to build_cost_matrix(*calculate_distance_and_bearing_matrix(locations))
+    without holding the distance and bearing matrices, so only the int32
+    cost matrix is ever N x N.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        block_rows (int): Rows computed at a time.
+        out (np.ndarray, optional): N x N int32 array to write the costs to.
+
+    Returns:
+        np.ndarray: N x N int32 matrix of arc costs.
+    """
+    costs = PairwiseCosts(locations)
+    num_locations = len(costs)
+    nodes = np.arange(num_locations)
+    cost_matrix = out if out is not None else np.empty((num_locations, num_locations), dtype=np.int32)
+    for start in range(0, num_locations, block_rows):
+        stop = min(start + block_rows, num_locations)
+        cost_matrix[start:stop] = costs[nodes[start:stop, np.newaxis], nodes[np.newaxis, :]]
+    return cost_matrix
+
+def fill_cost_matrix(locations, target, distance_store=None, location_ids=None):
+    """
+    Computes the arc-cost matrix into a shared array.
+
+    Runs in a solver worker and returns nothing, so the N x N matrix is
+    written once in place and never pickled.
+
+    Args:
+        locations (List[List[float]]): HQ first, then pickup [lat, lon] pairs.
+        target (shared_arrays.SharedArray): N x N int32 array to fill.
+        distance_store (distance_store.DistanceStore, optional): Persistent
+            distances and bearings to build the matrix from.
+        location_ids (List[str], optional): Store ID of each location, HQ first.
+    """
+    cost_matrix = _stored_cost_matrix(distance_store, location_ids, locations, out=target.array)
+    if cost_matrix is None:
+        calculate_cost_matrix(locations, out=target.array)
+
+def _stored_cost_matrix(distance_store, location_ids, locations, out=None):
+    if distance_store is None:
+        return None
+    try:
+        return distance_store.cost_matrix(location_ids, locations, out=out)
+    except (OSError, ValueError):
+        # An unusable store only costs the saving; the caller computes the matrix
+        return None
+
+class PairwiseCosts:
+    """
+    Arc costs computed on demand, without building the N x N matrix.
+
+    Indexing with arrays of departure and arrival nodes, as in
+    ``costs[from_nodes, to_nodes]``, gives the same values as the matrix from
+    build_cost_matrix() but only evaluates the requested arcs. Plan edits
+    touch a handful of rows, so this keeps them independent of shift size.
+    """
+
+    def __init__(self, locations):
+        self.coords = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+        # Bearing from the HQ to each node, as row 0 of the bearing matrix
+        _, hq_bearings = calculate_distance_and_bearing_pairs(self.coords[0], self.coords)
+        self.hq_bearings = hq_bearings.astype(np.float32).astype(np.float64)
+        self.hq_bearings[0] = 0.0
+
+    def __len__(self):
+        return len(self.coords)
+
+    def __getitem__(self, key):
+        from_nodes, to_nodes = (np.asarray(nodes) for nodes in key)
+        distance, bearing = travel_distance_and_bearing_pairs(
+            self.coords[from_nodes], self.coords[to_nodes]
+        )
+        # Round like the float32 matrices; their diagonal is zeroed by index
+        same = from_nodes == to_nodes
+        distance = np.where(same, 0.0, distance.astype(np.float32))
+        bearing = np.where(same, 0.0, bearing.astype(np.float32))
+        return calculate_arc_costs(distance, bearing, self.hq_bearings[from_nodes])
+
+def nearest_neighbour_arcs(locations, num_neighbours=SPARSE_GRAPH_NEIGHBOURS, seed_routes=None):
+    """
+    Employees each employee may be followed by in a sparse search.
+
+    Neighbours come from a grid index over projected coordinates. The
+    relation is made symmetric: an outlier that is nobody's nearest
+    neighbour could otherwise only be reached straight from the HQ. The arcs
+    of a seed plan are added so that plan stays feasible.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        num_neighbours (int): Nearest neighbours kept per employee.
+        seed_routes (List[List[int]], optional): Node routes whose arcs are kept.
+
+    Returns:
+        List[np.ndarray]: Employee nodes adjacent to node i at index i - 1.
+    """
+    points = project_to_plane(locations)
+    nearest = spatial.nearest_neighbours(points[1:], num_neighbours) + 1
+
+    employees = np.arange(1, len(locations))
+    seed_arcs = [(a, b) for route in seed_routes or [] for a, b in zip(route[1:], route[2:])]
+    from_nodes = np.concatenate([
+        np.repeat(employees, nearest.shape[1]), [a for a, _ in seed_arcs]
+    ]).astype(np.int64)
+    to_nodes = np.concatenate([nearest.ravel(), [b for _, b in seed_arcs]]).astype(np.int64)
+    # Undirected neighbour pairs, both directions, without duplicates
+    pairs = np.unique(np.concatenate([
+        np.column_stack((from_nodes, to_nodes)), np.column_stack((to_nodes, from_nodes))
+    ]), axis=0)
+    return np.split(pairs[:, 1], np.searchsorted(pairs[:, 0], employees[1:]))
+
+def _transit_matrix(cost_matrix):
+    """
+    Converts a cost matrix to the nested lists RegisterTransitMatrix takes.
+
+    Equal costs share one Python int object, so the lists cost a pointer per
+    arc rather than a fresh int for each of the N x N entries.
+    """
+    if cost_matrix.size == 0 or cost_matrix.max() > 10 * cost_matrix.size:
+        return cost_matrix.tolist()
+    values = np.arange(int(cost_matrix.max()) + 1).astype(object)
+    return [values[row].tolist() for row in cost_matrix]
+
+def calculate_route_cost(routes, cost_matrix):
+    """
+    Computes the solver objective of a set of routes.
+
+    Args:
+        routes (List[List[int]]): Node routes per shuttle, each starting at the HQ.
+        cost_matrix (np.ndarray): Arc costs from build_cost_matrix().
+
+    Returns:
+        int: Total arc cost, including each shuttle's return to the HQ.
+    """
+    total = 0
+    for route in routes:
+        if len(route) > 1:
+            nodes = np.asarray(route + [0])
+            total += int(cost_matrix[nodes[:-1], nodes[1:]].sum())
+    return total
+
+def plan_costs(locations, plans):
+    """
+    Objective of each of several plans, pricing only their arcs.
+
+    With a road network loaded, pricing runs a shortest-path search from
+    every stop, so the API process runs this in a solver worker.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        plans (List[List[List[int]] | None]): Node routes per shuttle of each plan.
+
+    Returns:
+        List[int | None]: Cost of each plan; None where there is no plan.
+    """
+    costs = PairwiseCosts(locations)
+    return [calculate_route_cost(routes, costs) if routes is not None else None
+            for routes in plans]
 
-def assign_employees_to_shuttles(locations, distance_matrix, bearing_matrix, shuttle_capacities):
+def default_time_limit(num_employees):
+    """
+    Derives the search time budget from the problem size.
+
+    Args:
+        num_employees (int): Number of employees to route.
+
+    Returns:
+        float: Time limit in seconds.
+    """
+    return min(MAX_TIME_LIMIT_SECONDS,
+               max(MIN_TIME_LIMIT_SECONDS, SECONDS_PER_EMPLOYEE * num_employees))
+
+def assign_employees_to_shuttles(locations, distance_matrix, bearing_matrix, shuttle_capacities,
+                                 cancel_token=None, time_limit_seconds=None,
+                                 stagnation_window=STAGNATION_WINDOW,
+                                 stagnation_tolerance=STAGNATION_TOLERANCE,
+                                 initial_routes=None, cost_matrix=None, neighbours=None,
+                                 demands=None, on_improvement=None,
+                                 progress_interval=PROGRESS_INTERVAL_SECONDS, strategy=None):
     num_locations = len(locations)
     num_shuttles = len(shuttle_capacities)
 
@@ -82,53 +492,26 @@ def assign_employees_to_shuttles(locations, distance_matrix, bearing_matrix, shu
     # Create the routing model
     routing = pywrapcp.RoutingModel(manager)
 
-    # Define the custom cost callback incorporating distance and bearing change
-    def combined_cost_callback(from_index, to_index):
-        from_node = manager.IndexToNode(from_index)
-        to_node = manager.IndexToNode(to_index)
-        distance = distance_matrix[from_node][to_node]
-        
-        # Enhanced bearing penalty calculation
-        bearing = bearing_matrix[from_node][to_node]
-        prev_bearing = 0
-        
-        if from_node != 0:
-            for i in range(num_locations):
-                if routing.IsStart(manager.NodeToIndex(i)):
-                    prev_bearing = bearing_matrix[i][from_node]
-                    break
-        
-        # Calculate bearing change with improved precision
-        bearing_change = min((bearing - prev_bearing) % 360, 
-                           (prev_bearing - bearing) % 360)
-        
-        # Enhanced penalty factors
-        distance_factor = 1.2 if distance > 3 else 1.0  # Encourage closer stops
-        bearing_penalty = (bearing_change / 180.0) * distance * 0.8
-        
-        # Additional penalties for extreme cases
-        if bearing_change > 120:  # Discourage sharp turns
-            bearing_penalty *= 1.5
-        if distance > 5:  # Discourage very long distances
-            distance_factor *= 1.3
-            
-        # Return combined cost with weighted factors
-        base_cost = distance * distance_factor * 1000
-        total_cost = int(base_cost + bearing_penalty * 800)
-        
-        return total_cost
-
-    combined_transit_callback_index = routing.RegisterTransitCallback(combined_cost_callback)
+    # Register the precomputed cost matrix so arc evaluation stays in C++
+    if cost_matrix is None:
+        cost_matrix = build_cost_matrix(distance_matrix, bearing_matrix)
+    combined_transit_callback_index = routing.RegisterTransitMatrix(_transit_matrix(cost_matrix))
     routing.SetArcCostEvaluatorOfAllVehicles(combined_transit_callback_index)
 
-    # Add capacity constraints
-    demand = [0] + [1] * (num_locations - 1)  # HQ has no demand
+    if neighbours is not None:
+        # An employee is followed by one of its neighbours or the HQ
+        ends = [routing.End(vehicle) for vehicle in range(num_shuttles)]
+        for node in range(1, num_locations):
+            routing.NextVar(manager.NodeToIndex(node)).SetValues(
+                [manager.NodeToIndex(int(neighbour)) for neighbour in neighbours[node - 1]]
+                + ends
+            )
 
-    def demand_callback(from_index):
-        from_node = manager.IndexToNode(from_index)
-        return demand[from_node]
+    # Add capacity constraints
+    # HQ has no demand; a merged pickup node carries its group size
+    demand = [0] + (list(demands) if demands is not None else [1] * (num_locations - 1))
 
-    demand_callback_index = routing.RegisterUnaryTransitCallback(demand_callback)
+    demand_callback_index = routing.RegisterUnaryTransitVector(demand)
     routing.AddDimensionWithVehicleCapacity(
         demand_callback_index,
         0,  # No slack
@@ -138,38 +521,278 @@ def assign_employees_to_shuttles(locations, distance_matrix, bearing_matrix, shu
     )
 
     # Enhanced search parameters
+    strategy = strategy or SOLVER_STRATEGIES[DEFAULT_STRATEGY]
     search_parameters = pywrapcp.DefaultRoutingSearchParameters()
     search_parameters.first_solution_strategy = (
-        routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+        getattr(routing_enums_pb2.FirstSolutionStrategy, strategy["first_solution"])
     )
     search_parameters.local_search_metaheuristic = (
-        routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+        getattr(routing_enums_pb2.LocalSearchMetaheuristic, strategy["metaheuristic"])
     )
-    search_parameters.time_limit.FromSeconds(30)
-    search_parameters.solution_limit = 500  # Keep the 500 limit
-    
+    if time_limit_seconds is None:
+        time_limit_seconds = default_time_limit(num_locations - 1)
+    search_parameters.time_limit.FromMilliseconds(max(1, int(time_limit_seconds * 1000)))
+
     # Add these parameters for better optimization
     search_parameters.log_search = True
     search_parameters.use_full_propagation = True
-    search_parameters.guided_local_search_lambda_coefficient = 0.5
-
-    solution = routing.SolveWithParameters(search_parameters)
+    search_parameters.guided_local_search_lambda_coefficient = strategy["gls_lambda"]
+
+    # Best objective at each of the last stagnation_window solutions
+    best_objectives = deque(maxlen=stagnation_window + 1)
+    # Objective and time of the last solution passed to on_improvement
+    reported = {"objective": None, "at": 0.0}
+
+    def on_solution():
+        # Stop the search as soon as the caller cancels the solve
+        if cancel_token is not None and cancel_token.is_cancelled():
+            routing.CancelSearch()
+            return
+
+        objective = routing.CostVar().Value()
+        best = min(objective, best_objectives[-1]) if best_objectives else objective
+        best_objectives.append(best)
+
+        if on_improvement is not None and objective == best and (
+                reported["objective"] is None or objective < reported["objective"]):
+            now = time.monotonic()
+            if now - reported["at"] >= progress_interval:
+                reported.update(objective=objective, at=now)
+                on_improvement(
+                    _extract_routes(routing, manager, num_shuttles, lambda var: var.Value()),
+                    objective
+                )
+
+        # Stop once the best objective has stagnated over the window
+        if stagnation_window and len(best_objectives) == best_objectives.maxlen:
+            improvement = best_objectives[0] - best
+            if improvement <= stagnation_tolerance * best_objectives[0]:
+                routing.CancelSearch()
+
+    routing.AddAtSolutionCallback(on_solution)
+
+    # Start local search from a previous plan when one is given
+    initial_solution = None
+    if initial_routes is not None:
+        routing.CloseModelWithParameters(search_parameters)
+        initial_solution = routing.ReadAssignmentFromRoutes(
+            [[manager.NodeToIndex(node) for node in route[1:]] for route in initial_routes],
+            True
+        )
+
+    if initial_solution is not None:
+        solution = routing.SolveFromAssignmentWithParameters(initial_solution, search_parameters)
+    else:
+        solution = routing.SolveWithParameters(search_parameters)
 
     # Extract the routes
     if solution:
-        routes = []
-        for vehicle_id in range(num_shuttles):
-            index = routing.Start(vehicle_id)
-            route = []
-            while not routing.IsEnd(index):
-                node = manager.IndexToNode(index)
-                route.append(node)
-                index = solution.Value(routing.NextVar(index))
-            routes.append(route)
-        return routes
+        return _extract_routes(routing, manager, num_shuttles, solution.Value)
     else:
         return None
 
+def _extract_routes(routing, manager, num_shuttles, value):
+    routes = []
+    for vehicle_id in range(num_shuttles):
+        index = routing.Start(vehicle_id)
+        route = []
+        while not routing.IsEnd(index):
+            node = manager.IndexToNode(index)
+            route.append(node)
+            index = value(routing.NextVar(index))
+        routes.append(route)
+    return routes
+
+def solve_shuttle_routes(locations, shuttle_capacities, cancel_token=None,
+                         time_limit_seconds=None, initial_routes=None,
+                         merge_radius_meters=None, demands=None, on_improvement=None,
+                         strategy=None, cost_matrix=None, distance_store=None,
+                         location_ids=None):
+    """
+    Computes the arc costs and solves the shuttle assignment.
+
+    This is the entry point run inside solver worker processes, so it only
+    takes plain picklable arguments. Co-located employees are merged into
+    one pickup node first. Above SPARSE_GRAPH_THRESHOLD employees the search
+    only follows nearest_neighbour_arcs(), starting from the
+    heuristics.fallback_routes() plan, and falls back to all arcs if it finds
+    no solution.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        shuttle_capacities (List[int]): Capacity of each shuttle.
+        cancel_token (CancellationToken, optional): Stops the search when cancelled.
+        time_limit_seconds (float, optional): Search budget; derived from the
+            problem size when omitted.
+        initial_routes (List[List[int]], optional): Partial routes of a previous
+            plan (starting at the HQ); employees missing from them are inserted
+            at their cheapest position before the search starts from the result.
+        merge_radius_meters (float, optional): Radius within which employees
+            share a pickup node; defaults to MERGE_RADIUS_METERS.
+        demands (List[int], optional): Seats taken by node i + 1 when nodes are
+            already shared stops; co-located nodes are then not merged again.
+        on_improvement (Callable[[List[List[int]], int], None], optional):
+            Called with the routes and objective of improving solutions while
+            the search runs, e.g. progress.ProgressBoard.publish.
+        strategy (Dict[str, Any], optional): Search configuration, e.g. a value
+            of SOLVER_STRATEGIES; defaults to DEFAULT_STRATEGY.
+        cost_matrix (shared_arrays.SharedArray | np.ndarray, optional): Arc
+            costs between the model's nodes, as given by merge_model(), e.g.
+            filled by fill_cost_matrix() and read in place instead of being
+            computed again.
+        distance_store (distance_store.DistanceStore, optional): Persistent
+            distances and bearings to build the cost matrix from, so only
+            new or moved locations are computed.
+        location_ids (List[str], optional): Store ID of each location, HQ
+            first; required with distance_store.
+
+    Returns:
+        List[List[int]] | None: Node routes per shuttle, or None if no solution.
+    """
+    groups = None
+    if demands is None:
+        locations, demands, groups = merge_model(locations, shuttle_capacities,
+                                                 merge_radius_meters)
+    if groups is not None:
+        if initial_routes is not None:
+            initial_routes = merging.merge_routes(initial_routes, groups)
+        if on_improvement is not None:
+            report = on_improvement
+
+            def on_improvement(routes, objective):
+                report(merging.expand_routes(routes, groups), objective)
+        if location_ids is not None:
+            location_ids = merging.group_ids(location_ids, groups)
+
+    if cost_matrix is None:
+        cost_matrix = _stored_cost_matrix(distance_store, location_ids, locations)
+
+    routes = _solve_routes(locations, shuttle_capacities, cancel_token,
+                           time_limit_seconds, initial_routes, demands, on_improvement, strategy,
+                           cost_matrix)
+    if groups is None or routes is None:
+        return routes
+    return merging.expand_routes(routes, groups)
+
+def uses_sparse_graph(num_locations):
+    """Whether a model of this many locations, HQ included, only searches nearest-neighbour arcs."""
+    return 0 < SPARSE_GRAPH_THRESHOLD < num_locations - 1
+
+def merge_model(locations, shuttle_capacities, merge_radius_meters=None):
+    """
+    Merges co-located employees into the pickup nodes the solver routes.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        shuttle_capacities (List[int]): Capacity of each shuttle; no group
+            outgrows the largest.
+        merge_radius_meters (float, optional): Defaults to MERGE_RADIUS_METERS.
+
+    Returns:
+        Tuple[List[List[float]], List[int] | None, List[List[int]] | None]: The
+        model's locations, the demand of each pickup node and the employee
+        groups behind them; the locations unchanged and (None, None) when no
+        employees share a pickup node.
+    """
+    if merge_radius_meters is None:
+        merge_radius_meters = merging.MERGE_RADIUS_METERS
+    groups = merging.group_colocated(
+        locations, merge_radius_meters, max(shuttle_capacities, default=0)
+    )
+    if len(groups) == len(locations) - 1:
+        return locations, None, None
+    merged_locations, demands = merging.merge_locations(locations, groups)
+    return merged_locations, demands, groups
+
+def _solve_routes(locations, shuttle_capacities, cancel_token, time_limit_seconds,
+                  initial_routes, demands=None, on_improvement=None, strategy=None,
+                  cost_matrix=None):
+    # A warm start already says which shuttles to use
+    if initial_routes is None:
+        shuttles = fleet.select_shuttles(
+            shuttle_capacities,
+            demands if demands is not None else [1] * (len(locations) - 1)
+        )
+        if len(shuttles) < len(shuttle_capacities):
+            def to_fleet(routes):
+                full_routes = [[0] for _ in shuttle_capacities]
+                for shuttle, route in zip(shuttles, routes):
+                    full_routes[shuttle] = route
+                return full_routes
+
+            report = None
+            if on_improvement is not None:
+                def report(routes, objective):
+                    on_improvement(to_fleet(routes), objective)
+            routes = _solve_fleet(locations, [shuttle_capacities[s] for s in shuttles],
+                                  cancel_token, time_limit_seconds, None, demands, report,
+                                  strategy, cost_matrix)
+            if routes is not None:
+                return to_fleet(routes)
+            if cancel_token is not None and cancel_token.is_cancelled():
+                return None
+            # The pruned fleet can be infeasible; retry with every shuttle
+
+    return _solve_fleet(locations, shuttle_capacities, cancel_token, time_limit_seconds,
+                        initial_routes, demands, on_improvement, strategy, cost_matrix)
+
+def _solve_fleet(locations, shuttle_capacities, cancel_token, time_limit_seconds,
+                 initial_routes, demands=None, on_improvement=None, strategy=None,
+                 cost_matrix=None):
+    # Only a matrix over exactly these nodes can stand in for them
+    if cost_matrix is not None and cost_matrix.shape == (len(locations), len(locations)):
+        cost_matrix = np.asarray(cost_matrix)
+    else:
+        cost_matrix = calculate_cost_matrix(locations)
+
+    if initial_routes is not None:
+        placed = {node for route in initial_routes for node in route[1:]}
+        initial_routes = plan_edits.insert_cheapest(
+            initial_routes,
+            [node for node in range(1, len(locations)) if node not in placed],
+            cost_matrix,
+            shuttle_capacities,
+            demands=demands
+        )
+
+    neighbours = None
+    sparse = uses_sparse_graph(len(locations))
+    if sparse:
+        # Greedy construction easily gets stuck on a sparse graph, so the
+        # search starts from a plan whose arcs are part of the graph
+        if initial_routes is None:
+            initial_routes = heuristics.fallback_routes(locations, shuttle_capacities, demands)
+        neighbours = nearest_neighbour_arcs(locations, seed_routes=initial_routes)
+    routes = assign_employees_to_shuttles(
+        locations,
+        None,
+        None,
+        shuttle_capacities,
+        cancel_token=cancel_token,
+        time_limit_seconds=time_limit_seconds,
+        initial_routes=initial_routes,
+        cost_matrix=cost_matrix,
+        neighbours=neighbours,
+        demands=demands,
+        on_improvement=on_improvement,
+        strategy=strategy
+    )
+    if routes is None and sparse and not (cancel_token and cancel_token.is_cancelled()):
+        # The neighbour graph can cut off every feasible plan; retry on all arcs
+        routes = assign_employees_to_shuttles(
+            locations,
+            None,
+            None,
+            shuttle_capacities,
+            cancel_token=cancel_token,
+            time_limit_seconds=time_limit_seconds,
+            cost_matrix=cost_matrix,
+            demands=demands,
+            on_improvement=on_improvement,
+            strategy=strategy
+        )
+    return routes
+
 def verify_unique_assignments(routes, num_employees):
     """
     Verifies that each employee is uniquely assigned to exactly one shuttle.
@@ -189,7 +812,7 @@ def verify_unique_assignments(routes, num_employees):
         print(f"Shuttle {shuttle_id} assigned employees: {employee_nodes}")
 
     # Check for duplicates
-    duplicates = set([x for x in assigned_employees if assigned_employees.count(x) > 1])
+    duplicates = {x for x, count in Counter(assigned_employees).items() if count > 1}
     if duplicates:
         print(f"Duplicate assignments found for employees: {duplicates}")
         return False
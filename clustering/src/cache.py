@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+# Maximum number of cached plans; 0 disables the cache
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+# Seconds a cached plan stays valid
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "600"))
+# Decimal places coordinates are rounded to in cache keys (5 is about 1 m)
+RESULT_CACHE_PRECISION = int(os.getenv("RESULT_CACHE_PRECISION", "5"))
+
+
+def canonical_key(hq, employees, shuttle_capacities, precision=RESULT_CACHE_PRECISION, **options):
+    """
+    Builds an order-independent cache key for a planning request.
+
+    Args:
+        hq (List[float]): [latitude, longitude] of the HQ.
+        employees (Iterable[Tuple[str, float, float]]): (id, latitude, longitude) triples.
+        shuttle_capacities (List[int]): Capacity of each shuttle; only the
+            multiset of capacities matters.
+        precision (int): Decimal places coordinates are rounded to.
+        **options: Other request settings that change the plan.
+
+    Returns:
+        str: Hex digest identifying the request.
+    """
+    canonical = {
+        "hq": [round(coordinate, precision) for coordinate in hq],
+        "employees": sorted(
+            (employee_id, round(latitude, precision), round(longitude, precision))
+            for employee_id, latitude, longitude in employees
+        ),
+        "capacities": sorted(shuttle_capacities),
+        "options": sorted(options.items()),
+    }
+    payload = json.dumps(canonical, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def assign_cached_routes(cached_routes, shuttles):
+    """
+    Hands cached routes to the request's shuttles by matching capacities.
+
+    Shuttles of equal capacity are interchangeable, so a cached plan can be
+    reused by a request that lists its fleet in another order or under
+    other IDs.
+
+    Args:
+        cached_routes (List[Tuple]): (capacity, employee IDs) per route, optionally
+            followed by a dict of extra route fields such as "stops".
+        shuttles (List[Tuple[str, int]]): (id, capacity) of the request's shuttles.
+
+    Returns:
+        List[Dict[str, Any]]: Routes in the {shuttle_id, employees} response shape.
+    """
+    by_capacity: Dict[int, List[Tuple[List[str], Dict[str, Any]]]] = {}
+    for capacity, employee_ids, *extra in cached_routes:
+        by_capacity.setdefault(capacity, []).append((employee_ids, extra[0] if extra else {}))
+    routes = []
+    for shuttle_id, capacity in shuttles:
+        employee_ids, fields = by_capacity[capacity].pop(0)
+        routes.append(dict(fields, shuttle_id=shuttle_id, employees=list(employee_ids)))
+    return routes
+
+
+class ResultCache:
+    """
+    In-process LRU cache of plans with a time-to-live.
+
+    Bounded by entry count; the least recently used plan is evicted first.
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE, ttl_seconds=RESULT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key) -> Optional[Any]:
+        entry = self._live_entry(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def peek(self, key) -> Optional[Any]:
+        """Looks a plan up for the service itself, without counting a hit or miss."""
+        entry = self._live_entry(key)
+        return entry[1] if entry is not None else None
+
+    def _live_entry(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._entries[key]
+            entry = None
+        return entry
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+class _Call:
+    def __init__(self, future):
+        self.future = future
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work; later callers attach to it and
+    receive the same result or exception. The work is cancelled only when
+    every attached caller has been cancelled.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def __contains__(self, key):
+        return key in self._calls
+
+    def waiters(self, key) -> int:
+        call = self._calls.get(key)
+        return call.waiters if call is not None else 0
+
+    async def do(self, key, func: Callable[[], Awaitable[Any]]):
+        """
+        Runs func() unless a call with the same key is already in flight.
+
+        Args:
+            key (Hashable): Fingerprint of the work, e.g. from canonical_key().
+            func (Callable): Coroutine function doing the work.
+
+        Returns:
+            Any: The shared result.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.future.add_done_callback(lambda _: self._forget(key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.future)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.future.done():
+                # Last caller gone: nobody needs the result any more
+                call.future.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -0,0 +1,44 @@
+import numpy as np
+from .shared_arrays import SharedArray
+
+
+class CancellationToken:
+    """
+    Cancellation flag that can be shared with solver worker processes.
+
+    The flag is a one-byte SharedArray, so a worker checking it from inside
+    the OR-Tools search sees a cancel() from the API process without any IPC
+    round trip.
+    """
+
+    def __init__(self, flag=None):
+        if flag is None:
+            flag = SharedArray((1,), np.uint8)
+            flag.array[0] = 0
+        self._flag = flag
+
+    @property
+    def name(self):
+        return self._flag.name
+
+    def cancel(self):
+        """Sets the flag; solvers checking this token stop their search."""
+        try:
+            self._flag.array[0] = 1
+        except (TypeError, ValueError):
+            # Already released
+            pass
+
+    def is_cancelled(self):
+        try:
+            return self._flag.array[0] == 1
+        except (TypeError, ValueError):
+            # A released token counts as cancelled
+            return True
+
+    def release(self):
+        """Closes the flag's segment, and unlinks it when called by the creating process."""
+        self._flag.release()
+
+    def __reduce__(self):
+        return (CancellationToken, (self._flag,))
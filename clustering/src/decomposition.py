@@ -0,0 +1,312 @@
+import asyncio
+import math
+import os
+import numpy as np
+from . import assign_routes, heuristics, solver_pool
+
+# Shifts with more employees than this are partitioned in "auto" mode
+DECOMPOSITION_THRESHOLD = int(os.getenv("DECOMPOSITION_THRESHOLD", "300"))
+# Target number of employees per independently solved partition
+PARTITION_SIZE = int(os.getenv("DECOMPOSITION_PARTITION_SIZE", "150"))
+
+# Share of a partitioned request's time budget spent solving the partitions;
+# large-neighbourhood search gets what is left
+DECOMPOSITION_SOLVE_SHARE = float(os.getenv("DECOMPOSITION_SOLVE_SHARE", "0.6"))
+
+KMEANS_MAX_ITERATIONS = 20
+
+
+def should_decompose(method, num_employees):
+    """
+    Decides whether a request is solved as independent partitions.
+
+    Args:
+        method (str | None): "auto", "none", "sector" or "kmeans".
+        num_employees (int): Number of employees in the request.
+
+    Returns:
+        bool: True if the shift should be partitioned.
+    """
+    if method in (None, "none"):
+        return False
+    if method == "auto":
+        return num_employees > DECOMPOSITION_THRESHOLD
+    return True
+
+
+def allocate_shuttles(shuttle_capacities, num_partitions):
+    """
+    Splits the fleet into groups of roughly equal total capacity.
+
+    Args:
+        shuttle_capacities (List[int]): Capacity of each shuttle.
+        num_partitions (int): Number of groups to build.
+
+    Returns:
+        List[List[int]]: Shuttle indices of each group.
+    """
+    groups = [[] for _ in range(num_partitions)]
+    totals = [0] * num_partitions
+    # Largest shuttles first, each to the currently smallest group
+    for shuttle in sorted(range(len(shuttle_capacities)),
+                          key=lambda s: -shuttle_capacities[s]):
+        group = totals.index(min(totals))
+        groups[group].append(shuttle)
+        totals[group] += shuttle_capacities[shuttle]
+    return groups
+
+
+def partition_quotas(group_capacities, num_employees):
+    """
+    Shares employees between groups in proportion to their capacity.
+
+    Args:
+        group_capacities (List[int]): Total capacity of each group.
+        num_employees (int): Number of employees to share out.
+
+    Returns:
+        List[int]: Employees per group; never more than the group's capacity.
+    """
+    capacities = np.asarray(group_capacities, dtype=np.float64)
+    shares = num_employees * capacities / capacities.sum()
+    quotas = np.floor(shares).astype(int)
+    # Hand out the remainder by largest fractional share, where there is room
+    for group in np.argsort(quotas - shares, kind="stable"):
+        if quotas.sum() == num_employees:
+            break
+        if quotas[group] < group_capacities[group]:
+            quotas[group] += 1
+    return quotas.tolist()
+
+
+def _partition_plan(shuttle_capacities, num_employees, partition_size):
+    num_partitions = min(len(shuttle_capacities),
+                         max(1, math.ceil(num_employees / partition_size)))
+    groups = allocate_shuttles(shuttle_capacities, num_partitions)
+    quotas = partition_quotas(
+        [sum(shuttle_capacities[s] for s in group) for group in groups],
+        num_employees
+    )
+    return groups, quotas
+
+
+def partition_by_sector(locations, shuttle_capacities, partition_size=PARTITION_SIZE):
+    """
+    Partitions employees into polar sectors around the HQ.
+
+    Employees are ordered by bearing from the HQ, starting after the widest
+    empty sector, and cut into contiguous runs sized to each shuttle group.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        shuttle_capacities (List[int]): Capacity of each shuttle.
+        partition_size (int): Target number of employees per partition.
+
+    Returns:
+        List[Tuple[List[int], List[int]]]: (employee nodes, shuttle indices) per
+        partition, where employee nodes index into locations.
+    """
+    num_employees = len(locations) - 1
+    groups, quotas = _partition_plan(shuttle_capacities, num_employees, partition_size)
+
+    nodes = heuristics.sweep_order(locations)
+    bounds = np.cumsum([0] + quotas)
+    return [
+        (nodes[bounds[i]:bounds[i + 1]].tolist(), groups[i])
+        for i in range(len(groups))
+    ]
+
+
+def capacitated_assignment(distances, quotas):
+    """
+    Assigns points to their nearest cluster without exceeding cluster quotas.
+
+    Works in rounds: every unassigned point proposes to its nearest cluster
+    with room left, and each cluster accepts its closest proposers up to its
+    room. A round either places every point or fills a cluster, so there are
+    at most K rounds of N x K array work.
+
+    Args:
+        distances (np.ndarray): N x K distances from each point to each cluster.
+        quotas (np.ndarray): Points each cluster may take; at least N in total.
+
+    Returns:
+        np.ndarray: Cluster of each point.
+    """
+    num_points, num_clusters = distances.shape
+    labels = np.full(num_points, -1)
+    room = np.asarray(quotas).copy()
+    unassigned = np.arange(num_points)
+    while len(unassigned) and room.any():
+        candidates = np.where(room > 0, distances[unassigned], np.inf)
+        choice = np.argmin(candidates, axis=1)
+        choice_distance = candidates[np.arange(len(unassigned)), choice]
+
+        # Rank proposers within each cluster, closest first
+        order = np.lexsort((choice_distance, choice))
+        chosen = choice[order]
+        first = np.searchsorted(chosen, np.arange(num_clusters))
+        rank = np.arange(len(order)) - first[chosen]
+        accepted = order[rank < room[chosen]]
+
+        labels[unassigned[accepted]] = choice[accepted]
+        room -= np.bincount(choice[accepted], minlength=num_clusters)
+        unassigned = np.delete(unassigned, accepted)
+    return labels
+
+
+def partition_by_kmeans(locations, shuttle_capacities, partition_size=PARTITION_SIZE):
+    """
+    Partitions employees with capacity-constrained k-means.
+
+    Starts from the sector partition and alternates between assigning each
+    employee to the nearest centroid with room left and moving centroids,
+    until assignments settle. CPU-bound; solve_partitioned() runs it in a
+    solver worker.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        shuttle_capacities (List[int]): Capacity of each shuttle.
+        partition_size (int): Target number of employees per partition.
+
+    Returns:
+        List[Tuple[List[int], List[int]]]: (employee nodes, shuttle indices) per partition.
+    """
+    partitions = partition_by_sector(locations, shuttle_capacities, partition_size)
+    quotas = np.array([len(nodes) for nodes, _ in partitions])
+    points = assign_routes.project_to_plane(locations[1:], origin=locations[0])
+    num_employees = len(points)
+
+    labels = np.empty(num_employees, dtype=int)
+    for cluster, (nodes, _) in enumerate(partitions):
+        labels[np.asarray(nodes, dtype=int) - 1] = cluster
+
+    for _ in range(KMEANS_MAX_ITERATIONS):
+        centroids = np.array([
+            points[labels == cluster].mean(axis=0) if quotas[cluster] else [np.inf, np.inf]
+            for cluster in range(len(partitions))
+        ])
+        distances = np.linalg.norm(points[:, np.newaxis, :] - centroids[np.newaxis, :, :], axis=2)
+
+        new_labels = capacitated_assignment(distances, quotas)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    return [
+        ((np.flatnonzero(labels == cluster) + 1).tolist(), shuttles)
+        for cluster, (_, shuttles) in enumerate(partitions)
+    ]
+
+
+PARTITIONERS = {
+    "sector": partition_by_sector,
+    "kmeans": partition_by_kmeans,
+}
+
+
+def stitch_routes(partitions, partition_routes, num_shuttles):
+    """
+    Maps per-partition routes back to global node indices and shuttle order.
+
+    Args:
+        partitions (List[Tuple[List[int], List[int]]]): Output of a partitioner.
+        partition_routes (List[List[List[int]] | None]): Sub-solver routes per partition.
+        num_shuttles (int): Size of the full fleet.
+
+    Returns:
+        List[List[int]] | None: Routes for every shuttle, or None if any
+        partition has no solution.
+    """
+    routes = [[0] for _ in range(num_shuttles)]
+    for (nodes, shuttles), sub_routes in zip(partitions, partition_routes):
+        if sub_routes is None:
+            return None
+        for shuttle, route in zip(shuttles, sub_routes):
+            routes[shuttle] = [0] + [nodes[node - 1] for node in route[1:]]
+    return routes
+
+
+def partition_budget(time_limit_seconds, num_partitions):
+    """
+    Search budget of each partition, so that all of them fit in the request's.
+
+    Partitions beyond the solver pool's size queue for a free worker, so
+    they run in waves of one partition per worker, one after another.
+
+    Args:
+        time_limit_seconds (float | None): Budget of the whole partitioned solve.
+        num_partitions (int): Partitions that need a solve.
+
+    Returns:
+        float | None: Budget per partition; None without an overall budget.
+    """
+    if time_limit_seconds is None:
+        return None
+    workers = solver_pool.configured_worker_count()
+    # Without worker processes solves run on threads, which do not queue
+    waves = math.ceil(num_partitions / workers) if workers else 1
+    return time_limit_seconds / max(1, waves)
+
+
+async def solve_partitioned(locations, shuttle_capacities, method="sector",
+                            partition_size=PARTITION_SIZE, time_limit_seconds=None,
+                            distance_store=None, location_ids=None):
+    """
+    Solves each partition as an independent sub-problem across solver workers.
+
+    Only the per-partition distance/bearing matrices are ever built, so memory
+    grows with the partition size rather than with the whole shift.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        shuttle_capacities (List[int]): Capacity of each shuttle.
+        method (str): "sector" or "kmeans"; "auto" means "sector".
+        partition_size (int): Target number of employees per partition.
+        time_limit_seconds (float, optional): Search budget of the whole
+            solve, shared between the waves of partitions; each partition's
+            own default applies when omitted.
+        distance_store (distance_store.DistanceStore, optional): Persistent
+            distances and bearings the partitions build their matrices from.
+        location_ids (List[str], optional): Store ID of each location, HQ first.
+
+    Returns:
+        List[List[int]] | None: Routes for every shuttle in global node indices,
+        or None if the fleet cannot carry everyone or a partition has no solution.
+    """
+    num_employees = len(locations) - 1
+    if sum(shuttle_capacities) < num_employees:
+        return None
+
+    # Partitioning a large shift is CPU-bound, so it runs off the event loop too
+    partitioner = PARTITIONERS.get(method, partition_by_sector)
+    partitions = await solver_pool.run_solver(
+        partitioner, locations, shuttle_capacities, partition_size
+    )
+
+    partition_time_limit = partition_budget(
+        time_limit_seconds, sum(1 for nodes, _ in partitions if nodes)
+    )
+
+    async def solve(nodes, shuttles):
+        if not nodes:
+            return [[0] for _ in shuttles]
+        return await solver_pool.run_cancellable_solver(
+            assign_routes.solve_shuttle_routes,
+            [locations[0]] + [locations[node] for node in nodes],
+            [shuttle_capacities[shuttle] for shuttle in shuttles],
+            time_limit_seconds=partition_time_limit,
+            distance_store=distance_store,
+            location_ids=[location_ids[0]] + [location_ids[node] for node in nodes]
+            if location_ids is not None else None
+        )
+
+    tasks = [asyncio.ensure_future(solve(nodes, shuttles)) for nodes, shuttles in partitions]
+    try:
+        partition_routes = await asyncio.gather(*tasks)
+    except BaseException:
+        # Do not leave sibling partitions running after a failure
+        for task in tasks:
+            task.cancel()
+        raise
+    return stitch_routes(partitions, partition_routes, len(shuttle_capacities))
@@ -0,0 +1,204 @@
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import numpy as np
+from . import assign_routes, road_network
+
+# Directory holding one distance store per organization; unset disables them
+DISTANCE_STORE_DIR = os.getenv("DISTANCE_STORE_DIR")
+# Locations kept per organization before its store is started afresh; the
+# matrices take 8 bytes per pair of locations on disk
+DISTANCE_STORE_MAX_LOCATIONS = int(os.getenv("DISTANCE_STORE_MAX_LOCATIONS", "10000"))
+# Degrees a location may drift (about 1 m) before its row is recomputed
+DISTANCE_STORE_TOLERANCE = 1e-5
+
+INITIAL_CAPACITY = 64
+
+
+def for_organization(organization_id, directory=None):
+    """
+    Returns the distance store of an organization.
+
+    Args:
+        organization_id (str | None): Organization of the request.
+        directory (str, optional): Root of the stores; defaults to DISTANCE_STORE_DIR.
+
+    Returns:
+        DistanceStore | None: The store, or None without an organization or
+        with the stores disabled.
+    """
+    directory = directory or DISTANCE_STORE_DIR
+    if not directory or not organization_id:
+        return None
+    name = hashlib.sha256(organization_id.encode()).hexdigest()[:32]
+    # Distances from another source must not be mixed in
+    return DistanceStore(os.path.join(directory, road_network.engine_name(), name))
+
+
+def location_ids(employee_ids, hq_id="HQ"):
+    """Store IDs of the HQ followed by each employee, in node order."""
+    return [hq_id] + [f"employee:{employee_id}" for employee_id in employee_ids]
+
+
+class DistanceStore:
+    """
+    Distances and bearings between an organization's locations, kept on disk.
+
+    Rows and columns are addressed by location ID through index.json, and
+    the float32 matrices are .npy files opened as memory maps, so a request
+    only reads the pages of its own locations. A location that is new or
+    has moved gets its row and column computed; every other pair is read as
+    stored. The matrices grow by doubling. Processes sharing a store take
+    turns through a lock file, so API processes and solver workers can use
+    the same directory. A store object only holds its directory and
+    distance function, so it is cheap to send to a worker.
+
+    pairs computes distances and bearings between broadcast arrays of
+    [lat, lon] pairs and defaults to travel_distance_and_bearing_pairs(),
+    so road distances are stored when a road network is loaded; a costly
+    source only pays for the rows that changed.
+    """
+
+    def __init__(self, directory, pairs=None, max_locations=None):
+        self.directory = directory
+        self.pairs = pairs or assign_routes.travel_distance_and_bearing_pairs
+        self.max_locations = max_locations or DISTANCE_STORE_MAX_LOCATIONS
+
+    def cost_matrix(self, ids, locations, out=None):
+        """
+        Arc costs between locations, from their stored distances and bearings.
+
+        Gives the same matrix as assign_routes.calculate_cost_matrix() for
+        the default distance function.
+
+        Args:
+            ids (List[str]): Store ID of each location, HQ first.
+            locations (List[List[float]]): [lat, lon] of each location.
+            out (np.ndarray, optional): N x N int32 array to write the costs to.
+
+        Returns:
+            np.ndarray: N x N int32 matrix of arc costs.
+        """
+        if len(set(ids)) != len(ids):
+            raise ValueError("Location IDs must be unique")
+        coords = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+        with self._locked():
+            slots = self._update(ids, coords)
+            index = np.ix_(slots, slots)
+            distance_matrix, bearing_matrix = self._matrices()
+            distance = distance_matrix[index]
+            bearing = bearing_matrix[index]
+            del distance_matrix, bearing_matrix
+
+        cost_matrix = assign_routes.build_cost_matrix(distance, bearing)
+        if out is None:
+            return cost_matrix
+        out[...] = cost_matrix
+        return out
+
+    def __len__(self):
+        return len(self._read_index())
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path("lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_index(self):
+        try:
+            with open(self._path("index.json")) as f:
+                return json.load(f)["ids"]
+        except FileNotFoundError:
+            return []
+
+    def _write_index(self, ids):
+        # Written last and replaced atomically, so it never lists rows that
+        # were not computed yet
+        with open(self._path("index.json.tmp"), "w") as f:
+            json.dump({"ids": ids}, f)
+        os.replace(self._path("index.json.tmp"), self._path("index.json"))
+
+    def _matrices(self):
+        return (np.load(self._path("distance.npy"), mmap_mode="r+"),
+                np.load(self._path("bearing.npy"), mmap_mode="r+"))
+
+    def _resize(self, capacity, keep):
+        """Moves the first keep locations into matrices of a new capacity."""
+        old = self._matrices() if keep else (None, None)
+        for name, matrix in zip(("distance", "bearing"), old):
+            resized = np.lib.format.open_memmap(
+                self._path(f"{name}.npy.tmp"), mode="w+", dtype=np.float32,
+                shape=(capacity, capacity)
+            )
+            if keep:
+                resized[:keep, :keep] = matrix[:keep, :keep]
+            resized.flush()
+            del resized
+            os.replace(self._path(f"{name}.npy.tmp"), self._path(f"{name}.npy"))
+
+        coords = np.zeros((capacity, 2))
+        if keep:
+            coords[:keep] = np.load(self._path("coords.npy"))[:keep]
+        np.save(self._path("coords.npy"), coords)
+
+    def _update(self, ids, coords):
+        """Adds new locations, recomputes moved ones and returns every slot."""
+        stored = self._read_index()
+        slot_of = {location_id: slot for slot, location_id in enumerate(stored)}
+        new_ids = [location_id for location_id in ids if location_id not in slot_of]
+
+        if len(stored) + len(new_ids) > self.max_locations:
+            # Too many past locations: start afresh with this request's
+            stored, slot_of, new_ids = [], {}, list(ids)
+        num_stored = len(stored)
+        total = num_stored + len(new_ids)
+
+        capacity = len(np.load(self._path("coords.npy"), mmap_mode="r")) if num_stored else 0
+        if total > capacity:
+            new_capacity = max(INITIAL_CAPACITY, capacity)
+            while new_capacity < total:
+                new_capacity *= 2
+            self._resize(new_capacity, num_stored)
+
+        for slot, location_id in enumerate(new_ids, start=num_stored):
+            slot_of[location_id] = slot
+        slots = np.array([slot_of[location_id] for location_id in ids], dtype=np.int64)
+
+        all_coords = np.load(self._path("coords.npy"))
+        changed = ((slots >= num_stored)
+                   | (np.abs(all_coords[slots] - coords).max(axis=1) > DISTANCE_STORE_TOLERANCE))
+        if not changed.any():
+            return slots
+
+        all_coords[slots[changed]] = coords[changed]
+        self._compute_rows(all_coords[:total], slots[changed])
+        np.save(self._path("coords.npy"), all_coords)
+        self._write_index(stored + new_ids)
+        return slots
+
+    def _compute_rows(self, coords, rows):
+        """Fills the rows and columns of some slots against every stored location."""
+        distance_matrix, bearing_matrix = self._matrices()
+        total = len(coords)
+        for start in range(0, len(rows), assign_routes.MATRIX_BLOCK_ROWS):
+            block = rows[start:start + assign_routes.MATRIX_BLOCK_ROWS]
+            distance, bearing = self.pairs(coords[block, np.newaxis], coords[np.newaxis, :])
+            distance_matrix[block, :total] = distance
+            bearing_matrix[block, :total] = bearing
+            distance, bearing = self.pairs(coords[:, np.newaxis], coords[np.newaxis, block])
+            distance_matrix[:total, block] = distance
+            bearing_matrix[:total, block] = bearing
+        distance_matrix[rows, rows] = 0.0
+        bearing_matrix[rows, rows] = 0.0
+        distance_matrix.flush()
+        bearing_matrix.flush()
@@ -0,0 +1,62 @@
+import os
+
+# Spare seats kept when pruning the fleet, as a fraction of the demand;
+# negative keeps every shuttle
+FLEET_PRUNING_SLACK = float(os.getenv("FLEET_PRUNING_SLACK", "0.25"))
+
+
+def first_fit_decreasing(demands, capacities):
+    """
+    Checks whether the demands pack into the capacities, largest first.
+
+    Args:
+        demands (List[int]): Seats needed by each pickup node.
+        capacities (List[int]): Seats of each shuttle.
+
+    Returns:
+        bool: True if first-fit decreasing finds a packing.
+    """
+    room = sorted(capacities, reverse=True)
+    for demand in sorted(demands, reverse=True):
+        for shuttle, seats in enumerate(room):
+            if demand <= seats:
+                room[shuttle] -= demand
+                break
+        else:
+            return False
+    return True
+
+
+def select_shuttles(shuttle_capacities, demands, slack=None):
+    """
+    Picks the fewest shuttles that carry the demand plus some slack.
+
+    Shuttles are taken largest first until their seats cover the demand
+    grown by the slack fraction and the pickup nodes pack into them.
+
+    Args:
+        shuttle_capacities (List[int]): Capacity of each shuttle.
+        demands (List[int]): Seats needed by each pickup node.
+        slack (float, optional): Spare seats as a fraction of the demand;
+            negative keeps every shuttle. Defaults to FLEET_PRUNING_SLACK.
+
+    Returns:
+        List[int]: Indices of the chosen shuttles in fleet order; every
+        shuttle if the demand does not fit.
+    """
+    if slack is None:
+        slack = FLEET_PRUNING_SLACK
+    everyone = list(range(len(shuttle_capacities)))
+    if slack < 0:
+        return everyone
+
+    target = sum(demands) * (1 + slack)
+    chosen = []
+    seats = 0
+    for shuttle in sorted(everyone, key=lambda s: -shuttle_capacities[s]):
+        if seats >= target and first_fit_decreasing(
+                demands, [shuttle_capacities[s] for s in chosen]):
+            break
+        chosen.append(shuttle)
+        seats += shuttle_capacities[shuttle]
+    return sorted(chosen)
@@ -0,0 +1,162 @@
+import numpy as np
+from . import assign_routes
+
+
+def sweep_order(locations):
+    """
+    Orders employees by bearing from the HQ, starting after the widest empty sector.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+
+    Returns:
+        np.ndarray: Employee nodes (1-based) in sweep order.
+    """
+    bearings = assign_routes.calculate_bearings_from(locations[0], locations[1:])
+    order = np.argsort(bearings, kind="stable")
+    if len(order) > 1:
+        sorted_bearings = bearings[order]
+        gaps = np.diff(np.append(sorted_bearings, sorted_bearings[0] + 360.0))
+        order = np.roll(order, -(int(np.argmax(gaps)) + 1))
+    return order + 1
+
+
+def sweep_routes(locations, shuttle_capacities, demands=None):
+    """
+    Builds a feasible plan with the classic sweep heuristic.
+
+    Shuttles, largest first, take consecutive runs of employees in sweep
+    order; each run is driven outwards from the HQ.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        shuttle_capacities (List[int]): Capacity of each shuttle.
+        demands (List[int], optional): Seats taken by node i + 1; 1 each by default.
+
+    Returns:
+        List[List[int]] | None: Node routes per shuttle, or None if the fleet
+        cannot carry everyone this way.
+    """
+    num_employees = len(locations) - 1
+    demands = np.ones(num_employees, dtype=int) if demands is None else np.asarray(demands)
+    if sum(shuttle_capacities) < demands.sum():
+        return None
+
+    nodes = sweep_order(locations)
+    distances = np.linalg.norm(assign_routes.project_to_plane(locations), axis=1)
+    routes = [[0] for _ in shuttle_capacities]
+    shuttles = iter(sorted(range(len(shuttle_capacities)), key=lambda s: -shuttle_capacities[s]))
+    shuttle = next(shuttles)
+    load = 0
+    for node in nodes:
+        # Move on to the next shuttle once this one is full
+        while load + demands[node - 1] > shuttle_capacities[shuttle]:
+            shuttle = next(shuttles, None)
+            if shuttle is None:
+                return None
+            load = 0
+        routes[shuttle].append(int(node))
+        load += demands[node - 1]
+
+    return [[0] + sorted(route[1:], key=lambda node: distances[node]) for route in routes]
+
+
+def nearest_neighbour_order(cost_matrix):
+    """
+    Orders a route's stops by repeatedly driving to the cheapest unvisited one.
+
+    Args:
+        cost_matrix (np.ndarray): Arc costs between the route's nodes, with
+            the HQ as node 0.
+
+    Returns:
+        List[int]: Local node order starting at the HQ.
+    """
+    costs = np.asarray(cost_matrix, dtype=np.float64)
+    visited = np.zeros(len(costs), dtype=bool)
+    visited[0] = True
+    order = [0]
+    for _ in range(len(costs) - 1):
+        candidates = np.where(visited, np.inf, costs[order[-1]])
+        node = int(np.argmin(candidates))
+        visited[node] = True
+        order.append(node)
+    return order
+
+
+def two_opt(order, cost_matrix):
+    """
+    Improves a route by reversing segments while any reversal makes it cheaper.
+
+    Costs may be asymmetric, so each move is priced with the reversed
+    segment's own arcs. All moves of a pass are priced at once from prefix
+    sums of the forward and backward arc costs.
+
+    Args:
+        order (List[int]): Local node order starting at the HQ node 0.
+        cost_matrix (np.ndarray): Arc costs between the route's nodes.
+
+    Returns:
+        List[int]: The improved order, still starting at the HQ.
+    """
+    costs = np.asarray(cost_matrix, dtype=np.int64)
+    # Closed tour: back to the HQ after the last stop
+    tour = np.append(np.asarray(order, dtype=np.int64), 0)
+    num_stops = len(order) - 1
+    if num_stops < 2:
+        return list(order)
+
+    first = np.arange(1, num_stops + 1)[:, np.newaxis]
+    last = np.arange(1, num_stops + 1)[np.newaxis, :]
+    valid = first < last
+    for _ in range(num_stops * num_stops):
+        forward = costs[tour[:-1], tour[1:]]
+        backward = costs[tour[1:], tour[:-1]]
+        forward_sums = np.concatenate([[0], np.cumsum(forward)])
+        backward_sums = np.concatenate([[0], np.cumsum(backward)])
+
+        # Reversing tour[first..last] replaces the two boundary arcs and
+        # flips the direction of every arc in between
+        old = (forward[first - 1] + forward_sums[last] - forward_sums[first] + forward[last])
+        new = (costs[tour[first - 1], tour[last]] + backward_sums[last] - backward_sums[first]
+               + costs[tour[first], tour[last + 1]])
+        delta = np.where(valid, new - old, 0)
+        move = int(np.argmin(delta))
+        if delta.flat[move] >= 0:
+            break
+        i, j = divmod(move, num_stops)
+        tour[i + 1:j + 2] = tour[i + 1:j + 2][::-1].copy()
+
+    return tour[:-1].tolist()
+
+
+def fallback_routes(locations, shuttle_capacities, demands=None):
+    """
+    Builds a plan without OR-Tools, for when the solver finds none in time.
+
+    Employees are split into shuttle loads by sweep_routes(); each load is
+    ordered by nearest neighbour and then improved with two_opt() on the
+    solver's arc costs. Only the arcs within each load are priced.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        shuttle_capacities (List[int]): Capacity of each shuttle.
+        demands (List[int], optional): Seats taken by node i + 1; 1 each by default.
+
+    Returns:
+        List[List[int]] | None: Node routes per shuttle, or None if the fleet
+        cannot carry everyone this way.
+    """
+    routes = sweep_routes(locations, shuttle_capacities, demands)
+    if routes is None:
+        return None
+
+    costs = assign_routes.PairwiseCosts(locations)
+    for shuttle, route in enumerate(routes):
+        if len(route) <= 2:
+            continue
+        nodes = np.asarray(route)
+        route_costs = costs[nodes[:, np.newaxis], nodes[np.newaxis, :]]
+        order = two_opt(nearest_neighbour_order(route_costs), route_costs)
+        routes[shuttle] = nodes[order].tolist()
+    return routes
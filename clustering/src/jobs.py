@@ -0,0 +1,206 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+JobKey = Tuple[str, Optional[str]]
+
+# Maximum number of finished jobs kept for status and result requests
+JOB_RETENTION_SIZE = int(os.getenv("JOB_RETENTION_SIZE", "100"))
+# Seconds a finished job stays retrievable
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class JobCancelledError(Exception):
+    """Raised to the caller of a job that was cancelled explicitly."""
+
+    def __init__(self, job, message=None):
+        super().__init__(message or f"Job {job.id} was cancelled")
+        self.job = job
+
+
+class JobSupersededError(JobCancelledError):
+    """Raised to the caller of a job that was replaced by a newer job with the same key."""
+
+    def __init__(self, job):
+        super().__init__(job, f"Job {job.id} was superseded by a newer request")
+
+
+@dataclass
+class Job:
+    id: str
+    key: Optional[JobKey]
+    status: JobStatus = JobStatus.PENDING
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    superseded: bool = False
+    cancel_requested: bool = False
+    # Keep the finished job retrievable from the registry
+    retain: bool = False
+    # Best objective found so far, for status requests
+    objective: Optional[int] = None
+    # Latest plan handed out while the job runs, and how many plans preceded it
+    best_plan: Any = field(default=None, repr=False)
+    plan_version: int = 0
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def cancel(self):
+        """Requests cancellation of the job's task."""
+        self.cancel_requested = True
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+    def done(self):
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+def job_key(organization_id=None, shift_id=None):
+    """
+    Builds the registry key for a planning request.
+
+    Args:
+        organization_id (str | None): Organization the plan belongs to.
+        shift_id (str | None): Shift being planned.
+
+    Returns:
+        JobKey | None: The key, or None for requests that carry no organization
+        and therefore never supersede other jobs.
+    """
+    if organization_id is None:
+        return None
+    return (organization_id, shift_id)
+
+
+class JobRegistry:
+    """
+    Tracks running solver jobs.
+
+    A new job supersedes (cancels) the active job with the same key only;
+    jobs with different keys run concurrently. Finished jobs submitted with
+    retain=True stay retrievable, bounded by count and age like ResultCache.
+    """
+
+    def __init__(self, max_retained=JOB_RETENTION_SIZE, retention_seconds=JOB_RETENTION_SECONDS):
+        self.max_retained = max_retained
+        self.retention_seconds = retention_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._active_by_key: Dict[JobKey, Job] = {}
+        self._finished: "OrderedDict[str, Tuple[float, Job]]" = OrderedDict()
+
+    def get(self, job_id) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        entry = self._finished.get(job_id)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._finished[job_id]
+            entry = None
+        return entry[1] if entry is not None else None
+
+    def remove(self, job_id) -> Optional[Job]:
+        """
+        Cancels a job if it is still running and forgets it.
+
+        Returns:
+            Job | None: The removed job, or None if the ID is unknown.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.retain = False
+        self._finished.pop(job_id, None)
+        job.cancel()
+        return job
+
+    def active_jobs(self) -> List[Job]:
+        return [job for job in self._jobs.values() if not job.done()]
+
+    def active_for_key(self, key) -> Optional[Job]:
+        job = self._active_by_key.get(key)
+        if job is not None and not job.done():
+            return job
+        return None
+
+    def submit(self, key: Optional[JobKey], func: Callable[[Job], Awaitable[Any]],
+               retain=False) -> Job:
+        """
+        Starts a job, superseding the active job with the same key.
+
+        Args:
+            key (JobKey | None): Registry key from job_key().
+            func (Callable): Coroutine function called with the new Job.
+            retain (bool): Keep the job retrievable through get() once it finishes.
+
+        Returns:
+            Job: The started job.
+        """
+        previous = self.active_for_key(key) if key is not None else None
+        if previous is not None:
+            previous.superseded = True
+            previous.cancel()
+
+        job = Job(id=uuid.uuid4().hex, key=key, retain=retain)
+        job.task = asyncio.create_task(self._run(job, func))
+        job.task.add_done_callback(lambda task: self._finish(job, task))
+        self._jobs[job.id] = job
+        if key is not None:
+            self._active_by_key[key] = job
+        return job
+
+    async def run(self, key: Optional[JobKey], func: Callable[[Job], Awaitable[Any]]):
+        """
+        Starts a job and waits for its result.
+
+        Raises:
+            JobSupersededError: If a newer job with the same key replaced it.
+        """
+        return await self.wait(self.submit(key, func))
+
+    async def wait(self, job: Job):
+        """
+        Waits for a submitted job's result.
+
+        Raises:
+            JobSupersededError: If a newer job with the same key replaced it.
+            JobCancelledError: If the job was cancelled through Job.cancel().
+        """
+        try:
+            return await job.task
+        except asyncio.CancelledError:
+            if job.superseded:
+                raise JobSupersededError(job)
+            if job.cancel_requested:
+                raise JobCancelledError(job)
+            raise
+
+    async def _run(self, job: Job, func):
+        job.status = JobStatus.RUNNING
+        return await func(job)
+
+    def _finish(self, job: Job, task: asyncio.Task):
+        if task.cancelled():
+            job.status = JobStatus.CANCELLED
+        elif task.exception() is not None:
+            job.status = JobStatus.FAILED
+        else:
+            job.status = JobStatus.COMPLETED
+        job.finished_at = time.time()
+        self._jobs.pop(job.id, None)
+        if job.key is not None and self._active_by_key.get(job.key) is job:
+            del self._active_by_key[job.key]
+        if job.retain and self.max_retained > 0:
+            self._finished[job.id] = (time.monotonic() + self.retention_seconds, job)
+            while len(self._finished) > self.max_retained:
+                self._finished.popitem(last=False)
@@ -0,0 +1,230 @@
+import asyncio
+import os
+import time
+import numpy as np
+from . import assign_routes, solver_pool
+
+# Wall-clock budget of the improvement phase; 0 disables it
+LNS_TIME_LIMIT_SECONDS = float(os.getenv("LNS_TIME_LIMIT_SECONDS", "10"))
+# Number of adjacent routes re-solved together as one sub-problem
+LNS_NEIGHBOURHOOD_ROUTES = int(os.getenv("LNS_NEIGHBOURHOOD_ROUTES", "4"))
+
+
+def route_centroids(locations, routes):
+    """
+    Computes the centroid of each route's employees on a local plane.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        routes (List[List[int]]): Node routes per shuttle.
+
+    Returns:
+        np.ndarray: R x 2 centroids in kilometres; NaN for empty routes.
+    """
+    points = assign_routes.project_to_plane(locations)
+    centroids = np.full((len(routes), 2), np.nan)
+    for shuttle, route in enumerate(routes):
+        if len(route) > 1:
+            centroids[shuttle] = points[route[1:]].mean(axis=0)
+    return centroids
+
+
+def select_neighbourhoods(centroids, routes, num_neighbourhoods,
+                          routes_per_neighbourhood=LNS_NEIGHBOURHOOD_ROUTES, rng=None):
+    """
+    Picks disjoint sets of geographically adjacent routes.
+
+    Each set grows from a random seed route by adding the nearest unused
+    routes by centroid, plus at most one idle shuttle so employees can move
+    onto it.
+
+    Args:
+        centroids (np.ndarray): Output of route_centroids().
+        routes (List[List[int]]): Node routes per shuttle.
+        num_neighbourhoods (int): Maximum number of sets to return.
+        routes_per_neighbourhood (int): Busy routes per set.
+        rng (np.random.Generator, optional): Source of randomness.
+
+    Returns:
+        List[List[int]]: Shuttle indices of each neighbourhood.
+    """
+    rng = rng or np.random.default_rng()
+    busy = [s for s, route in enumerate(routes) if len(route) > 1]
+    idle = [s for s, route in enumerate(routes) if len(route) <= 1]
+    unused = set(busy)
+    neighbourhoods = []
+
+    for seed in rng.permutation(busy):
+        if len(neighbourhoods) == num_neighbourhoods:
+            break
+        if seed not in unused:
+            continue
+        candidates = np.array(sorted(unused))
+        distances = np.linalg.norm(centroids[candidates] - centroids[seed], axis=1)
+        members = candidates[np.argsort(distances, kind="stable")[:routes_per_neighbourhood]]
+        if len(members) < 2 and not idle:
+            # A single route with nowhere to move employees cannot improve much
+            continue
+        neighbourhood = [int(s) for s in members]
+        unused.difference_update(neighbourhood)
+        if idle:
+            neighbourhood.append(idle.pop())
+        neighbourhoods.append(neighbourhood)
+
+    return neighbourhoods
+
+
+def improve_neighbourhood(locations, shuttle_capacities, routes, cancel_token=None,
+                          time_limit_seconds=None):
+    """
+    Re-solves one neighbourhood and keeps the better of the old and new routes.
+
+    The search starts from the current routes. Runs inside solver worker
+    processes. Node indices are local to the sub-problem: 0 is the HQ and
+    1..M the neighbourhood's employees.
+
+    Args:
+        locations (List[List[float]]): HQ first, then the neighbourhood's employees.
+        shuttle_capacities (List[int]): Capacities of the neighbourhood's shuttles.
+        routes (List[List[int]]): Current routes of those shuttles.
+        cancel_token (CancellationToken, optional): Stops the search when cancelled.
+        time_limit_seconds (float, optional): Search budget.
+
+    Returns:
+        Tuple[List[List[int]], int]: The kept routes and the cost they save.
+    """
+    cost_matrix = assign_routes.calculate_cost_matrix(locations)
+    current_cost = assign_routes.calculate_route_cost(routes, cost_matrix)
+
+    new_routes = assign_routes.assign_employees_to_shuttles(
+        locations,
+        None,
+        None,
+        shuttle_capacities,
+        cancel_token=cancel_token,
+        time_limit_seconds=time_limit_seconds,
+        initial_routes=routes,
+        cost_matrix=cost_matrix
+    )
+    if new_routes is None:
+        return routes, 0
+
+    new_cost = assign_routes.calculate_route_cost(new_routes, cost_matrix)
+    if new_cost < current_cost:
+        return new_routes, current_cost - new_cost
+    return routes, 0
+
+
+async def solve_neighbourhood(locations, routes, shuttle_capacities, shuttles,
+                             time_limit_seconds=None):
+    """
+    Re-solves the routes of some shuttles in a solver worker.
+
+    Only the sub-matrix of those shuttles' employees is built.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        routes (List[List[int]]): Current node routes for every shuttle.
+        shuttle_capacities (List[int]): Capacity of each shuttle.
+        shuttles (List[int]): Indices of the shuttles to re-solve.
+        time_limit_seconds (float, optional): Upper bound on the search budget.
+
+    Returns:
+        Tuple[List[List[int]], int]: New routes of those shuttles in global
+        node indices, and the cost they save.
+    """
+    nodes = [node for s in shuttles for node in routes[s][1:]]
+    local = {node: i + 1 for i, node in enumerate(nodes)}
+    sub_routes = [[0] + [local[node] for node in routes[s][1:]] for s in shuttles]
+    budget = assign_routes.default_time_limit(len(nodes))
+    if time_limit_seconds is not None:
+        budget = min(time_limit_seconds, budget)
+    improved, saving = await solver_pool.run_cancellable_solver(
+        improve_neighbourhood,
+        [locations[0]] + [locations[node] for node in nodes],
+        [shuttle_capacities[s] for s in shuttles],
+        sub_routes,
+        time_limit_seconds=budget
+    )
+    return [[0] + [nodes[node - 1] for node in route[1:]] for route in improved], saving
+
+
+async def improve_routes(locations, routes, shuttle_capacities,
+                         time_limit_seconds=LNS_TIME_LIMIT_SECONDS,
+                         routes_per_neighbourhood=LNS_NEIGHBOURHOOD_ROUTES,
+                         parallelism=None, seed=None, on_improvement=None):
+    """
+    Large-neighbourhood search over a complete plan.
+
+    Each round re-solves disjoint neighbourhoods of adjacent routes in
+    parallel across solver workers and accepts every improvement back into
+    the plan, until the time budget runs out or a full pass over the plan's
+    routes finds nothing to improve.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        routes (List[List[int]]): Current node routes for every shuttle.
+        shuttle_capacities (List[int]): Capacity of each shuttle.
+        time_limit_seconds (float): Wall-clock budget of the whole phase.
+        routes_per_neighbourhood (int): Busy routes per neighbourhood.
+        parallelism (int, optional): Neighbourhoods per round; defaults to
+            the solver pool size.
+        seed (int, optional): Random seed for neighbourhood selection.
+        on_improvement (Callable[[List[List[int]], int], None], optional):
+            Called with the plan and the cost the round saved after each
+            round that improved it.
+
+    Returns:
+        List[List[int]]: The improved routes.
+    """
+    if time_limit_seconds <= 0:
+        return routes
+
+    routes = [list(route) for route in routes]
+    parallelism = parallelism or max(1, solver_pool.configured_worker_count())
+    rng = np.random.default_rng(seed)
+    deadline = time.monotonic() + time_limit_seconds
+    busy_routes = sum(1 for route in routes if len(route) > 1)
+    stale_limit = max(parallelism, -(-busy_routes // routes_per_neighbourhood))
+    # Neighbourhoods re-solved since the last accepted improvement
+    stale = 0
+
+    while stale < stale_limit:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+
+        centroids = route_centroids(locations, routes)
+        neighbourhoods = select_neighbourhoods(
+            centroids, routes, parallelism, routes_per_neighbourhood, rng
+        )
+        if not neighbourhoods:
+            break
+
+        async def solve(shuttles):
+            improved, saving = await solve_neighbourhood(
+                locations, routes, shuttle_capacities, shuttles, remaining
+            )
+            return shuttles, improved, saving
+
+        tasks = [asyncio.ensure_future(solve(shuttles)) for shuttles in neighbourhoods]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        round_saving = 0
+        for shuttles, improved, saving in results:
+            if saving > 0:
+                stale = 0
+                round_saving += saving
+                for shuttle, route in zip(shuttles, improved):
+                    routes[shuttle] = route
+            else:
+                stale += 1
+        if round_saving and on_improvement is not None:
+            on_improvement([list(route) for route in routes], round_saving)
+
+    return routes
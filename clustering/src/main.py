@@ -1,14 +1,51 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Any
-from . import assign_routes  
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional, Literal
+from contextlib import asynccontextmanager
+from . import (
+    assign_routes, cache, decomposition, distance_store, heuristics, jobs, lns, merging,
+    plan_edits, portfolio, progress, road_network, solver_pool, tuning
+)
 import asyncio
+import json
+import os
+import time
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start solver workers, read the tuned solver profile and map the road
+    # network before the first planning request arrives
+    solver_pool.get_executor()
+    tuning.get_profile()
+    road_network.get_network()
+    yield
+    solver_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+# Running solves, keyed by organization/shift, and recently finished /jobs
+job_registry = jobs.JobRegistry()
+
+# Plans of recent requests, keyed by canonical request content
+result_cache = cache.ResultCache()
+
+# Solves currently running, keyed by canonical request content
+in_flight = cache.SingleFlight()
+
+# How often to check whether the client of a running solve went away
+DISCONNECT_POLL_SECONDS = 0.25
 
-app = FastAPI()
+# How often a streamed solve checks for a new improving plan
+PROGRESS_POLL_SECONDS = 0.1
 
-# Store the current task
-current_task = None
+# Seconds clients are asked to wait before polling a running job again
+JOB_RETRY_AFTER_SECONDS = 1
+
+# Seconds past a request's time budget after which a solve is abandoned for
+# the NumPy fallback plan
+FALLBACK_GRACE_SECONDS = float(os.getenv("FALLBACK_GRACE_SECONDS", "5"))
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,100 +68,735 @@ class LocationData(BaseModel):
     HQ: List[float]
     employees: List[Employee]
 
+class PlannedRoute(BaseModel):
+    shuttle_id: str
+    employees: List[str]
+
 class RouteRequest(BaseModel):
     locations: LocationData
     shuttles: List[Shuttle]
+    # A new request supersedes a running one only for the same organization/shift
+    organization_id: Optional[str] = None
+    shift_id: Optional[str] = None
+    # Optional latency budget for the solver; derived from problem size if omitted
+    time_budget_ms: Optional[int] = Field(default=None, gt=0)
+    # Split large shifts into independently solved partitions
+    decomposition: Literal["auto", "none", "sector", "kmeans"] = "auto"
+    # Run large-neighbourhood search over a partitioned plan
+    improve: bool = True
+    # Previous plan ({shuttle_id, employees} routes) to start the search from
+    previous_routes: Optional[List[PlannedRoute]] = None
+    # Consolidate employees into shared stops within this walking distance
+    walking_radius_meters: Optional[float] = Field(default=None, gt=0)
+    # Answer within this latency with the best plan so far and keep solving
+    # in the background as a job
+    instant_ms: Optional[int] = Field(default=None, gt=0)
+    # Race several search strategies across solver workers
+    portfolio: bool = False
+
+class PlanEditRequest(BaseModel):
+    # Employees of the current plan, before the edits
+    locations: LocationData
+    shuttles: List[Shuttle]
+    # Current plan in the {shuttle_id, employees} response shape
+    routes: List[PlannedRoute]
+    # Employees joining the shift; an existing ID moves that employee
+    add: List[Employee] = []
+    # IDs of employees leaving the shift
+    remove: List[str] = []
+    # Optional budget for re-solving the edited routes after insertion
+    repair_time_ms: Optional[int] = Field(default=None, gt=0)
+
+async def cancel_on_disconnect(http_request: Request, task: asyncio.Task):
+    """
+    Cancels the task once the client that requested it disconnects.
+
+    Returns:
+        bool: True if the task was cancelled because of a disconnect.
+    """
+    while not task.done():
+        if await http_request.is_disconnected():
+            task.cancel()
+            return True
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+    return False
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "service": "route-assignment"}
 
-@app.post("/clustering")
-async def assign_routes_endpoint(request: RouteRequest, background_tasks: BackgroundTasks):
-    global current_task
-    
-    # Cancel current task if exists
-    if current_task and not current_task.done():
-        current_task.cancel()
-        try:
-            await current_task
-        except asyncio.CancelledError:
-            pass
+def empty_request_response(request: RouteRequest):
+    """
+    Answers requests that need no solve.
+
+    Returns:
+        Dict[str, Any] | None: The response, or None if the request must be solved.
+    """
+    if not request.shuttles:
+        return {
+            "success": False,
+            "message": "At least one shuttle is required for clustering",
+            "routes": []
+        }
+
+    if not request.locations.employees:
+        return {
+            "success": True,
+            "message": "No employees to assign",
+            "routes": []
+        }
+    return None
+
+def request_cache_key(request: RouteRequest):
+    """Identical requests, up to employee/shuttle order, share one plan."""
+    return cache.canonical_key(
+        request.locations.HQ,
+        [(emp.id, emp.latitude, emp.longitude) for emp in request.locations.employees],
+        [shuttle.capacity for shuttle in request.shuttles],
+        time_budget_ms=request.time_budget_ms,
+        decomposition=request.decomposition,
+        improve=request.improve,
+        previous_routes=[
+            [route.shuttle_id, route.employees] for route in request.previous_routes
+        ] if request.previous_routes else None,
+        walking_radius_meters=request.walking_radius_meters,
+        portfolio=request.portfolio
+    )
 
+def plan_response(request: RouteRequest, plan, cached):
+    """Maps a plan onto the request's shuttle IDs in the response shape."""
+    return dict(
+        plan["response"],
+        routes=cache.assign_cached_routes(
+            plan["routes"],
+            [(shuttle.id, shuttle.capacity) for shuttle in request.shuttles]
+        ),
+        cached=cached
+    )
+
+def request_locations(request: RouteRequest):
+    """HQ first, then each employee's [lat, lon]."""
+    return [request.locations.HQ] + [
+        [emp.latitude, emp.longitude] for emp in request.locations.employees
+    ]
+
+def plan_node_routes(request: RouteRequest, plan):
+    """Node routes of a cached plan, in the request's employee numbering."""
+    nodes = {emp.id: node for node, emp in enumerate(request.locations.employees, start=1)}
+    return [
+        [0] + [nodes[employee_id] for employee_id in employee_ids]
+        for _, employee_ids, *_ in plan["routes"]
+    ]
+
+def routes_response(request: RouteRequest, routes):
+    """Maps node routes onto shuttle and employee IDs."""
+    employees = request.locations.employees
+    return [
+        {
+            "shuttle_id": shuttle.id,
+            # Exclude the HQ (node 0) from assignment
+            "employees": [employees[node - 1].id for node in route[1:]]
+        }
+        for shuttle, route in zip(request.shuttles, routes)
+    ]
+
+async def within_budget(solve, time_limit_seconds):
+    """
+    Awaits a solve, abandoning it FALLBACK_GRACE_SECONDS past its time budget.
+
+    Returns:
+        Any: The solve's result, or None if it ran over.
+    """
+    if time_limit_seconds is None:
+        return await solve
     try:
-        # Create new task
-        async def process_request():
-            # Validate input data
-            if not request.shuttles:
-                return {
-                    "success": False,
-                    "message": "At least one shuttle is required for clustering",
-                    "routes": []
-                }
-            
-            if not request.locations.employees:
-                return {
-                    "success": True,
-                    "message": "No employees to assign",
-                    "routes": []
-                }
-            
-            # Prepare locations list with HQ first, then employees
-            hq = request.locations.HQ
-            employees = request.locations.employees
-            locations = [hq] + [[emp.latitude, emp.longitude] for emp in employees]
-            
-            # Extract employee IDs in order (excluding HQ)
-            employee_ids = [emp.id for emp in employees]
-            
-            # Extract shuttle capacities
-            shuttle_capacities = [shuttle.capacity for shuttle in request.shuttles]
-            
-            # Calculate matrices
-            distance_matrix, bearing_matrix = assign_routes.calculate_distance_and_bearing_matrix(locations)
-            
-            # Assign routes
-            routes = assign_routes.assign_employees_to_shuttles(
-                locations, 
-                distance_matrix, 
-                bearing_matrix, 
-                shuttle_capacities
+        return await asyncio.wait_for(solve, time_limit_seconds + FALLBACK_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        return None
+
+async def plan_routes(request: RouteRequest, on_progress=None):
+    """
+    Solves a planning request and caches the verified plan.
+
+    Args:
+        request (RouteRequest): The planning request.
+        on_progress (Callable[[List[List[int]], int], None], optional): Called
+            with the node routes and objective of improving plans found on
+            the way to the final one.
+
+    Returns:
+        Dict[str, Any]: The plan, with routes kept per shuttle capacity.
+    """
+    # Prepare locations list with HQ first, then employees
+    hq = request.locations.HQ
+    employees = request.locations.employees
+    locations = [hq] + [[emp.latitude, emp.longitude] for emp in employees]
+
+    # Extract employee IDs in order (excluding HQ)
+    employee_ids = [emp.id for emp in employees]
+
+    # Extract shuttle capacities
+    shuttle_capacities = [shuttle.capacity for shuttle in request.shuttles]
+
+    # Calculate matrices and assign routes in a solver worker
+    time_limit_seconds = (
+        request.time_budget_ms / 1000 if request.time_budget_ms else None
+    )
+    # Distances between the organization's locations persist across requests
+    store = distance_store.for_organization(request.organization_id)
+    location_ids = distance_store.location_ids(employee_ids)
+    # Shared stops are routed instead of individual employees
+    stop_groups = None
+    solve_locations, demands, solve_ids = locations, None, location_ids
+    if request.walking_radius_meters:
+        # Placing stops takes most of a second for thousands of employees
+        stop_groups, stop_locations = await solver_pool.run_solver(
+            merging.place_stops, locations, request.walking_radius_meters, max(shuttle_capacities)
+        )
+        solve_locations = [hq] + stop_locations
+        demands = [len(group) for group in stop_groups]
+        solve_ids = merging.group_ids(location_ids, stop_groups, prefix="stop")
+
+    strategy = assign_routes.DEFAULT_STRATEGY
+    if demands is None and decomposition.should_decompose(request.decomposition, len(employees)):
+        # One budget bounds partitioning and improvement together
+        if time_limit_seconds is None:
+            time_limit_seconds = assign_routes.default_time_limit(len(employees))
+        # Best complete plan so far, kept if the budget runs out during improvement
+        latest = {"routes": None}
+
+        async def solve_decomposed():
+            started = time.monotonic()
+            solve_seconds = time_limit_seconds
+            if request.improve:
+                solve_seconds *= decomposition.DECOMPOSITION_SOLVE_SHARE
+            routes = await decomposition.solve_partitioned(
+                locations,
+                shuttle_capacities,
+                method=request.decomposition,
+                time_limit_seconds=solve_seconds,
+                distance_store=store,
+                location_ids=location_ids
             )
-            
+            latest["routes"] = routes
             if not routes:
-                raise HTTPException(status_code=400, detail="No solution found")
-            
-            # Verify assignments
-            num_employees = len(employee_ids)
-            verification_passed = assign_routes.verify_unique_assignments(routes, num_employees)
-            
-            # Map routes to employee IDs
-            assigned_routes = []
-            for shuttle_id, route in enumerate(routes, start=0):
-                # Exclude the HQ (node 0) from assignment
-                employee_indices = route[1:]
-                assigned_employees = [employee_ids[idx - 1] for idx in employee_indices]
-                assigned_routes.append({
-                    "shuttle_id": request.shuttles[shuttle_id].id,
-                    "employees": assigned_employees
-                })
-            
-            return {
-                "success": True,
-                "routes": assigned_routes,
-                "verification_passed": verification_passed,
-                "total_demand": num_employees,
-                "total_capacity": sum(shuttle_capacities)
-            }
+                return routes
+
+            objective = None
+            if on_progress is not None:
+                # Priced once in a worker; each improvement reports what it saved
+                [objective] = await solver_pool.run_solver(
+                    assign_routes.plan_costs, locations, [routes]
+                )
+                on_progress(routes, objective)
+            if not request.improve:
+                return routes
+
+            def report(routes, saving):
+                nonlocal objective
+                latest["routes"] = routes
+                if on_progress is not None:
+                    objective -= saving
+                    on_progress(routes, objective)
+
+            # The partitions already spent part of the budget
+            return await lns.improve_routes(
+                locations,
+                routes,
+                shuttle_capacities,
+                time_limit_seconds=min(lns.LNS_TIME_LIMIT_SECONDS,
+                                       time_limit_seconds - (time.monotonic() - started)),
+                on_improvement=report
+            )
+
+        routes = await within_budget(solve_decomposed(), time_limit_seconds)
+        if routes is None:
+            routes = latest["routes"]
+    else:
+        initial_routes = None
+        if request.previous_routes:
+            initial_routes, _ = plan_edits.routes_from_plan(
+                [
+                    {"shuttle_id": route.shuttle_id, "employees": route.employees}
+                    for route in request.previous_routes
+                ],
+                employee_ids,
+                [shuttle.id for shuttle in request.shuttles],
+                shuttle_capacities
+            )
+            if stop_groups is not None:
+                initial_routes = merging.merge_routes(initial_routes, stop_groups)
+
+        # Improving plans reach the API process through shared memory
+        board = watcher = None
+        if on_progress is not None:
+            board = progress.ProgressBoard(len(solve_locations) - 1 + len(shuttle_capacities))
+            watcher = asyncio.create_task(progress.watch(
+                board,
+                on_progress,
+                PROGRESS_POLL_SECONDS,
+                transform=(lambda routes: merging.expand_routes(routes, stop_groups))
+                if stop_groups is not None else None
+            ))
+        # Search parameters tuned offline for this problem size, if profiled
+        tuned_strategy, tuned_time_limit = tuning.select_parameters(len(solve_locations) - 1)
+        if time_limit_seconds is None:
+            time_limit_seconds = tuned_time_limit
+
+        async def solve():
+            if request.portfolio:
+                return await portfolio.solve_portfolio(
+                    solve_locations,
+                    shuttle_capacities,
+                    time_limit_seconds=time_limit_seconds,
+                    initial_routes=initial_routes,
+                    demands=demands,
+                    on_improvement=board.publish if board is not None else None,
+                    distance_store=store,
+                    location_ids=solve_ids
+                )
+            routes = await solver_pool.run_cancellable_solver(
+                assign_routes.solve_shuttle_routes,
+                solve_locations,
+                shuttle_capacities,
+                time_limit_seconds=time_limit_seconds,
+                initial_routes=initial_routes,
+                demands=demands,
+                on_improvement=board.publish if board is not None else None,
+                strategy=tuned_strategy,
+                distance_store=store,
+                location_ids=solve_ids
+            )
+            if tuned_strategy is None:
+                return routes, assign_routes.DEFAULT_STRATEGY
+            return routes, tuning.strategy_name(tuned_strategy)
+
+        try:
+            routes, strategy = await within_budget(solve(), time_limit_seconds) or (None, None)
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+                await asyncio.gather(watcher, return_exceptions=True)
+                board.release()
+
+    engine = "ortools"
+    if routes is None:
+        # OR-Tools found no plan in time; fall back to a NumPy construction
+        engine, strategy = "fallback", None
+        routes = await solver_pool.run_solver(
+            heuristics.fallback_routes, solve_locations, shuttle_capacities, demands
+        )
+        if routes is None:
+            raise HTTPException(status_code=400, detail="Not enough shuttle capacity for every employee")
+
+    stop_routes = None
+    if routes and stop_groups is not None:
+        stop_routes = routes
+        routes = merging.expand_routes(stop_routes, stop_groups)
 
-        # Set and run the new task
-        current_task = asyncio.create_task(process_request())
-        result = await current_task
-        return result
-        
+    # Verify assignments
+    num_employees = len(employee_ids)
+    verification_passed = assign_routes.verify_unique_assignments(routes, num_employees)
+
+    # Map routes to employee IDs
+    assigned_routes = routes_response(request, routes)
+
+    # Each shared stop lists the employees who walk to it
+    route_fields = [{} for _ in routes]
+    if stop_routes is not None:
+        route_fields = [
+            {"stops": [
+                {
+                    "latitude": solve_locations[stop][0],
+                    "longitude": solve_locations[stop][1],
+                    "employees": [employee_ids[node - 1] for node in stop_groups[stop - 1]]
+                }
+                for stop in route[1:]
+            ]}
+            for route in stop_routes
+        ]
+
+    # Routes are kept per shuttle capacity so the plan can be handed
+    # to any request with the same fleet make-up
+    plan = {
+        "response": {
+            "success": True,
+            "verification_passed": verification_passed,
+            "total_demand": num_employees,
+            "total_capacity": sum(shuttle_capacities),
+            "engine": engine,
+            "strategy": strategy
+        },
+        "routes": [
+            (capacity, route["employees"], fields)
+            for capacity, route, fields in zip(shuttle_capacities, assigned_routes, route_fields)
+        ]
+    }
+    # A fallback plan is not cached, so the next identical request retries OR-Tools
+    if verification_passed and engine == "ortools":
+        result_cache.put(request_cache_key(request), plan)
+    return plan
+
+@app.post("/clustering")
+async def assign_routes_endpoint(request: RouteRequest, http_request: Request,
+                                 background_tasks: BackgroundTasks):
+    # Validate input data
+    response = empty_request_response(request)
+    if response is not None:
+        return response
+
+    cache_key = request_cache_key(request)
+    cached_plan = result_cache.get(cache_key)
+    if cached_plan is not None:
+        return plan_response(request, cached_plan, cached=True)
+
+    try:
+        if request.instant_ms:
+            return await instant_plan(request)
+
+        async def process_request(job: jobs.Job):
+            return await plan_routes(request)
+
+        key = jobs.job_key(request.organization_id, request.shift_id)
+
+        async def solve():
+            return await job_registry.wait(job_registry.submit(key, process_request))
+
+        # Concurrent identical requests for the same organization/shift attach
+        # to the one in-flight solve, so supersession still applies per key
+        waiter = asyncio.ensure_future(in_flight.do((cache_key, key), solve))
+        watcher = asyncio.create_task(cancel_on_disconnect(http_request, waiter))
+        try:
+            plan = await waiter
+        except asyncio.CancelledError:
+            if watcher.done() and watcher.result():
+                # Client closed the connection; nobody is waiting for this response
+                raise HTTPException(status_code=499, detail="Request cancelled")
+            raise
+        finally:
+            watcher.cancel()
+            await asyncio.gather(watcher, return_exceptions=True)
+        return plan_response(request, plan, cached=False)
+
+    except jobs.JobSupersededError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except jobs.JobCancelledError as e:
+        # Client closed the connection; nobody is waiting for this response
+        raise HTTPException(status_code=499, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def instant_plan(request: RouteRequest):
+    """
+    Answers within request.instant_ms while the solve goes on as a retained job.
+
+    A sweep plan is built straight away in the API process and handed out as
+    version 1 of the job's plan; the solver's improving plans then take later
+    versions. Whichever plan is newest at the deadline is returned, along with
+    the job ID to fetch better ones from /jobs.
+    """
+    deadline = time.monotonic() + request.instant_ms / 1000
+    job = job_registry.submit(
+        jobs.job_key(request.organization_id, request.shift_id),
+        lambda job: run_plan_job(request, job),
+        retain=True
+    )
+
+    locations = request_locations(request)
+    routes = heuristics.sweep_routes(locations, [shuttle.capacity for shuttle in request.shuttles])
+    if routes is not None:
+        # Pricing the plan can mean road searches, so it runs in a worker
+        # and the plan is handed out once its objective is known
+        pricing = asyncio.ensure_future(
+            solver_pool.run_solver(assign_routes.plan_costs, locations, [routes])
+        )
+
+        def publish(pricing):
+            if pricing.cancelled() or pricing.exception() is not None or job.task.done():
+                return
+            interim_plan(request, job, routes, pricing.result()[0])
+        pricing.add_done_callback(publish)
+
+    await asyncio.wait({job.task}, timeout=max(0.0, deadline - time.monotonic()))
+    if job.task.done() or job.best_plan is None:
+        # Nothing feasible to hand out early; wait for the solver
+        return dict(await job_registry.wait(job), job_id=job.id)
+    return dict(job.best_plan, job_id=job.id, cached=False)
+
+def server_sent_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/clustering/stream")
+async def stream_routes_endpoint(request: RouteRequest):
+    """
+    Streams the improving plans of a solve as Server-Sent Events.
+
+    Each improvement is sent as a "solution" event with its objective, the
+    elapsed milliseconds and the routes; the final plan follows as a "result"
+    event in the /clustering response shape. Closing the stream stops the solve.
+    """
+    response = empty_request_response(request)
+    cached_plan = None
+    if response is None:
+        cached_plan = result_cache.get(request_cache_key(request))
+        if cached_plan is not None:
+            response = plan_response(request, cached_plan, cached=True)
+
+    async def events():
+        if response is not None:
+            yield server_sent_event("result", response)
+            return
+
+        started = time.monotonic()
+        updates = asyncio.Queue()
+
+        def on_progress(routes, objective):
+            updates.put_nowait({
+                "objective": objective,
+                "elapsed_ms": int((time.monotonic() - started) * 1000),
+                "routes": routes_response(request, routes)
+            })
+
+        async def process_request(job: jobs.Job):
+            return await plan_routes(request, on_progress)
+
+        job = job_registry.submit(
+            jobs.job_key(request.organization_id, request.shift_id), process_request
+        )
+        update = None
+        try:
+            while not job.task.done():
+                update = asyncio.ensure_future(updates.get())
+                await asyncio.wait({update, job.task}, return_when=asyncio.FIRST_COMPLETED)
+                if update.done():
+                    yield server_sent_event("solution", update.result())
+                else:
+                    update.cancel()
+            while not updates.empty():
+                yield server_sent_event("solution", updates.get_nowait())
+            plan = await job_registry.wait(job)
+            yield server_sent_event("result", plan_response(request, plan, cached=False))
+        except jobs.JobSupersededError as e:
+            yield server_sent_event("error", {"status_code": 409, "detail": str(e)})
+        except HTTPException as e:
+            yield server_sent_event("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            yield server_sent_event("error", {"status_code": 500, "detail": str(e)})
+        finally:
+            # The client went away or the stream failed: stop the solve
+            job.cancel()
+            if update is not None:
+                update.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+def job_status(job: jobs.Job):
+    return {
+        "job_id": job.id,
+        "status": job.status.value,
+        "objective": job.objective,
+        "plan_version": job.plan_version,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+
+def find_job(job_id):
+    job = job_registry.get(job_id)
+    if job is None or not job.retain:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+def interim_plan(request: RouteRequest, job: jobs.Job, routes, objective):
+    """Hands out an unverified plan found while the job runs as the job's next version."""
+    if job.objective is not None and objective >= job.objective:
+        # The solver's first plans can be worse than the instant sweep plan
+        return
+    job.objective = objective
+    job.plan_version += 1
+    job.best_plan = {
+        "success": True,
+        "routes": routes_response(request, routes),
+        "total_demand": len(request.locations.employees),
+        "total_capacity": sum(shuttle.capacity for shuttle in request.shuttles),
+        "objective": objective,
+        "plan_version": job.plan_version,
+        "final": False
+    }
+
+async def run_plan_job(request: RouteRequest, job: jobs.Job):
+    """
+    Solves a request as a retained job, versioning the plans found on the way.
+
+    Returns:
+        Dict[str, Any]: The final plan in the /clustering response shape.
+    """
+    response = empty_request_response(request)
+    if response is not None:
+        return response
+    # The request was already counted against the cache where it came in
+    cached_plan = result_cache.peek(request_cache_key(request))
+    if cached_plan is None:
+        plan = await plan_routes(
+            request, lambda routes, objective: interim_plan(request, job, routes, objective)
+        )
+    else:
+        plan = cached_plan
+        if plan.get("objective") is None:
+            # Priced once per cached plan, in a worker as it may need road searches
+            [plan["objective"]] = await solver_pool.run_solver(
+                assign_routes.plan_costs, request_locations(request), [plan_node_routes(request, plan)]
+            )
+        job.objective = plan["objective"]
+    job.plan_version += 1
+    return dict(
+        plan_response(request, plan, cached=cached_plan is not None),
+        plan_version=job.plan_version,
+        final=True
+    )
+
+@app.post("/jobs", status_code=202)
+async def submit_job_endpoint(request: RouteRequest):
+    job = job_registry.submit(
+        jobs.job_key(request.organization_id, request.shift_id),
+        lambda job: run_plan_job(request, job),
+        retain=True
+    )
+    return job_status(job)
+
+@app.get("/jobs/{job_id}")
+async def job_status_endpoint(job_id: str, response: Response):
+    job = find_job(job_id)
+    if not job.done():
+        response.headers["Retry-After"] = str(JOB_RETRY_AFTER_SECONDS)
+    return job_status(job)
+
+@app.get("/jobs/{job_id}/result")
+async def job_result_endpoint(job_id: str):
+    job = find_job(job_id)
+    if not job.done():
+        return JSONResponse(
+            status_code=202,
+            content=job_status(job),
+            headers={"Retry-After": str(JOB_RETRY_AFTER_SECONDS)}
+        )
+    if job.status == jobs.JobStatus.FAILED:
+        error = job.task.exception()
+        if isinstance(error, HTTPException):
+            raise error
+        raise HTTPException(status_code=500, detail=str(error))
+    if job.status == jobs.JobStatus.CANCELLED:
+        if job.superseded:
+            raise HTTPException(status_code=409, detail=str(jobs.JobSupersededError(job)))
+        raise HTTPException(status_code=410, detail=str(jobs.JobCancelledError(job)))
+    return job.task.result()
+
+@app.get("/jobs/{job_id}/plan")
+async def job_plan_endpoint(job_id: str):
+    job = find_job(job_id)
+    if job.status == jobs.JobStatus.COMPLETED:
+        return job.task.result()
+    if job.best_plan is None:
+        return JSONResponse(
+            status_code=202,
+            content=job_status(job),
+            headers={"Retry-After": str(JOB_RETRY_AFTER_SECONDS)}
+        )
+    return dict(job.best_plan, job_id=job.id)
+
+@app.delete("/jobs/{job_id}")
+async def delete_job_endpoint(job_id: str):
+    job = find_job(job_id)
+    job_registry.remove(job_id)
+    # Let the cancellation reach the solver before reporting the final status
+    await asyncio.gather(job.task, return_exceptions=True)
+    return job_status(job)
+
+@app.post("/clustering/edit")
+async def edit_routes_endpoint(request: PlanEditRequest):
+    if not request.shuttles:
+        return {
+            "success": False,
+            "message": "At least one shuttle is required for clustering",
+            "routes": []
+        }
+
+    # Removed and moved employees leave their routes; added ones are inserted
+    replaced = set(request.remove) | {emp.id for emp in request.add}
+    employees = [emp for emp in request.locations.employees if emp.id not in replaced]
+    employees += request.add
+
+    locations = [request.locations.HQ] + [[emp.latitude, emp.longitude] for emp in employees]
+    employee_ids = [emp.id for emp in employees]
+    shuttle_ids = [shuttle.id for shuttle in request.shuttles]
+    shuttle_capacities = [shuttle.capacity for shuttle in request.shuttles]
+
+    routes, unplaced = plan_edits.routes_from_plan(
+        [
+            {
+                "shuttle_id": route.shuttle_id,
+                "employees": [employee_id for employee_id in route.employees
+                              if employee_id not in replaced]
+            }
+            for route in request.routes
+        ],
+        employee_ids,
+        shuttle_ids,
+        shuttle_capacities
+    )
+    planned = {route.shuttle_id: len(route.employees) for route in request.routes}
+    touched = {
+        vehicle for vehicle, shuttle_id in enumerate(shuttle_ids)
+        if len(routes[vehicle]) - 1 != planned.get(shuttle_id, 0)
+    }
+
+    # Only arcs next to the inserted employees are ever priced, in a worker
+    # as road distances need shortest-path searches
+    kept = [len(route) for route in routes]
+    routes = await solver_pool.run_solver(
+        plan_edits.insert_cheapest,
+        routes,
+        unplaced,
+        assign_routes.PairwiseCosts(locations),
+        shuttle_capacities
+    )
+    if routes is None:
+        raise HTTPException(status_code=400, detail="Not enough shuttle capacity for the edited plan")
+    touched |= {vehicle for vehicle, route in enumerate(routes) if len(route) != kept[vehicle]}
+
+    if request.repair_time_ms and touched:
+        shuttles = sorted(touched)
+        repaired, saving = await lns.solve_neighbourhood(
+            locations,
+            routes,
+            shuttle_capacities,
+            shuttles,
+            time_limit_seconds=request.repair_time_ms / 1000
+        )
+        if saving > 0:
+            for shuttle, route in zip(shuttles, repaired):
+                routes[shuttle] = route
+
+    return {
+        "success": True,
+        "routes": [
+            {"shuttle_id": shuttle_id, "employees": [employee_ids[node - 1] for node in route[1:]]}
+            for shuttle_id, route in zip(shuttle_ids, routes)
+        ],
+        "verification_passed": assign_routes.verify_unique_assignments(routes, len(employee_ids)),
+        "total_demand": len(employee_ids),
+        "total_capacity": sum(shuttle_capacities)
+    }
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return result_cache.stats()
+
 @app.get("/")
 async def root():
     return {"message": "Route Assignment API is running"}
\ No newline at end of file
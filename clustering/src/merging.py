@@ -0,0 +1,190 @@
+import heapq
+import os
+import numpy as np
+from . import assign_routes, spatial
+
+# Employees closer than this to a group's first member share one pickup
+# node; 0 disables merging
+MERGE_RADIUS_METERS = float(os.getenv("MERGE_RADIUS_METERS", "15"))
+
+
+def group_colocated(locations, radius_meters=MERGE_RADIUS_METERS, max_group_size=None):
+    """
+    Groups employees that live within a radius of each other.
+
+    Employees are visited in order; each one not yet grouped starts a group
+    with the ungrouped employees within the radius, nearest first. A spatial
+    hash keeps every lookup local.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        radius_meters (float): Merge radius.
+        max_group_size (int, optional): Largest group, e.g. the largest
+            shuttle capacity so every group fits in one shuttle.
+
+    Returns:
+        List[List[int]]: Employee nodes of each group, in first-member order.
+    """
+    num_employees = len(locations) - 1
+    if radius_meters <= 0 or num_employees < 2:
+        return [[node] for node in range(1, num_employees + 1)]
+
+    radius = radius_meters / 1000.0
+    points = assign_routes.project_to_plane(locations[1:], origin=locations[0])
+    index = spatial.GridIndex(points, cell_size=radius)
+    grouped = np.zeros(num_employees, dtype=bool)
+    groups = []
+
+    for employee in range(num_employees):
+        if grouped[employee]:
+            continue
+        nearby = index.within(points[employee], radius)
+        nearby = nearby[~grouped[nearby]]
+        distances = np.linalg.norm(points[nearby] - points[employee], axis=1)
+        members = nearby[np.lexsort((nearby, distances))][:max_group_size]
+        grouped[members] = True
+        groups.append((members + 1).tolist())
+
+    return groups
+
+
+def merge_locations(locations, groups):
+    """
+    Collapses each group into one pickup node at its members' centroid.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        groups (List[List[int]]): Output of group_colocated().
+
+    Returns:
+        Tuple[List[List[float]], List[int]]: HQ first, then one location per
+        group, and the demand (member count) of each group.
+    """
+    coords = np.asarray(locations, dtype=np.float64)
+    merged = [list(locations[0])] + [coords[group].mean(axis=0).tolist() for group in groups]
+    return merged, [len(group) for group in groups]
+
+
+def merge_routes(routes, groups):
+    """
+    Maps employee routes onto group nodes.
+
+    A group takes the position of its first member seen; groups whose
+    members are not on any route are left out.
+
+    Args:
+        routes (List[List[int]]): Employee node routes per shuttle.
+        groups (List[List[int]]): Output of group_colocated().
+
+    Returns:
+        List[List[int]]: Group node routes per shuttle.
+    """
+    group_of = {node: g + 1 for g, group in enumerate(groups) for node in group}
+    placed = set()
+    merged = []
+    for route in routes:
+        merged_route = [0]
+        for node in route[1:]:
+            group = group_of.get(node)
+            if group is not None and group not in placed:
+                placed.add(group)
+                merged_route.append(group)
+        merged.append(merged_route)
+    return merged
+
+
+def expand_routes(routes, groups):
+    """
+    Maps group node routes back to employee nodes.
+
+    Args:
+        routes (List[List[int]]): Group node routes per shuttle.
+        groups (List[List[int]]): Output of group_colocated().
+
+    Returns:
+        List[List[int]]: Employee node routes per shuttle.
+    """
+    return [[0] + [node for group in route[1:] for node in groups[group - 1]] for route in routes]
+
+
+def group_ids(ids, groups, prefix="group"):
+    """
+    Distance-store IDs of merged pickup nodes.
+
+    A node shared by several employees is keyed by its members, so the same
+    group is found again on the next request; a lone employee keeps its ID.
+
+    Args:
+        ids (List[str]): IDs of the HQ and each employee node.
+        groups (List[List[int]]): Employee nodes behind each pickup node.
+        prefix (str): Namespace of the group IDs. Stops from place_stops()
+            use their own, as a lone employee's stop may be a neighbour's
+            address rather than their own.
+
+    Returns:
+        List[str]: IDs of the HQ and each pickup node.
+    """
+    return [ids[0]] + [
+        ids[group[0]] if len(group) == 1 and prefix == "group"
+        else f"{prefix}:" + ",".join(sorted(ids[node] for node in group))
+        for group in groups
+    ]
+
+
+def place_stops(locations, walking_radius_meters, max_group_size=None):
+    """
+    Chooses shared pickup stops with a greedy facility-location pass.
+
+    Every employee address is a candidate stop. The candidate that covers
+    the most employees not yet assigned, within walking distance, becomes a
+    stop for them; candidates are re-scored lazily, so each pick only looks
+    at the spatial index around it.
+
+    Args:
+        locations (List[List[float]]): HQ first, then employee [lat, lon] pairs.
+        walking_radius_meters (float): Furthest an employee walks to a stop.
+        max_group_size (int, optional): Most employees served by one stop,
+            e.g. the largest shuttle capacity.
+
+    Returns:
+        Tuple[List[List[int]], List[List[float]]]: Employee nodes of each
+        stop, and each stop's [lat, lon].
+    """
+    num_employees = len(locations) - 1
+    if num_employees == 0:
+        return [], []
+
+    radius = walking_radius_meters / 1000.0
+    points = assign_routes.project_to_plane(locations[1:], origin=locations[0])
+    index = spatial.GridIndex(points, cell_size=radius)
+    coverage = [index.within(point, radius) for point in points]
+    uncovered = np.ones(num_employees, dtype=bool)
+
+    # Max-heap of (-gain, candidate); gains only shrink, so a popped entry
+    # whose gain is still current is the best candidate
+    heap = [(-min(len(nearby), max_group_size or len(nearby)), candidate)
+            for candidate, nearby in enumerate(coverage)]
+    heapq.heapify(heap)
+    groups = []
+    stops = []
+
+    while heap and uncovered.any():
+        negative_gain, candidate = heapq.heappop(heap)
+        nearby = coverage[candidate][uncovered[coverage[candidate]]]
+        gain = min(len(nearby), max_group_size or len(nearby))
+        if gain == 0:
+            continue
+        if gain < -negative_gain:
+            heapq.heappush(heap, (-gain, candidate))
+            continue
+
+        distances = np.linalg.norm(points[nearby] - points[candidate], axis=1)
+        members = nearby[np.lexsort((nearby, distances))][:gain]
+        uncovered[members] = False
+        groups.append((members + 1).tolist())
+        stops.append(list(locations[candidate + 1]))
+        if gain == max_group_size:
+            # The stop is full; it may still serve employees left nearby
+            heapq.heappush(heap, (-gain, candidate))
+
+    return groups, stops
@@ -0,0 +1,116 @@
+import numpy as np
+
+
+def routes_from_plan(plan, employee_ids, shuttle_ids, shuttle_capacities):
+    """
+    Maps a plan in the {shuttle_id, employees} response shape onto node routes.
+
+    Employees no longer in the request, shuttles no longer in the fleet and
+    repeated or over-capacity assignments are dropped; the employees left
+    without a route are returned for re-insertion.
+
+    Args:
+        plan (List[Dict]): Previous routes as {"shuttle_id": ..., "employees": [...]}.
+        employee_ids (List[str]): Current employee IDs; node i + 1 is employee_ids[i].
+        shuttle_ids (List[str]): Current shuttle IDs in fleet order.
+        shuttle_capacities (List[int]): Capacity of each shuttle.
+
+    Returns:
+        Tuple[List[List[int]], List[int]]: Node routes per shuttle (starting at
+        the HQ node 0) and the nodes not placed on any route.
+    """
+    node_of = {employee_id: node for node, employee_id in enumerate(employee_ids, start=1)}
+    vehicle_of = {shuttle_id: vehicle for vehicle, shuttle_id in enumerate(shuttle_ids)}
+    routes = [[0] for _ in shuttle_ids]
+    placed = set()
+
+    for route in plan:
+        vehicle = vehicle_of.get(route["shuttle_id"])
+        if vehicle is None:
+            continue
+        for employee_id in route["employees"]:
+            node = node_of.get(employee_id)
+            if node is None or node in placed:
+                continue
+            if len(routes[vehicle]) - 1 >= shuttle_capacities[vehicle]:
+                break
+            routes[vehicle].append(node)
+            placed.add(node)
+
+    unplaced = [node for node in range(1, len(employee_ids) + 1) if node not in placed]
+    return routes, unplaced
+
+
+def insertion_costs(route, node, cost_matrix):
+    """
+    Extra cost of inserting a node at every position of a route.
+
+    Args:
+        route (List[int]): Node route starting at the HQ node 0.
+        node (int): Node to insert.
+        cost_matrix (array-like): Arc costs indexed by node, e.g. an ndarray
+            or assign_routes.PairwiseCosts.
+
+    Returns:
+        np.ndarray: Cost increase of inserting after route[i], for each i.
+    """
+    stops = np.asarray(route)
+    following = np.asarray(list(route[1:]) + [0])
+    return _insertion_costs(stops, following, node, cost_matrix)
+
+
+def _insertion_costs(stops, following, node, cost_matrix):
+    nodes = np.full(len(stops), node)
+    return (cost_matrix[stops, nodes] + cost_matrix[nodes, following]
+            - cost_matrix[stops, following])
+
+
+def insert_cheapest(routes, nodes, cost_matrix, shuttle_capacities, touched=None, demands=None):
+    """
+    Inserts nodes one by one at their cheapest feasible position.
+
+    Every position on every shuttle with room left is priced in one
+    vectorized lookup per node, so only the arcs next to the inserted node
+    are ever evaluated.
+
+    Args:
+        routes (List[List[int]]): Node routes per shuttle, starting at the HQ.
+        nodes (Iterable[int]): Nodes to insert.
+        cost_matrix (array-like): Arc costs indexed by node, e.g. an ndarray
+            or assign_routes.PairwiseCosts.
+        shuttle_capacities (List[int]): Capacity of each shuttle.
+        touched (set, optional): Receives the indices of shuttles that got a node.
+        demands (List[int], optional): Seats taken by node i + 1; 1 each by default.
+
+    Returns:
+        List[List[int]] | None: New routes, or None if some node does not fit.
+    """
+    if isinstance(cost_matrix, list):
+        cost_matrix = np.asarray(cost_matrix)
+    routes = [list(route) for route in routes]
+
+    def demand(node):
+        return demands[node - 1] if demands is not None else 1
+
+    loads = [sum(demand(node) for node in route[1:]) for route in routes]
+
+    for node in nodes:
+        open_vehicles = [
+            v for v in range(len(routes)) if loads[v] + demand(node) <= shuttle_capacities[v]
+        ]
+        if not open_vehicles:
+            return None
+        stops = np.array([stop for v in open_vehicles for stop in routes[v]])
+        following = np.array([stop for v in open_vehicles for stop in routes[v][1:] + [0]])
+        owners = np.repeat(open_vehicles, [len(routes[v]) for v in open_vehicles])
+        starts = np.cumsum([0] + [len(routes[v]) for v in open_vehicles])
+
+        best = int(np.argmin(_insertion_costs(stops, following, node, cost_matrix)))
+        vehicle = int(owners[best])
+        position = best - int(starts[open_vehicles.index(vehicle)])
+        routes[vehicle].insert(position + 1, node)
+        loads[vehicle] += demand(node)
+        if touched is not None:
+            touched.add(vehicle)
+
+    return routes
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import numpy as np
+from . import assign_routes, merging, solver_pool
+from .shared_arrays import SharedArray
+
+# Strategies raced by portfolio solves, most trusted first; names are keys
+# of assign_routes.SOLVER_STRATEGIES
+PORTFOLIO_STRATEGIES = [
+    name.strip()
+    for name in os.getenv(
+        "SOLVER_PORTFOLIO",
+        "cheapest_arc_gls,christofides_annealing,cheapest_arc_tabu,insertion_gls"
+    ).split(",")
+    if name.strip()
+]
+
+
+def portfolio_strategies(strategies=None):
+    """
+    Picks the strategies a portfolio solve launches.
+
+    Only as many strategies as there are solver workers are raced, so none
+    waits in the pool's queue while the shared deadline runs out.
+
+    Args:
+        strategies (List[str], optional): Candidate names; defaults to
+            PORTFOLIO_STRATEGIES.
+
+    Returns:
+        List[str]: Names of the strategies to launch.
+    """
+    names = [name for name in (strategies or PORTFOLIO_STRATEGIES)
+             if name in assign_routes.SOLVER_STRATEGIES]
+    workers = solver_pool.configured_worker_count()
+    # Without worker processes solves run on threads, which do not queue
+    return names[:workers] if workers else names
+
+
+async def solve_portfolio(locations, shuttle_capacities, time_limit_seconds=None,
+                          initial_routes=None, demands=None, strategies=None,
+                          on_improvement=None, distance_store=None, location_ids=None):
+    """
+    Solves one model with several search strategies at once.
+
+    Each strategy runs solve_shuttle_routes() in its own solver worker under
+    the same time budget, and the cheapest plan wins. The cost matrix is
+    computed once into shared memory and every strategy reads it in place,
+    rather than each worker building its own.
+
+    Args:
+        locations (List[List[float]]): HQ first, then pickup [lat, lon] pairs.
+        shuttle_capacities (List[int]): Capacity of each shuttle.
+        time_limit_seconds (float, optional): Search budget shared by every strategy.
+        initial_routes (List[List[int]], optional): Warm start for every strategy.
+        demands (List[int], optional): Seats taken by node i + 1.
+        strategies (List[str], optional): Strategy names; see portfolio_strategies().
+        on_improvement (Callable, optional): Progress callback, given to the
+            first strategy only so reported objectives keep decreasing.
+        distance_store (distance_store.DistanceStore, optional): Persistent
+            distances and bearings to build the cost matrix from.
+        location_ids (List[str], optional): Store ID of each location, HQ first.
+
+    Returns:
+        Tuple[List[List[int]] | None, str | None]: The cheapest routes and the
+        name of the strategy that found them, or (None, None) if none did.
+    """
+    names = portfolio_strategies(strategies)
+    # Workers merge co-located employees the same way, so the matrix is
+    # built over the nodes they will route
+    model_locations, model_ids = locations, location_ids
+    if demands is None:
+        model_locations, _, groups = assign_routes.merge_model(locations, shuttle_capacities)
+        if groups is not None and location_ids is not None:
+            model_ids = merging.group_ids(location_ids, groups)
+    num_nodes = len(model_locations)
+
+    cost_matrix = None
+    if len(names) > 1:
+        cost_matrix = SharedArray((num_nodes, num_nodes), np.int32)
+    try:
+        if cost_matrix is not None:
+            await solver_pool.run_solver(assign_routes.fill_cost_matrix, model_locations,
+                                         cost_matrix, distance_store, model_ids)
+        return await _race(names, locations, shuttle_capacities, time_limit_seconds,
+                           initial_routes, demands, on_improvement, cost_matrix,
+                           distance_store, location_ids)
+    finally:
+        if cost_matrix is not None:
+            cost_matrix.release()
+
+
+async def _race(names, locations, shuttle_capacities, time_limit_seconds,
+                initial_routes, demands, on_improvement, cost_matrix, distance_store,
+                location_ids):
+    tasks = [
+        asyncio.ensure_future(solver_pool.run_cancellable_solver(
+            assign_routes.solve_shuttle_routes,
+            locations,
+            shuttle_capacities,
+            time_limit_seconds=time_limit_seconds,
+            initial_routes=initial_routes,
+            demands=demands,
+            on_improvement=on_improvement if i == 0 else None,
+            strategy=assign_routes.SOLVER_STRATEGIES[name],
+            cost_matrix=cost_matrix,
+            distance_store=distance_store,
+            location_ids=location_ids
+        ))
+        for i, name in enumerate(names)
+    ]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        # Do not leave the other strategies running after a failure
+        for task in tasks:
+            task.cancel()
+        raise
+
+    # Priced in a worker, as road distances need shortest-path searches
+    costs = await solver_pool.run_solver(assign_routes.plan_costs, locations, results)
+    best = None
+    for name, routes, cost in zip(names, results, costs):
+        if routes is None:
+            continue
+        if best is None or cost < best[0]:
+            best = (cost, routes, name)
+    return (best[1], best[2]) if best is not None else (None, None)
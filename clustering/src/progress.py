@@ -0,0 +1,111 @@
+import asyncio
+import numpy as np
+from .shared_arrays import SharedArray
+
+# Header slots: write sequence, payload length, objective
+_HEADER_SLOTS = 3
+
+
+class ProgressBoard:
+    """
+    Latest improving solution of a running solve, shared with solver workers.
+
+    The solution lives in an int64 SharedArray: a small header followed by
+    the routes flattened, each route starting with its HQ node 0, so a board
+    for E employees and S shuttles needs max_nodes = E + S. Workers overwrite
+    it on every published improvement and the API process polls it, so a
+    reader only ever sees the most recent plan.
+    """
+
+    def __init__(self, max_nodes=None, slots=None):
+        if slots is None:
+            slots = SharedArray((_HEADER_SLOTS + max(1, max_nodes),), np.int64)
+            slots.array[:_HEADER_SLOTS] = 0
+        self._slots = slots
+
+    @property
+    def name(self):
+        return self._slots.name
+
+    def publish(self, routes, objective):
+        """
+        Replaces the board's solution.
+
+        Args:
+            routes (List[List[int]]): Node routes per shuttle, each starting at the HQ.
+            objective (int): Solver objective of the routes.
+        """
+        flat = [node for route in routes for node in route]
+        try:
+            slots = self._slots.array
+        except (TypeError, ValueError):
+            # Already released
+            return
+        if _HEADER_SLOTS + len(flat) > len(slots):
+            # More nodes than the board was sized for
+            return
+        header, payload = slots[:_HEADER_SLOTS], slots[_HEADER_SLOTS:_HEADER_SLOTS + len(flat)]
+        # An odd sequence number marks a write in progress
+        header[0] += 1
+        payload[:] = flat
+        header[1] = len(flat)
+        header[2] = objective
+        header[0] += 1
+
+    def read(self):
+        """
+        Returns the board's solution.
+
+        Returns:
+            Tuple[int, List[List[int]], int] | None: (sequence number, routes,
+            objective), or None if nothing was published yet or a write is
+            in progress.
+        """
+        try:
+            slots = self._slots.array
+        except (TypeError, ValueError):
+            return None
+        sequence = int(slots[0])
+        if sequence == 0 or sequence % 2:
+            return None
+        length = int(slots[1])
+        objective = int(slots[2])
+        flat = slots[_HEADER_SLOTS:_HEADER_SLOTS + length].tolist()
+        if int(slots[0]) != sequence:
+            return None
+
+        routes = []
+        for node in flat:
+            if node == 0:
+                routes.append([0])
+            else:
+                routes[-1].append(node)
+        return sequence, routes, objective
+
+    def release(self):
+        """Closes the board's segment, and unlinks it when called by the creating process."""
+        self._slots.release()
+
+    def __reduce__(self):
+        return (ProgressBoard, (None, self._slots))
+
+
+async def watch(board, on_progress, poll_seconds, transform=None):
+    """
+    Passes every new solution on a board to a callback until cancelled.
+
+    Args:
+        board (ProgressBoard): Board the solver publishes to.
+        on_progress (Callable[[List[List[int]], int], None]): Called with the
+            routes and objective of each new solution.
+        poll_seconds (float): Seconds between reads of the board.
+        transform (Callable, optional): Maps the board's routes before they
+            are passed on, e.g. from shared stops to employees.
+    """
+    seen = 0
+    while True:
+        update = board.read()
+        if update is not None and update[0] != seen:
+            seen, routes, objective = update
+            on_progress(transform(routes) if transform else routes, objective)
+        await asyncio.sleep(poll_seconds)
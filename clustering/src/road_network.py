@@ -0,0 +1,374 @@
+import argparse
+import bz2
+import gzip
+import json
+import os
+import uuid
+import xml.etree.ElementTree as ElementTree
+from collections import OrderedDict
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from . import assign_routes, spatial
+
+# Directory of a road network built by `python -m src.road_network`; unset
+# keeps straight-line haversine distances
+ROAD_NETWORK_DIR = os.getenv("ROAD_NETWORK_DIR")
+# Megabytes of shortest-path rows (4 bytes per network node each) kept in
+# memory per process; one block of searches may take as much again
+ROAD_NETWORK_CACHE_MB = float(os.getenv("ROAD_NETWORK_CACHE_MB", "128"))
+
+# OSM highway types a shuttle can drive on
+DRIVABLE_HIGHWAYS = {
+    "motorway", "trunk", "primary", "secondary", "tertiary", "unclassified",
+    "residential", "living_street", "service", "road",
+    "motorway_link", "trunk_link", "primary_link", "secondary_link", "tertiary_link",
+}
+# Side of the grid cells used to snap locations to the network, in kilometres
+SNAP_CELL_KM = 0.25
+# Snapped locations remembered per process, least recently used first out
+SNAP_CACHE_ENTRIES = 100_000
+# Bytes per network node of one source's search: SciPy's float64 row and
+# its float32 copy
+SEARCH_ROW_BYTES = 8 + 4
+
+_network = None
+
+
+def get_network():
+    """
+    Returns the road network named by ROAD_NETWORK_DIR, loading it on first use.
+
+    Returns:
+        RoadNetwork | None: The network, or None when distances are straight lines.
+    """
+    global _network
+    if _network is None and ROAD_NETWORK_DIR:
+        _network = RoadNetwork(ROAD_NETWORK_DIR)
+    return _network
+
+
+def engine_name():
+    """Names the distance source, e.g. to keep stored distances apart."""
+    network = get_network()
+    return f"road-{network.id}" if network is not None else "haversine"
+
+
+def _open(path):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def read_osm(path):
+    """
+    Reads the drivable road segments of an OSM XML extract.
+
+    Args:
+        path (str): .osm file, optionally .bz2 or .gz compressed. PBF
+            extracts can be converted first, e.g. with `osmium cat`.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: [lat, lon] of every node used by a
+        road, and M x 2 directed segments between those nodes.
+    """
+    coordinates = {}
+    segments = []
+    way_nodes, tags = [], {}
+    with _open(path) as f:
+        for _, element in ElementTree.iterparse(f, events=("end",)):
+            if element.tag == "node":
+                coordinates[element.get("id")] = (float(element.get("lat")),
+                                                  float(element.get("lon")))
+            elif element.tag == "nd":
+                way_nodes.append(element.get("ref"))
+            elif element.tag == "tag":
+                tags[element.get("k")] = element.get("v")
+            elif element.tag == "way":
+                if tags.get("highway") in DRIVABLE_HIGHWAYS and tags.get("access") not in ("no", "private"):
+                    pairs = list(zip(way_nodes, way_nodes[1:]))
+                    oneway = tags.get("oneway")
+                    if oneway == "-1":
+                        pairs = [(b, a) for a, b in pairs]
+                    elif not (oneway in ("yes", "true", "1") or tags.get("junction") == "roundabout"
+                              or tags.get("highway") == "motorway"):
+                        pairs += [(b, a) for a, b in pairs]
+                    segments.extend(pairs)
+                way_nodes, tags = [], {}
+            if element.tag in ("node", "way", "relation"):
+                element.clear()
+
+    segments = [(a, b) for a, b in segments if a in coordinates and b in coordinates and a != b]
+    node_ids = sorted({node for segment in segments for node in segment})
+    index = {node: i for i, node in enumerate(node_ids)}
+    nodes = np.array([coordinates[node] for node in node_ids], dtype=np.float64).reshape(-1, 2)
+    edges = np.array([(index[a], index[b]) for a, b in segments], dtype=np.int64).reshape(-1, 2)
+    return nodes, edges
+
+
+def _csr(num_nodes, sources, targets, weights):
+    order = np.lexsort((targets, sources))
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_nodes), out=offsets[1:])
+    return offsets, targets[order], weights[order]
+
+
+def largest_component(num_nodes, edges):
+    """
+    Nodes of the largest strongly connected component.
+
+    Locations snapped anywhere in it can reach each other, which a stray
+    one-way service road or parking aisle would otherwise break.
+
+    Returns:
+        np.ndarray: Sorted node indices.
+    """
+    sources, targets = edges[:, 0], edges[:, 1]
+    forward = [array.tolist() for array in _csr(num_nodes, sources, targets, targets)[:2]]
+    backward = [array.tolist() for array in _csr(num_nodes, targets, sources, sources)[:2]]
+
+    # Kosaraju: finishing order on the graph, then components on its reverse
+    order, visited = [], np.zeros(num_nodes, dtype=bool)
+    offsets, adjacent = forward
+    for root in range(num_nodes):
+        if visited[root]:
+            continue
+        visited[root] = True
+        stack = [(root, offsets[root])]
+        while stack:
+            node, position = stack[-1]
+            if position < offsets[node + 1]:
+                stack[-1] = (node, position + 1)
+                child = adjacent[position]
+                if not visited[child]:
+                    visited[child] = True
+                    stack.append((child, offsets[child]))
+            else:
+                stack.pop()
+                order.append(node)
+
+    component = np.full(num_nodes, -1)
+    offsets, adjacent = backward
+    label = 0
+    for root in reversed(order):
+        if component[root] >= 0:
+            continue
+        component[root] = label
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for child in adjacent[offsets[node]:offsets[node + 1]]:
+                if component[child] < 0:
+                    component[child] = label
+                    stack.append(child)
+        label += 1
+    if label == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(component == np.argmax(np.bincount(component)))
+
+
+def build_network(osm_path, output_dir):
+    """
+    Preprocesses an OSM extract into the array files RoadNetwork maps.
+
+    Keeps the largest strongly connected part of the drivable roads and
+    writes it in compressed sparse row form: nodes.npy ([lat, lon] per
+    intersection or shape point), offsets.npy, targets.npy and
+    weights.npy (segment lengths in kilometres), plus meta.json.
+
+    Returns:
+        Dict[str, Any]: The network's metadata.
+    """
+    nodes, edges = read_osm(osm_path)
+    keep = largest_component(len(nodes), edges)
+    renumber = np.full(len(nodes), -1)
+    renumber[keep] = np.arange(len(keep))
+    edges = renumber[edges]
+    edges = np.unique(edges[(edges >= 0).all(axis=1)], axis=0)
+    nodes = nodes[keep]
+
+    lengths, _ = assign_routes.calculate_distance_and_bearing_pairs(nodes[edges[:, 0]],
+                                                                   nodes[edges[:, 1]])
+    # Zero-length segments would vanish from a sparse matrix
+    lengths = np.maximum(lengths, 1e-6).astype(np.float32)
+    offsets, targets, weights = _csr(len(nodes), edges[:, 0], edges[:, 1], lengths)
+
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, "nodes.npy"), nodes)
+    np.save(os.path.join(output_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(output_dir, "targets.npy"), targets.astype(np.int32))
+    np.save(os.path.join(output_dir, "weights.npy"), weights)
+    meta = {"id": uuid.uuid4().hex[:12], "source": os.path.basename(osm_path),
+            "nodes": len(nodes), "edges": len(targets)}
+    with open(os.path.join(output_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    return meta
+
+
+class RoadNetwork:
+    """
+    Shortest road distances over a network written by build_network().
+
+    The arrays are memory-mapped, so solver workers share the operating
+    system's copy of the graph. Locations are snapped to their nearest
+    network node, and the distance between two locations is the walk to
+    the road at each end plus the shortest path between their nodes.
+    Shortest paths run from each distinct source node to every node at
+    once with SciPy's Dijkstra, so a many-to-many matrix costs one search
+    per source. Sources are searched in blocks sized to ROAD_NETWORK_CACHE_MB,
+    the most recent rows are cached up to the same budget, and callers only
+    receive the columns of their target nodes. Snapped locations are kept
+    in an LRU of SNAP_CACHE_ENTRIES.
+    """
+
+    def __init__(self, directory):
+        def load(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.id = json.load(f)["id"]
+        self.nodes = load("nodes")
+        self.offsets, self.targets, self.weights = load("offsets"), load("targets"), load("weights")
+        self.origin = np.asarray(self.nodes).mean(axis=0) if len(self.nodes) else np.zeros(2)
+        self.index = spatial.GridIndex(
+            assign_routes.project_to_plane(self.nodes, origin=self.origin), SNAP_CELL_KM
+        )
+        self._matrix = None
+        self._rows = OrderedDict()
+        self._snapped = OrderedDict()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def snap(self, locations):
+        """
+        Nearest network node of each location.
+
+        Args:
+            locations (array-like): ... x 2 [lat, lon] pairs.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Node indices and the straight-line
+            distance in kilometres from each location to its node.
+        """
+        coords = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+        keys = [tuple(point) for point in coords.tolist()]
+        snapped, missing = {}, []
+        for key in dict.fromkeys(keys):
+            if key in self._snapped:
+                snapped[key] = self._snapped[key]
+                self._snapped.move_to_end(key)
+            else:
+                missing.append(key)
+        if missing:
+            points = assign_routes.project_to_plane(missing, origin=self.origin)
+            for key, point in zip(missing, points):
+                snapped[key] = self._snapped[key] = self.index.closest(point)
+            while len(self._snapped) > SNAP_CACHE_ENTRIES:
+                self._snapped.popitem(last=False)
+        nodes = np.array([snapped[key] for key in keys], dtype=np.int64)
+        offsets, _ = assign_routes.calculate_distance_and_bearing_pairs(coords, self.nodes[nodes])
+        return nodes, offsets
+
+    def distances(self, from_locations, to_locations):
+        """
+        Road distances between pairs of locations.
+
+        The inputs broadcast like calculate_distance_and_bearing_pairs(), so
+        a block of matrix rows and a list of arcs are both one call.
+
+        Args:
+            from_locations (array-like): ... x 2 departure [lat, lon] pairs.
+            to_locations (array-like): ... x 2 arrival [lat, lon] pairs.
+
+        Returns:
+            np.ndarray: Distances in kilometres, in the broadcast shape.
+        """
+        origin = np.asarray(from_locations, dtype=np.float64)
+        target = np.asarray(to_locations, dtype=np.float64)
+        shape = np.broadcast_shapes(origin.shape, target.shape)
+        origin = np.broadcast_to(origin, shape).reshape(-1, 2)
+        target = np.broadcast_to(target, shape).reshape(-1, 2)
+
+        # Snap each distinct location once
+        unique_origins, origin_of = np.unique(origin, axis=0, return_inverse=True)
+        unique_targets, target_of = np.unique(target, axis=0, return_inverse=True)
+        origin_nodes, origin_offsets = self.snap(unique_origins)
+        target_nodes, target_offsets = self.snap(unique_targets)
+        from_nodes, to_nodes = origin_nodes[origin_of.ravel()], target_nodes[target_of.ravel()]
+
+        sources, source_of = np.unique(from_nodes, return_inverse=True)
+        targets, target_column = np.unique(to_nodes, return_inverse=True)
+        paths = self.shortest_paths(sources, targets)
+        distance = (origin_offsets[origin_of.ravel()]
+                    + paths[source_of.ravel(), target_column.ravel()].astype(np.float64)
+                    + target_offsets[target_of.ravel()])
+        # Locations sharing a node are closer in a straight line than via it
+        same = from_nodes == to_nodes
+        if same.any():
+            straight, _ = assign_routes.calculate_distance_and_bearing_pairs(origin[same], target[same])
+            distance[same] = straight
+        return distance.reshape(shape[:-1])
+
+    def shortest_paths(self, sources, targets=None):
+        """
+        Shortest distances from some nodes to others.
+
+        Args:
+            sources (array-like): Source node indices.
+            targets (array-like, optional): Target node indices; every node
+                when omitted.
+
+        Returns:
+            np.ndarray: len(sources) x len(targets) float32 distances in kilometres.
+        """
+        columns = slice(None) if targets is None else np.asarray(targets, dtype=np.int64)
+        num_columns = len(self) if targets is None else len(columns)
+        result = np.empty((len(sources), num_columns), dtype=np.float32)
+        positions = {}
+        for position, source in enumerate(sources):
+            positions.setdefault(int(source), []).append(position)
+
+        missing = []
+        for source, rows in positions.items():
+            if source in self._rows:
+                result[rows] = self._rows[source][columns]
+                self._rows.move_to_end(source)
+            else:
+                missing.append(source)
+
+        budget = int(ROAD_NETWORK_CACHE_MB * 2 ** 20)
+        cache_rows = budget // (4 * max(1, len(self)))
+        # Each block's search rows fit the same budget as the cached rows
+        block_size = max(1, budget // (SEARCH_ROW_BYTES * max(1, len(self))))
+        for start in range(0, len(missing), block_size):
+            block = missing[start:start + block_size]
+            for source, row in zip(block, self._search(block)):
+                result[positions[source]] = row[columns]
+                if cache_rows:
+                    # A copy, so evicting it frees the row rather than a view of the block
+                    self._rows[source] = row.copy()
+            while len(self._rows) > cache_rows:
+                self._rows.popitem(last=False)
+        return result
+
+    def _search(self, sources):
+        if self._matrix is None:
+            self._matrix = csr_matrix((self.weights, self.targets, self.offsets),
+                                      shape=(len(self), len(self)))
+        return dijkstra(self._matrix, indices=sources).astype(np.float32)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a road network from an OSM extract.")
+    parser.add_argument("osm", help="OSM XML extract (.osm, .osm.bz2 or .osm.gz)")
+    parser.add_argument("--output", required=True, help="Directory to write the network to")
+    args = parser.parse_args(argv)
+    meta = build_network(args.osm, args.output)
+    print(f"{meta['nodes']} nodes, {meta['edges']} road segments written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class SharedArray:
+    """
+    NumPy array in a shared memory segment, handed to solver workers by name.
+
+    Shared arrays pickle by segment name, shape and dtype and re-attach on
+    the other side, so sending one to a worker costs the same whatever its
+    size. CancellationToken and ProgressBoard are built on them. A worker
+    reads the array in place, but OR-Tools still gets its own copy, e.g. the
+    nested lists RegisterTransitMatrix takes; sharing saves computing the
+    array once per worker and pickling it, not that copy.
+    The creating process unlinks the segment on release(); workers must not
+    hold views of the array past their call.
+    """
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self._owner = name is None
+        if self._owner:
+            size = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._released = False
+
+    @classmethod
+    def copy_of(cls, values, dtype=None):
+        """
+        Creates a shared array holding a copy of some values.
+
+        Args:
+            values (array-like): Data to copy.
+            dtype (np.dtype, optional): Element type; defaults to that of values.
+
+        Returns:
+            SharedArray: The new array, owned by the calling process.
+        """
+        values = np.asarray(values, dtype=dtype)
+        shared = cls(values.shape, values.dtype)
+        shared.array[...] = values
+        return shared
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def array(self):
+        """np.ndarray: View of the segment; raises ValueError once the array is released."""
+        if self._released:
+            raise ValueError("Shared array is released")
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None):
+        return self.array if dtype is None else self.array.astype(dtype)
+
+    def release(self):
+        """Closes the segment, and unlinks it when called by the creating process."""
+        if self._released:
+            return
+        self._released = True
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __reduce__(self):
+        return (SharedArray, (self.shape, self.dtype.str, self.name))
@@ -0,0 +1,96 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from .cancellation import CancellationToken
+
+# Number of solver worker processes. Defaults to one per CPU core; 0 runs
+# solves on a thread in the API process instead (useful for tests/debugging).
+SOLVER_WORKERS_ENV = "SOLVER_WORKERS"
+
+_executor = None
+
+
+def configured_worker_count():
+    """
+    Returns the configured number of solver worker processes.
+
+    Returns:
+        int: Value of SOLVER_WORKERS, or the number of CPU cores if unset.
+    """
+    value = os.getenv(SOLVER_WORKERS_ENV)
+    if value is None or value.strip() == "":
+        return os.cpu_count() or 1
+    return max(0, int(value))
+
+
+def get_executor():
+    """
+    Returns the shared solver process pool, creating it on first use.
+
+    Returns:
+        ProcessPoolExecutor | None: The pool, or None when solves run in-process.
+    """
+    global _executor
+    if _executor is None:
+        workers = configured_worker_count()
+        if workers == 0:
+            return None
+        # Spawned workers do not inherit the event loop or server threads
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+async def run_solver(func, *args):
+    """
+    Runs a CPU-bound solver function without blocking the event loop.
+
+    Args:
+        func (Callable): Picklable module-level function to run.
+        *args: Picklable positional arguments for func.
+
+    Returns:
+        Any: The return value of func.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), func, *args)
+
+
+async def run_cancellable_solver(func, *args, **kwargs):
+    """
+    Runs a solver function that accepts a cancel_token keyword argument.
+
+    If the awaiting task is cancelled (superseded job, client disconnect),
+    the token is set so the worker stops its search and frees its core
+    instead of running to the time limit.
+
+    Args:
+        func (Callable): Picklable module-level function taking cancel_token.
+        *args: Picklable positional arguments for func.
+        **kwargs: Picklable keyword arguments for func.
+
+    Returns:
+        Any: The return value of func.
+    """
+    cancel_token = CancellationToken()
+    try:
+        return await run_solver(
+            functools.partial(func, *args, cancel_token=cancel_token, **kwargs)
+        )
+    except asyncio.CancelledError:
+        cancel_token.cancel()
+        raise
+    finally:
+        cancel_token.release()
+
+
+def shutdown():
+    """Shuts down the solver pool, cancelling solves that have not started."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,155 @@
+import math
+import numpy as np
+
+
+class GridIndex:
+    """
+    Uniform grid over planar points for neighbourhood queries.
+
+    Points are bucketed by the square cell they fall in, so a query only
+    looks at the cells around a point instead of at every other point.
+    """
+
+    def __init__(self, points, cell_size):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.cell_size = float(cell_size)
+        self.origin = self.points.min(axis=0) if len(self.points) else np.zeros(2)
+        self.cells = self.cell_of(self.points)
+        self._cell_bounds = None
+
+        # Bucket point indices by cell via one sort instead of a Python loop
+        order = np.lexsort((self.cells[:, 1], self.cells[:, 0]))
+        sorted_cells = self.cells[order]
+        boundaries = np.flatnonzero(np.any(np.diff(sorted_cells, axis=0) != 0, axis=1)) + 1
+        self.buckets = {
+            tuple(int(c) for c in self.cells[group[0]]): group
+            for group in np.split(order, boundaries) if len(group)
+        }
+
+    def cell_of(self, points):
+        return np.floor((np.asarray(points) - self.origin) / self.cell_size).astype(np.int64)
+
+    def _ring(self, cell, ring):
+        """Indices of the points in the square shell of cells at Chebyshev distance ring."""
+        cx, cy = cell
+        if ring == 0:
+            keys = [(cx, cy)]
+        else:
+            keys = [(cx + dx, cy + dy)
+                    for dx in range(-ring, ring + 1)
+                    for dy in ((-ring, ring) if abs(dx) < ring else range(-ring, ring + 1))]
+        found = [self.buckets[key] for key in keys if key in self.buckets]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def within(self, point, radius):
+        """
+        Indices of the points within a distance of a point.
+
+        Args:
+            point (array-like): (x, y) of the query.
+            radius (float): Search radius, in the points' units.
+
+        Returns:
+            np.ndarray: Indices of matching points, in no particular order.
+        """
+        point = np.asarray(point, dtype=np.float64)
+        cell = tuple(int(c) for c in self.cell_of(point))
+        rings = max(0, math.ceil(radius / self.cell_size))
+        candidates = np.concatenate(
+            [self._ring(cell, ring) for ring in range(rings + 1)]
+        ).astype(np.int64)
+        distances = np.linalg.norm(self.points[candidates] - point, axis=1)
+        return candidates[distances <= radius]
+
+    def closest(self, point):
+        """
+        Index of the indexed point nearest to any point.
+
+        Args:
+            point (array-like): (x, y) of the query; need not be indexed.
+
+        Returns:
+            int: Index of the nearest point, or -1 if nothing is indexed.
+        """
+        if not len(self.points):
+            return -1
+        if self._cell_bounds is None:
+            self._cell_bounds = np.stack([self.cells.min(axis=0), self.cells.max(axis=0)])
+        point = np.asarray(point, dtype=np.float64)
+        cell = self.cell_of(point)
+        # Past this ring every non-empty cell has been searched
+        last_ring = int(np.abs(cell - self._cell_bounds).max())
+        cell = tuple(int(c) for c in cell)
+        best, best_distance = -1, np.inf
+        for ring in range(last_ring + 1):
+            found = self._ring(cell, ring)
+            if len(found):
+                distances = np.linalg.norm(self.points[found] - point, axis=1)
+                nearest = int(np.argmin(distances))
+                if distances[nearest] < best_distance:
+                    best, best_distance = int(found[nearest]), float(distances[nearest])
+            # Unsearched cells are at least ring * cell_size away
+            if best_distance <= ring * self.cell_size:
+                break
+        return best
+
+    def nearest(self, index, k):
+        """
+        The k nearest other points of one indexed point.
+
+        Grows the search ring by ring until the k-th candidate is closer
+        than any point in the cells not yet searched.
+
+        Args:
+            index (int): Index of the query point.
+            k (int): Number of neighbours.
+
+        Returns:
+            np.ndarray: Indices of up to k neighbours, nearest first.
+        """
+        k = min(k, len(self.points) - 1)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        point = self.points[index]
+        cell = tuple(int(c) for c in self.cells[index])
+        candidates = []
+        count = 0
+        ring = 0
+        while True:
+            found = self._ring(cell, ring)
+            candidates.append(found)
+            count += len(found)
+            if count > k:
+                pool = np.concatenate(candidates)
+                pool = pool[pool != index]
+                distances = np.linalg.norm(self.points[pool] - point, axis=1)
+                nearest = np.argsort(distances, kind="stable")[:k]
+                # Unsearched cells are at least ring * cell_size away
+                if len(nearest) == k and distances[nearest[-1]] <= ring * self.cell_size:
+                    return pool[nearest]
+            ring += 1
+
+
+def nearest_neighbours(points, k):
+    """
+    k nearest neighbours of every point, using a grid sized to the point density.
+
+    Args:
+        points (array-like): N x 2 planar coordinates, e.g. from
+            assign_routes.project_to_plane().
+        k (int): Neighbours per point; capped at N - 1.
+
+    Returns:
+        np.ndarray: N x min(k, N - 1) neighbour indices, nearest first.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    num_points = len(points)
+    k = max(0, min(k, num_points - 1))
+    if k == 0:
+        return np.empty((num_points, 0), dtype=np.int64)
+
+    # About k points per cell on a uniform spread
+    extent = float(np.ptp(points, axis=0).max())
+    cell_size = extent * math.sqrt(k / num_points) if extent > 0 else 1.0
+    index = GridIndex(points, cell_size)
+    return np.array([index.nearest(i, k) for i in range(num_points)], dtype=np.int64)
@@ -0,0 +1,279 @@
+import argparse
+import glob
+import json
+import os
+import time
+import numpy as np
+from ortools.constraint_solver import routing_enums_pb2
+from . import assign_routes
+
+# Path of the tuned parameter profile loaded at startup; unset keeps the
+# built-in default strategy and time budget
+SOLVER_PROFILE_ENV = "SOLVER_PROFILE"
+
+# A configuration counts as good enough when its mean cost is within this
+# fraction of the best configuration's on the same instances
+TUNING_TOLERANCE = 0.01
+
+DEFAULT_BUCKETS = [100, 300, 1000]
+DEFAULT_LAMBDAS = [0.1, 0.3, 0.5]
+DEFAULT_TIME_LIMITS = [1.0, 3.0, 10.0]
+
+_profile = None
+
+
+def strategy_name(strategy):
+    """
+    Names a search configuration for responses and logs.
+
+    Returns:
+        str: Its key in SOLVER_STRATEGIES, or "first_solution/metaheuristic/lambda".
+    """
+    for name, params in assign_routes.SOLVER_STRATEGIES.items():
+        if params == strategy:
+            return name
+    return f"{strategy['first_solution']}/{strategy['metaheuristic']}/{strategy['gls_lambda']}"
+
+
+def load_profile(path):
+    """
+    Reads a profile written by tune().
+
+    Args:
+        path (str): Path of the JSON profile.
+
+    Returns:
+        List[Dict[str, Any]]: Buckets ordered by size, each with
+        "max_employees" (None for the last), "strategy" and "time_limit_seconds".
+    """
+    with open(path) as f:
+        buckets = json.load(f)["buckets"]
+    for bucket in buckets:
+        strategy = bucket["strategy"]
+        # Fail at startup rather than on the first request
+        if not (hasattr(routing_enums_pb2.FirstSolutionStrategy, strategy["first_solution"])
+                and hasattr(routing_enums_pb2.LocalSearchMetaheuristic, strategy["metaheuristic"])):
+            raise ValueError(f"Unknown search strategy in {path}: {strategy}")
+    return sorted(buckets, key=lambda b: float("inf") if b["max_employees"] is None
+                  else b["max_employees"])
+
+
+def get_profile():
+    """
+    Returns the profile named by SOLVER_PROFILE, loading it on first use.
+
+    Returns:
+        List[Dict[str, Any]]: The profile's buckets; empty without a profile.
+    """
+    global _profile
+    if _profile is None:
+        path = os.getenv(SOLVER_PROFILE_ENV)
+        _profile = load_profile(path) if path else []
+    return _profile
+
+
+def select_parameters(num_employees, profile=None):
+    """
+    Picks the tuned search configuration for a problem size.
+
+    Args:
+        num_employees (int): Pickup nodes in the model.
+        profile (List[Dict], optional): Buckets; defaults to get_profile().
+
+    Returns:
+        Tuple[Dict[str, Any] | None, float | None]: The strategy and time
+        budget of the first bucket the size fits, or (None, None).
+    """
+    profile = get_profile() if profile is None else profile
+    for bucket in profile:
+        if bucket["max_employees"] is None or num_employees <= bucket["max_employees"]:
+            return bucket["strategy"], bucket["time_limit_seconds"]
+    return None, None
+
+
+def synthetic_locations(num_employees, rng):
+    """
+    Scatters employees uniformly around an Addis Ababa HQ.
+
+    Returns:
+        List[List[float]]: The HQ, then each employee's [lat, lon].
+    """
+    employees = rng.uniform([8.9, 38.6], [9.15, 38.95], size=(num_employees, 2))
+    return [[9.0222, 38.7468]] + employees.tolist()
+
+
+def synthetic_instance(num_employees, rng):
+    """
+    Builds a random shift around an Addis Ababa HQ with a mixed fleet.
+
+    Returns:
+        Tuple[List[List[float]], List[int]]: Locations (HQ first) and capacities.
+    """
+    capacities = [10, 15, 20, 25] * (num_employees // 40 + 1)
+    return synthetic_locations(num_employees, rng), capacities
+
+
+def load_corpus(pattern):
+    """
+    Reads recorded /clustering request bodies.
+
+    Args:
+        pattern (str): Glob of JSON files.
+
+    Returns:
+        List[Tuple[List[List[float]], List[int]]]: (locations, capacities) per request.
+    """
+    instances = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path) as f:
+            request = json.load(f)
+        locations = [request["locations"]["HQ"]] + [
+            [emp["latitude"], emp["longitude"]] for emp in request["locations"]["employees"]
+        ]
+        instances.append((locations, [shuttle["capacity"] for shuttle in request["shuttles"]]))
+    return instances
+
+
+def candidate_strategies(lambdas):
+    """Every SOLVER_STRATEGIES pairing, with each GLS lambda for GLS ones."""
+    candidates = []
+    seen = set()
+    for params in assign_routes.SOLVER_STRATEGIES.values():
+        values = lambdas if params["metaheuristic"] == "GUIDED_LOCAL_SEARCH" else [params["gls_lambda"]]
+        for gls_lambda in values:
+            strategy = dict(params, gls_lambda=gls_lambda)
+            key = tuple(sorted(strategy.items()))
+            if key not in seen:
+                seen.add(key)
+                candidates.append(strategy)
+    return candidates
+
+
+def tune_bucket(instances, strategies, time_limits, tolerance=TUNING_TOLERANCE, log=print):
+    """
+    Grid-searches one size bucket for the fastest configuration near the best.
+
+    Every strategy runs every instance at every time limit. Costs are
+    normalised by the best cost found for each instance, and the cheapest
+    (time limit, strategy) whose mean gap is within tolerance of the best
+    mean gap wins; shorter time limits are preferred.
+
+    Instances with no finite, non-zero best cost are logged and left out.
+
+    Returns:
+        Dict[str, Any] | None: {"strategy", "time_limit_seconds", "gap"} of the
+        winner, or None if no instance could be compared.
+    """
+    results = {}
+    for time_limit in time_limits:
+        for s, strategy in enumerate(strategies):
+            costs = []
+            for locations, capacities in instances:
+                routes = assign_routes.solve_shuttle_routes(
+                    locations, capacities, time_limit_seconds=time_limit, strategy=strategy
+                )
+                if routes is None:
+                    costs.append(np.inf)
+                else:
+                    costs.append(assign_routes.calculate_route_cost(
+                        routes, assign_routes.PairwiseCosts(locations)
+                    ))
+            results[time_limit, s] = np.array(costs, dtype=np.float64)
+            log(f"  {time_limit:>5}s {strategy_name(strategy):<50} {np.mean(costs):.0f}")
+
+    best_costs = np.min(np.stack(list(results.values())), axis=0)
+    # Gaps are undefined on instances nothing solved (e.g. a recorded request
+    # with too little capacity) or whose best plan costs nothing
+    usable = np.isfinite(best_costs) & (best_costs > 0)
+    for i in np.flatnonzero(~usable):
+        log(f"  skipping instance {i} ({len(instances[i][0]) - 1} employees): "
+            f"best cost {best_costs[i]}")
+    if not usable.any():
+        return None
+    gaps = {
+        key: float(np.mean(costs[usable] / best_costs[usable] - 1))
+        for key, costs in results.items()
+    }
+    best_gap = min(gaps.values())
+    time_limit, s = min(
+        (key for key, gap in gaps.items() if gap <= best_gap + tolerance),
+        key=lambda key: (key[0], gaps[key])
+    )
+    return {"strategy": strategies[s], "time_limit_seconds": time_limit, "gap": gaps[time_limit, s]}
+
+
+def tune(instances, buckets=DEFAULT_BUCKETS, lambdas=DEFAULT_LAMBDAS,
+         time_limits=DEFAULT_TIME_LIMITS, log=print):
+    """
+    Builds a profile mapping problem-size buckets to tuned search parameters.
+
+    Args:
+        instances (List[Tuple[List[List[float]], List[int]]]): (locations,
+            capacities) to tune on.
+        buckets (List[int]): Upper employee counts of the buckets; larger
+            instances fall in a final open-ended bucket.
+        lambdas (List[float]): GLS penalty factors to try.
+        time_limits (List[float]): Search budgets to try, in seconds.
+
+    Returns:
+        Dict[str, Any]: The profile, ready to be written as JSON.
+    """
+    strategies = candidate_strategies(lambdas)
+    bounds = sorted(buckets) + [None]
+    profile = []
+    lower = 0
+    for upper in bounds:
+        members = [
+            (locations, capacities) for locations, capacities in instances
+            if len(locations) - 1 > lower and (upper is None or len(locations) - 1 <= upper)
+        ]
+        lower = upper
+        if not members:
+            continue
+        log(f"Bucket up to {upper or 'any'} employees: {len(members)} instances")
+        started = time.monotonic()
+        tuned = tune_bucket(members, strategies, time_limits, log=log)
+        if tuned is None:
+            log("  -> no instance solved; bucket left untuned")
+            continue
+        log(f"  -> {strategy_name(tuned['strategy'])} at {tuned['time_limit_seconds']}s "
+            f"({time.monotonic() - started:.0f}s)")
+        profile.append(dict(tuned, max_employees=upper))
+    return {"buckets": profile}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune solver parameters per problem size.")
+    parser.add_argument("--output", required=True, help="Path of the profile to write")
+    parser.add_argument("--corpus", help="Glob of recorded /clustering request JSON files")
+    parser.add_argument("--sizes", default="50,200,600,1500",
+                        help="Employee counts of synthetic instances, without --corpus")
+    parser.add_argument("--instances", type=int, default=3,
+                        help="Synthetic instances per size")
+    parser.add_argument("--buckets", default=",".join(map(str, DEFAULT_BUCKETS)))
+    parser.add_argument("--lambdas", default=",".join(map(str, DEFAULT_LAMBDAS)))
+    parser.add_argument("--time-limits", default=",".join(map(str, DEFAULT_TIME_LIMITS)))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        instances = load_corpus(args.corpus)
+    else:
+        rng = np.random.default_rng(args.seed)
+        instances = [
+            synthetic_instance(int(size), rng)
+            for size in args.sizes.split(",") for _ in range(args.instances)
+        ]
+
+    profile = tune(
+        instances,
+        buckets=[int(b) for b in args.buckets.split(",")],
+        lambdas=[float(x) for x in args.lambdas.split(",")],
+        time_limits=[float(x) for x in args.time_limits.split(",")],
+    )
+    with open(args.output, "w") as f:
+        json.dump(profile, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
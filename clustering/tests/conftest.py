@@ -0,0 +1,22 @@
+import os
+import numpy as np
+import pytest
+
+# Unit tests solve on a thread in the test process so that patches applied to
+# src.assign_routes are visible to the solver. The process pool itself is
+# exercised explicitly in test_solver_pool.py.
+os.environ.setdefault("SOLVER_WORKERS", "0")
+
+
+def random_locations(num_employees, seed=0):
+    """HQ first, then employees scattered over the city; shared by the solver tests"""
+    from src.tuning import synthetic_locations
+    return synthetic_locations(num_employees, np.random.default_rng(seed))
+
+
+@pytest.fixture(autouse=True)
+def clear_result_cache():
+    """Keep cached plans from leaking between tests"""
+    from src.main import result_cache
+    result_cache.clear()
+    yield
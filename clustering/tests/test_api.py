@@ -1,7 +1,9 @@
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 import json
+from src import plan_edits
 from src.main import app
 
 
@@ -52,6 +54,7 @@ class TestClusteringEndpoint:
         assert "verification_passed" in data
         assert "total_demand" in data
         assert "total_capacity" in data
+        assert data["engine"] == "ortools"
 
     def test_clustering_no_shuttles(self):
         """Test clustering with no shuttles"""
@@ -92,12 +95,93 @@ class TestClusteringEndpoint:
 
     @patch('src.main.assign_routes.assign_employees_to_shuttles')
     def test_clustering_algorithm_failure(self, mock_assign):
-        """Test handling of algorithm failure"""
+        """Test a failed solve is answered by the fallback engine"""
         mock_assign.return_value = None  # Simulate no solution found
 
         response = self.client.post("/clustering", json=self.valid_request)
 
-        assert response.status_code == 500
+        assert response.status_code == 200
+        data = response.json()
+        assert data["engine"] == "fallback"
+        assert data["verification_passed"] is True
+
+    def test_fallback_plan_is_not_cached(self):
+        """Test the request after a failed solve is solved by OR-Tools again"""
+        with patch('src.main.assign_routes.assign_employees_to_shuttles', return_value=None):
+            first = self.client.post("/clustering", json=self.valid_request)
+
+        second = self.client.post("/clustering", json=self.valid_request)
+
+        assert first.json()["engine"] == "fallback"
+        assert second.json()["engine"] == "ortools"
+        assert second.json()["cached"] is False
+
+    def test_clustering_with_portfolio(self):
+        """Test a portfolio solve reports the winning strategy"""
+        from src.assign_routes import SOLVER_STRATEGIES
+        request_data = dict(self.valid_request, portfolio=True)
+
+        response = self.client.post("/clustering", json=request_data)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["engine"] == "ortools"
+        assert data["strategy"] in SOLVER_STRATEGIES
+        assert data["verification_passed"] is True
+
+    def test_clustering_fills_organization_distance_store(self, tmp_path):
+        """Test an organization's distances are stored and reused"""
+        request = dict(self.valid_request, organization_id="org1")
+
+        with patch('src.distance_store.DISTANCE_STORE_DIR', str(tmp_path)):
+            first = self.client.post("/clustering", json=request)
+            with patch('src.assign_routes.calculate_cost_matrix') as compute:
+                second = self.client.post("/clustering", json=dict(request, time_budget_ms=900))
+                compute.assert_not_called()
+
+        assert first.status_code == second.status_code == 200
+        assert second.json()["cached"] is False
+        assert first.json()["routes"] == second.json()["routes"]
+        assert len(list(tmp_path.iterdir())) == 1
+
+    @patch('src.main.assign_routes.solve_shuttle_routes')
+    def test_clustering_with_tuned_profile(self, mock_solve):
+        """Test a loaded profile picks the strategy and budget by problem size"""
+        mock_solve.return_value = [[0, 1], [0, 2]]
+        tuned = {"first_solution": "SAVINGS", "metaheuristic": "TABU_SEARCH", "gls_lambda": 0.5}
+        profile = [{"max_employees": 10, "strategy": tuned, "time_limit_seconds": 2.0}]
+
+        with patch('src.tuning._profile', profile):
+            response = self.client.post("/clustering", json=self.valid_request)
+
+        assert response.json()["strategy"] == "SAVINGS/TABU_SEARCH/0.5"
+        assert mock_solve.call_args.kwargs["strategy"] == tuned
+        assert mock_solve.call_args.kwargs["time_limit_seconds"] == 2.0
+
+    def test_clustering_without_capacity(self):
+        """Test a fleet too small for every employee is a client error"""
+        request_data = dict(self.valid_request, shuttles=[{"id": "shuttle1", "capacity": 1}])
+
+        response = self.client.post("/clustering", json=request_data)
+
+        assert response.status_code == 400
+
+    def test_clustering_over_budget_falls_back(self):
+        """Test a solve running past its budget is abandoned for the fallback plan"""
+        import time
+
+        def hung_solve(locations, shuttle_capacities, cancel_token=None, **kwargs):
+            while not cancel_token.is_cancelled():
+                time.sleep(0.01)
+            return None
+
+        request_data = dict(self.valid_request, time_budget_ms=50)
+        with patch('src.main.FALLBACK_GRACE_SECONDS', 0.1), \
+                patch('src.main.assign_routes.solve_shuttle_routes', hung_solve):
+            response = self.client.post("/clustering", json=request_data)
+
+        assert response.status_code == 200
+        assert response.json()["engine"] == "fallback"
 
     @patch('src.main.assign_routes.assign_employees_to_shuttles')
     def test_clustering_with_algorithm_response(self, mock_assign):
@@ -116,6 +200,143 @@ class TestClusteringEndpoint:
             assert len(data["routes"]) == 2
             assert data["verification_passed"] is True
 
+    @patch('src.main.assign_routes.solve_shuttle_routes')
+    def test_clustering_time_budget(self, mock_solve):
+        """Test the latency budget is passed to the solver"""
+        mock_solve.return_value = [[0, 1], [0, 2]]
+        request_data = dict(self.valid_request, time_budget_ms=250)
+
+        response = self.client.post("/clustering", json=request_data)
+
+        assert response.status_code == 200
+        assert mock_solve.call_args.kwargs["time_limit_seconds"] == 0.25
+
+    @patch('src.main.assign_routes.solve_shuttle_routes')
+    def test_clustering_with_previous_routes(self, mock_solve):
+        """Test a previous plan is passed to the solver as node routes"""
+        mock_solve.return_value = [[0, 2, 1], [0]]
+        request_data = dict(self.valid_request, previous_routes=[
+            {"shuttle_id": "shuttle1", "employees": ["emp2", "removed"]},
+            {"shuttle_id": "shuttle2", "employees": []},
+        ])
+
+        response = self.client.post("/clustering", json=request_data)
+
+        assert response.status_code == 200
+        assert mock_solve.call_args.kwargs["initial_routes"] == [[0, 2], [0]]
+        assert response.json()["routes"][0]["employees"] == ["emp2", "emp1"]
+
+    def test_clustering_with_decomposition(self):
+        """Test a partitioned solve keeps the response shape"""
+        request_data = dict(self.valid_request, decomposition="sector")
+
+        response = self.client.post("/clustering", json=request_data)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["verification_passed"] is True
+        assert [route["shuttle_id"] for route in data["routes"]] == ["shuttle1", "shuttle2"]
+
+    def test_decomposition_leaves_lns_the_remaining_budget(self):
+        """Test large-neighbourhood search only gets what the partitions left"""
+        async def slow_partitioned(*args, **kwargs):
+            await asyncio.sleep(0.3)
+            return [[0, 1, 2], [0]]
+
+        request_data = dict(self.valid_request, decomposition="sector", time_budget_ms=1000)
+        with patch('src.main.decomposition.solve_partitioned', side_effect=slow_partitioned), \
+                patch('src.main.lns.improve_routes', new_callable=AsyncMock,
+                      return_value=[[0, 1, 2], [0]]) as mock_improve:
+            response = self.client.post("/clustering", json=request_data)
+
+        assert response.status_code == 200
+        assert 0 < mock_improve.call_args.kwargs["time_limit_seconds"] <= 0.7
+
+    def test_decomposition_without_budget_is_bounded(self):
+        """Test partitions and LNS share a budget derived from the shift size"""
+        from src.assign_routes import default_time_limit
+        from src.decomposition import DECOMPOSITION_SOLVE_SHARE
+        request_data = dict(self.valid_request, decomposition="sector")
+
+        with patch('src.main.decomposition.solve_partitioned', new_callable=AsyncMock,
+                   return_value=[[0, 1, 2], [0]]) as mock_partitioned, \
+                patch('src.main.lns.improve_routes', new_callable=AsyncMock,
+                      return_value=[[0, 1, 2], [0]]) as mock_improve:
+            response = self.client.post("/clustering", json=request_data)
+
+        assert response.status_code == 200
+        budget = default_time_limit(2)
+        assert mock_partitioned.call_args.kwargs["time_limit_seconds"] == pytest.approx(
+            budget * DECOMPOSITION_SOLVE_SHARE
+        )
+        assert mock_improve.call_args.kwargs["time_limit_seconds"] <= budget
+
+    def test_decomposition_over_budget_falls_back(self):
+        """Test a partitioned solve running past its budget gets the fallback plan"""
+        async def hung_partitioned(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        request_data = dict(self.valid_request, decomposition="sector", time_budget_ms=50)
+        with patch('src.main.FALLBACK_GRACE_SECONDS', 0.1), \
+                patch('src.main.decomposition.solve_partitioned', side_effect=hung_partitioned):
+            response = self.client.post("/clustering", json=request_data)
+
+        assert response.status_code == 200
+        assert response.json()["engine"] == "fallback"
+
+    def test_decomposition_keeps_partitioned_plan_when_lns_overruns(self):
+        """Test running out of budget while improving keeps the partitioned plan"""
+        async def hung_improve(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        request_data = dict(self.valid_request, decomposition="sector", time_budget_ms=50)
+        with patch('src.main.FALLBACK_GRACE_SECONDS', 0.1), \
+                patch('src.main.decomposition.solve_partitioned', new_callable=AsyncMock,
+                      return_value=[[0, 2, 1], [0]]), \
+                patch('src.main.lns.improve_routes', side_effect=hung_improve):
+            response = self.client.post("/clustering", json=request_data)
+
+        data = response.json()
+        assert data["engine"] == "ortools"
+        assert data["routes"][0]["employees"] == ["emp2", "emp1"]
+
+    def test_clustering_with_shared_stops(self):
+        """Test employees within walking distance share a listed stop"""
+        self.valid_request["locations"]["employees"].append(
+            {"id": "emp3", "latitude": 9.0323, "longitude": 38.7569}
+        )
+        self.valid_request["shuttles"] = [{"id": "shuttle1", "capacity": 3}]
+        self.valid_request["walking_radius_meters"] = 100
+
+        response = self.client.post("/clustering", json=self.valid_request)
+
+        assert response.status_code == 200
+        route = response.json()["routes"][0]
+        assert sorted(route["employees"]) == ["emp1", "emp2", "emp3"]
+        stops = sorted(route["stops"], key=lambda stop: len(stop["employees"]))
+        assert [stop["employees"] for stop in stops] == [["emp2"], ["emp1", "emp3"]]
+        assert stops[1]["latitude"] in (9.0322, 9.0323)
+
+    def test_shared_stops_placed_in_solver_pool(self):
+        """Test stop placement runs off the event loop"""
+        from src import merging, solver_pool
+        self.valid_request["walking_radius_meters"] = 100
+        run_solver = solver_pool.run_solver
+
+        with patch('src.main.solver_pool.run_solver', side_effect=run_solver) as mock_run:
+            response = self.client.post("/clustering", json=self.valid_request)
+
+        assert response.status_code == 200
+        assert mock_run.call_args_list[0].args[0] is merging.place_stops
+
+    def test_clustering_invalid_time_budget(self):
+        """Test a non-positive latency budget is rejected"""
+        request_data = dict(self.valid_request, time_budget_ms=0)
+
+        response = self.client.post("/clustering", json=request_data)
+
+        assert response.status_code == 422
+
     @patch('src.main.assign_routes.assign_employees_to_shuttles')
     def test_clustering_algorithm_exception(self, mock_assign):
         """Test handling of algorithm exceptions"""
@@ -129,6 +350,77 @@ class TestClusteringEndpoint:
         assert "Algorithm failed" in response_data["detail"]
 
 
+class TestStreamingEndpoint:
+    """Test streaming improving plans over Server-Sent Events"""
+
+    def setup_method(self):
+        self.client = TestClient(app)
+        self.valid_request = {
+            "locations": {
+                "HQ": [9.0222, 38.7468],
+                "employees": [
+                    {"id": "emp1", "latitude": 9.0322, "longitude": 38.7568},
+                    {"id": "emp2", "latitude": 9.0422, "longitude": 38.7668},
+                ]
+            },
+            "shuttles": [
+                {"id": "shuttle1", "capacity": 2},
+                {"id": "shuttle2", "capacity": 1}
+            ]
+        }
+
+    def stream_events(self, request_data):
+        response = self.client.post("/clustering/stream", json=request_data)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = []
+        for block in response.text.strip().split("\n\n"):
+            event, data = block.split("\n")
+            events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+        return events
+
+    def test_stream_sends_solutions_then_result(self):
+        import time
+
+        def solve(locations, shuttle_capacities, cancel_token=None, on_improvement=None, **kwargs):
+            on_improvement([[0, 2, 1], [0]], 300)
+            time.sleep(0.3)
+            on_improvement([[0, 1], [0, 2]], 200)
+            time.sleep(0.3)
+            return [[0, 1], [0, 2]]
+
+        with patch('src.main.assign_routes.solve_shuttle_routes', solve):
+            events = self.stream_events(self.valid_request)
+
+        assert [event for event, _ in events] == ["solution", "solution", "result"]
+        first, second = events[0][1], events[1][1]
+        assert first["objective"] == 300
+        assert first["routes"] == [
+            {"shuttle_id": "shuttle1", "employees": ["emp2", "emp1"]},
+            {"shuttle_id": "shuttle2", "employees": []}
+        ]
+        assert second["objective"] == 200
+        assert second["elapsed_ms"] >= first["elapsed_ms"]
+        assert events[2][1]["success"] is True
+        assert events[2][1]["routes"] == second["routes"]
+
+    def test_stream_without_employees(self):
+        request_data = dict(self.valid_request, locations={"HQ": [9.0222, 38.7468], "employees": []})
+
+        events = self.stream_events(request_data)
+
+        assert events == [("result", {"success": True, "message": "No employees to assign", "routes": []})]
+
+    @patch('src.main.assign_routes.solve_shuttle_routes')
+    def test_stream_reports_failure(self, mock_solve):
+        mock_solve.side_effect = RuntimeError("solver crashed")
+
+        events = self.stream_events(self.valid_request)
+
+        assert events[-1][0] == "error"
+        assert events[-1][1]["status_code"] == 500
+
+
 class TestRootEndpoint:
     """Test root endpoint"""
 
@@ -177,6 +469,359 @@ class TestConcurrentRequests:
             assert data["success"] is True
 
 
+class TestJobKeys:
+    """Test supersession of requests for the same organization/shift"""
+
+    @pytest.mark.asyncio
+    async def test_same_shift_request_supersedes(self):
+        """Test only the newer request for the same shift is solved"""
+        import asyncio
+        import time
+        import httpx
+
+        def slow_solve(locations, shuttle_capacities, cancel_token=None, **kwargs):
+            time.sleep(0.5)
+            return [[0, 1]]
+
+        request = {
+            "locations": {
+                "HQ": [9.0222, 38.7468],
+                "employees": [{"id": "emp1", "latitude": 9.0322, "longitude": 38.7568}]
+            },
+            "shuttles": [{"id": "shuttle1", "capacity": 1}],
+            "organization_id": "org1",
+            "shift_id": "shift1"
+        }
+        other_org = dict(request, organization_id="org2")
+        # Same shift, but an employee has moved since the first request
+        updated = dict(request, locations={
+            "HQ": [9.0222, 38.7468],
+            "employees": [{"id": "emp1", "latitude": 9.0333, "longitude": 38.7568}]
+        })
+
+        transport = httpx.ASGITransport(app=app)
+        with patch('src.main.assign_routes.solve_shuttle_routes', slow_solve):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                first = asyncio.create_task(client.post("/clustering", json=request))
+                other = asyncio.create_task(client.post("/clustering", json=other_org))
+                await asyncio.sleep(0.1)
+                second = await client.post("/clustering", json=updated)
+
+                assert second.status_code == 200
+                assert (await first).status_code == 409
+                assert (await other).status_code == 200
+
+
+class TestRequestCoalescing:
+    """Test identical concurrent requests share one solve"""
+
+    @pytest.mark.asyncio
+    async def test_identical_requests_share_one_solve(self):
+        import asyncio
+        import time
+        import httpx
+
+        calls = []
+
+        def slow_solve(locations, shuttle_capacities, cancel_token=None, **kwargs):
+            calls.append(locations)
+            time.sleep(0.3)
+            return [[0, 1, 2], [0]]
+
+        request = {
+            "locations": {
+                "HQ": [9.0222, 38.7468],
+                "employees": [
+                    {"id": "emp1", "latitude": 9.0322, "longitude": 38.7568},
+                    {"id": "emp2", "latitude": 9.0422, "longitude": 38.7668},
+                ]
+            },
+            "shuttles": [{"id": "shuttle1", "capacity": 2}, {"id": "shuttle2", "capacity": 1}],
+            "organization_id": "org1",
+            "shift_id": "shift1"
+        }
+        # Same plan requested with the fleet listed the other way round
+        reordered = dict(request, shuttles=list(reversed(request["shuttles"])))
+
+        transport = httpx.ASGITransport(app=app)
+        with patch('src.main.assign_routes.solve_shuttle_routes', slow_solve):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                responses = await asyncio.gather(
+                    client.post("/clustering", json=request),
+                    client.post("/clustering", json=request),
+                    client.post("/clustering", json=reordered),
+                )
+
+        assert len(calls) == 1
+        assert [r.status_code for r in responses] == [200, 200, 200]
+        assert responses[0].json()["routes"] == responses[1].json()["routes"]
+        assert responses[2].json()["routes"] == [
+            {"shuttle_id": "shuttle2", "employees": []},
+            {"shuttle_id": "shuttle1", "employees": ["emp1", "emp2"]},
+        ]
+
+
+class TestJobEndpoints:
+    """Test the asynchronous submit/poll/fetch job API"""
+
+    request = {
+        "locations": {
+            "HQ": [9.0222, 38.7468],
+            "employees": [
+                {"id": "emp1", "latitude": 9.0322, "longitude": 38.7568},
+                {"id": "emp2", "latitude": 9.0422, "longitude": 38.7668},
+            ]
+        },
+        "shuttles": [
+            {"id": "shuttle1", "capacity": 2},
+            {"id": "shuttle2", "capacity": 1}
+        ]
+    }
+
+    @staticmethod
+    def slow_solve(locations, shuttle_capacities, cancel_token=None, on_improvement=None, **kwargs):
+        import time
+        on_improvement([[0, 2, 1], [0]], 300)
+        # Hold the solve open until it is cancelled or 0.5 s have passed
+        for _ in range(50):
+            if cancel_token.is_cancelled():
+                return None
+            time.sleep(0.01)
+        return [[0, 1], [0, 2]]
+
+    @pytest.mark.asyncio
+    async def test_submit_poll_and_fetch(self):
+        import asyncio
+        import httpx
+
+        transport = httpx.ASGITransport(app=app)
+        with patch('src.main.assign_routes.solve_shuttle_routes', self.slow_solve):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                submitted = await client.post("/jobs", json=self.request)
+                assert submitted.status_code == 202
+                job_id = submitted.json()["job_id"]
+
+                await asyncio.sleep(0.3)
+                status = await client.get(f"/jobs/{job_id}")
+                assert status.json()["status"] == "running"
+                assert status.json()["objective"] == 300
+                assert status.headers["Retry-After"] == "1"
+
+                pending = await client.get(f"/jobs/{job_id}/result")
+                assert pending.status_code == 202
+
+                await asyncio.sleep(0.5)
+                result = await client.get(f"/jobs/{job_id}/result")
+                assert result.status_code == 200
+                assert result.json()["success"] is True
+                assert result.json()["routes"] == [
+                    {"shuttle_id": "shuttle1", "employees": ["emp1"]},
+                    {"shuttle_id": "shuttle2", "employees": ["emp2"]}
+                ]
+                assert (await client.get(f"/jobs/{job_id}")).json()["status"] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_delete_cancels_running_job(self):
+        import httpx
+
+        transport = httpx.ASGITransport(app=app)
+        with patch('src.main.assign_routes.solve_shuttle_routes', self.slow_solve):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                job_id = (await client.post("/jobs", json=self.request)).json()["job_id"]
+
+                deleted = await client.delete(f"/jobs/{job_id}")
+                assert deleted.status_code == 200
+                assert deleted.json()["status"] == "cancelled"
+
+                assert (await client.get(f"/jobs/{job_id}")).status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_failed_job_result(self):
+        import asyncio
+        import httpx
+        from src.main import job_registry
+
+        transport = httpx.ASGITransport(app=app)
+        with patch('src.main.assign_routes.solve_shuttle_routes', side_effect=RuntimeError("solver crashed")):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                job_id = (await client.post("/jobs", json=self.request)).json()["job_id"]
+                await asyncio.gather(job_registry.get(job_id).task, return_exceptions=True)
+
+                assert (await client.get(f"/jobs/{job_id}/result")).status_code == 500
+
+    @pytest.mark.asyncio
+    async def test_instant_plan_then_background_improvement(self):
+        """Test /clustering answers with a sweep plan and keeps solving as a job"""
+        import asyncio
+        import httpx
+
+        def slow_solve(locations, shuttle_capacities, cancel_token=None, on_improvement=None, **kwargs):
+            import time
+            time.sleep(0.3)
+            # Cheaper than any sweep plan, so it becomes the next version
+            on_improvement([[0, 1], [0, 2]], 0)
+            time.sleep(0.3)
+            return [[0, 1], [0, 2]]
+
+        transport = httpx.ASGITransport(app=app)
+        request = dict(self.request, instant_ms=100)
+        with patch('src.main.assign_routes.solve_shuttle_routes', slow_solve):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                instant = (await client.post("/clustering", json=request)).json()
+                assert instant["final"] is False
+                assert instant["plan_version"] == 1
+                assert sorted(e for route in instant["routes"] for e in route["employees"]) == ["emp1", "emp2"]
+                job_id = instant["job_id"]
+
+                await asyncio.sleep(0.35)
+                improved = (await client.get(f"/jobs/{job_id}/plan")).json()
+                assert improved["plan_version"] == 2
+                assert improved["objective"] == 0
+                assert improved["final"] is False
+
+                await asyncio.sleep(0.4)
+                final = (await client.get(f"/jobs/{job_id}/result")).json()
+                assert final["final"] is True
+                assert final["plan_version"] == 3
+                assert final["verification_passed"] is True
+
+    @patch('src.main.assign_routes.solve_shuttle_routes')
+    def test_instant_plan_returns_fast_solve(self, mock_solve):
+        """Test a solve finishing within instant_ms is returned as the final plan"""
+        mock_solve.return_value = [[0, 1], [0, 2]]
+        client = TestClient(app)
+
+        data = client.post("/clustering", json=dict(self.request, instant_ms=5000)).json()
+
+        assert data["final"] is True
+        assert data["routes"][1]["employees"] == ["emp2"]
+        assert "job_id" in data
+
+    @pytest.mark.asyncio
+    async def test_cached_job_carries_objective(self):
+        """Test a job served from the cache reports the plan's objective, uncounted"""
+        import httpx
+        from src.main import job_registry
+
+        transport = httpx.ASGITransport(app=app)
+        with patch('src.main.assign_routes.solve_shuttle_routes', return_value=[[0, 1], [0, 2]]):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                assert (await client.post("/clustering", json=self.request)).json()["cached"] is False
+                job_id = (await client.post("/jobs", json=self.request)).json()["job_id"]
+                await job_registry.get(job_id).task
+
+                status = (await client.get(f"/jobs/{job_id}")).json()
+                assert status["status"] == "completed"
+                assert status["objective"] > 0
+                result = (await client.get(f"/jobs/{job_id}/result")).json()
+                assert result["cached"] is True
+                stats = (await client.get("/cache/stats")).json()
+                assert (stats["hits"], stats["misses"]) == (0, 1)
+
+    def test_unknown_job(self):
+        client = TestClient(app)
+        assert client.get("/jobs/missing").status_code == 404
+        assert client.get("/jobs/missing/result").status_code == 404
+        assert client.delete("/jobs/missing").status_code == 404
+
+
+class TestPlanEditEndpoint:
+    """Test incremental plan edits"""
+
+    def setup_method(self):
+        self.client = TestClient(app)
+        self.request = {
+            "locations": {
+                "HQ": [9.0222, 38.7468],
+                "employees": [
+                    {"id": "emp1", "latitude": 9.0322, "longitude": 38.7568},
+                    {"id": "emp2", "latitude": 9.0422, "longitude": 38.7668},
+                    {"id": "emp3", "latitude": 8.9922, "longitude": 38.7068},
+                ]
+            },
+            "shuttles": [
+                {"id": "shuttle1", "capacity": 3},
+                {"id": "shuttle2", "capacity": 2}
+            ],
+            "routes": [
+                {"shuttle_id": "shuttle1", "employees": ["emp1", "emp2"]},
+                {"shuttle_id": "shuttle2", "employees": ["emp3"]},
+            ]
+        }
+
+    def test_edit_inserts_and_removes(self):
+        """Test a new employee joins the nearby route and a leaver is dropped"""
+        self.request["add"] = [{"id": "emp4", "latitude": 9.0372, "longitude": 38.7618}]
+        self.request["remove"] = ["emp3"]
+
+        with patch('src.main.solver_pool.run_cancellable_solver') as mock_solver:
+            response = self.client.post("/clustering/edit", json=self.request)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert data["verification_passed"] is True
+        assert data["total_demand"] == 3
+        assert sorted(data["routes"][0]["employees"]) == ["emp1", "emp2", "emp4"]
+        assert data["routes"][1] == {"shuttle_id": "shuttle2", "employees": []}
+        mock_solver.assert_not_called()
+
+    def test_edit_prices_insertions_in_solver_pool(self):
+        """Test insertion pricing, which may search roads, runs off the event loop"""
+        from src import solver_pool
+        self.request["add"] = [{"id": "emp4", "latitude": 9.0372, "longitude": 38.7618}]
+        run_solver = solver_pool.run_solver
+
+        with patch('src.main.solver_pool.run_solver', side_effect=run_solver) as mock_run:
+            response = self.client.post("/clustering/edit", json=self.request)
+
+        assert response.status_code == 200
+        assert mock_run.call_args.args[0] is plan_edits.insert_cheapest
+
+    def test_edit_moves_existing_employee(self):
+        """Test adding a known ID re-inserts that employee at the new address"""
+        self.request["add"] = [{"id": "emp1", "latitude": 8.9932, "longitude": 38.7078}]
+
+        response = self.client.post("/clustering/edit", json=self.request)
+
+        assert response.status_code == 200
+        assert response.json()["routes"] == [
+            {"shuttle_id": "shuttle1", "employees": ["emp2"]},
+            {"shuttle_id": "shuttle2", "employees": ["emp1", "emp3"]},
+        ]
+
+    def test_edit_without_capacity(self):
+        """Test an insertion that no shuttle has room for"""
+        self.request["shuttles"] = [
+            {"id": "shuttle1", "capacity": 2},
+            {"id": "shuttle2", "capacity": 1}
+        ]
+        self.request["add"] = [{"id": "emp4", "latitude": 9.0372, "longitude": 38.7618}]
+
+        response = self.client.post("/clustering/edit", json=self.request)
+
+        assert response.status_code == 400
+
+    def test_edit_repairs_touched_routes(self):
+        """Test the optional repair re-solves only the edited routes"""
+        self.request["add"] = [{"id": "emp4", "latitude": 9.0372, "longitude": 38.7618}]
+        self.request["repair_time_ms"] = 200
+
+        async def fake_solver(func, locations, shuttle_capacities, routes, **kwargs):
+            assert shuttle_capacities == [3]
+            assert len(locations) == 4
+            assert kwargs["time_limit_seconds"] == 0.2
+            return [[0, 3, 2, 1]], 10
+
+        with patch('src.main.lns.solver_pool.run_cancellable_solver', side_effect=fake_solver):
+            response = self.client.post("/clustering/edit", json=self.request)
+
+        assert response.status_code == 200
+        assert response.json()["routes"][0] == {
+            "shuttle_id": "shuttle1", "employees": ["emp4", "emp2", "emp1"]
+        }
+
+
 class TestErrorHandling:
     """Test error handling scenarios"""
 
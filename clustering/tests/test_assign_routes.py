@@ -1,13 +1,28 @@
 import pytest
 import numpy as np
 import math
+import time
 from unittest.mock import patch, MagicMock
+from src.heuristics import sweep_routes
 from src.assign_routes import (
     calculate_bearing,
     calculate_distance_and_bearing_matrix,
+    build_cost_matrix,
+    calculate_cost_matrix,
+    fill_cost_matrix,
+    merge_model,
+    PairwiseCosts,
+    nearest_neighbour_arcs,
+    calculate_route_cost,
+    default_time_limit,
+    plan_costs,
+    solve_shuttle_routes,
     assign_employees_to_shuttles,
     verify_unique_assignments
 )
+from src.distance_store import DistanceStore, location_ids
+from src.shared_arrays import SharedArray
+from conftest import random_locations
 
 
 class TestCalculateBearing:
@@ -88,6 +103,105 @@ class TestDistanceAndBearingMatrix:
             for j in range(len(locations)):
                 assert distance_matrix[i][j] == distance_matrix[j][i]
 
+    def test_matrix_blocks_match_single_pass(self):
+        """Test row blocks give the same float32 matrices as one full block"""
+        rng = np.random.default_rng(3)
+        locations = [[9.0222, 38.7468]] + (
+            rng.uniform([8.9, 38.6], [9.15, 38.95], size=(20, 2)).tolist()
+        )
+
+        distance_matrix, bearing_matrix = calculate_distance_and_bearing_matrix(locations)
+        blocked_distance, blocked_bearing = calculate_distance_and_bearing_matrix(
+            locations, block_rows=4
+        )
+
+        assert distance_matrix.dtype == np.float32
+        assert bearing_matrix.dtype == np.float32
+        assert np.array_equal(blocked_distance, distance_matrix)
+        assert np.array_equal(blocked_bearing, bearing_matrix)
+        assert np.array_equal(distance_matrix, distance_matrix.T)
+
+
+class TestBuildCostMatrix:
+    """Test the precomputed arc-cost matrix"""
+
+    @staticmethod
+    def reference_cost(distance_matrix, bearing_matrix, from_node, to_node):
+        """Scalar form of the combined distance/bearing cost"""
+        distance = float(distance_matrix[from_node][to_node])
+        bearing = float(bearing_matrix[from_node][to_node])
+        prev_bearing = float(bearing_matrix[0][from_node]) if from_node != 0 else 0
+        bearing_change = min((bearing - prev_bearing) % 360,
+                             (prev_bearing - bearing) % 360)
+        distance_factor = 1.2 if distance > 3 else 1.0
+        bearing_penalty = (bearing_change / 180.0) * distance * 0.8
+        if bearing_change > 120:
+            bearing_penalty *= 1.5
+        if distance > 5:
+            distance_factor *= 1.3
+        base_cost = distance * distance_factor * 1000
+        return int(base_cost + bearing_penalty * 800)
+
+    def test_build_cost_matrix_matches_scalar_cost(self):
+        """Test every arc matches the scalar cost formula"""
+        rng = np.random.default_rng(42)
+        locations = [[9.0222, 38.7468]] + (
+            rng.uniform([8.9, 38.6], [9.15, 38.95], size=(25, 2)).tolist()
+        )
+        distance_matrix, bearing_matrix = calculate_distance_and_bearing_matrix(locations)
+
+        cost_matrix = build_cost_matrix(distance_matrix, bearing_matrix)
+
+        assert cost_matrix.dtype == np.int32
+        assert cost_matrix.shape == (26, 26)
+        for i in range(26):
+            for j in range(26):
+                assert cost_matrix[i, j] == self.reference_cost(
+                    distance_matrix, bearing_matrix, i, j
+                )
+
+    def test_build_cost_matrix_zero_diagonal(self):
+        """Test staying at a node costs nothing"""
+        locations = [[0, 0], [0, 1], [1, 0]]
+        distance_matrix, bearing_matrix = calculate_distance_and_bearing_matrix(locations)
+
+        cost_matrix = build_cost_matrix(distance_matrix, bearing_matrix)
+
+        assert np.all(np.diag(cost_matrix) == 0)
+
+    def test_pairwise_costs_match_matrix(self):
+        """Test on-demand arc costs equal the precomputed matrix"""
+        rng = np.random.default_rng(7)
+        locations = [[9.0222, 38.7468]] + (
+            rng.uniform([8.9, 38.6], [9.15, 38.95], size=(15, 2)).tolist()
+        )
+        # Two employees at the same address
+        locations[4] = locations[9]
+        cost_matrix = build_cost_matrix(*calculate_distance_and_bearing_matrix(locations))
+        from_nodes, to_nodes = np.meshgrid(range(16), range(16), indexing="ij")
+
+        costs = PairwiseCosts(locations)[from_nodes.ravel(), to_nodes.ravel()]
+
+        assert np.array_equal(costs.reshape(16, 16), cost_matrix)
+
+    def test_plan_costs(self):
+        """Test plans are priced like the full matrix, skipping missing ones"""
+        locations = [[9.0222, 38.7468], [9.0322, 38.7568], [9.0422, 38.7668], [8.9922, 38.7068]]
+        cost_matrix = calculate_cost_matrix(locations)
+        plan = [[0, 2, 1], [0, 3]]
+
+        assert plan_costs(locations, [plan, None]) == [calculate_route_cost(plan, cost_matrix), None]
+
+    def test_cost_matrix_from_coordinates(self):
+        """Test the direct cost matrix equals the one built from distance/bearing matrices"""
+        rng = np.random.default_rng(11)
+        locations = [[9.0222, 38.7468]] + (
+            rng.uniform([8.9, 38.6], [9.15, 38.95], size=(30, 2)).tolist()
+        )
+        expected = build_cost_matrix(*calculate_distance_and_bearing_matrix(locations))
+
+        assert np.array_equal(calculate_cost_matrix(locations, block_rows=7), expected)
+
 
 class TestAssignEmployeesToShuttles:
     """Test the core shuttle assignment algorithm"""
@@ -178,6 +292,274 @@ class TestAssignEmployeesToShuttles:
         assert routes is None
 
 
+class TestSearchBudget:
+    """Test size-adaptive time limits and early stopping"""
+
+    def test_default_time_limit_scales_with_size(self):
+        """Test the default budget grows with problem size within bounds"""
+        assert default_time_limit(5) == 1.0
+        assert default_time_limit(100) == pytest.approx(5.0)
+        assert default_time_limit(5000) == 30.0
+
+    def test_small_shift_stops_early(self):
+        """Test a small shift returns well under a second"""
+        locations = random_locations(10)
+        distance_matrix, bearing_matrix = calculate_distance_and_bearing_matrix(locations)
+
+        started = time.monotonic()
+        routes = assign_employees_to_shuttles(
+            locations, distance_matrix, bearing_matrix, [5, 5, 5]
+        )
+
+        assert routes is not None
+        assert time.monotonic() - started < 1.0
+
+    def test_time_budget_is_respected(self):
+        """Test an explicit time budget bounds the search"""
+        locations = random_locations(150)
+        distance_matrix, bearing_matrix = calculate_distance_and_bearing_matrix(locations)
+
+        started = time.monotonic()
+        routes = assign_employees_to_shuttles(
+            locations, distance_matrix, bearing_matrix, [15] * 11,
+            time_limit_seconds=0.5, stagnation_window=0
+        )
+
+        assert routes is not None
+        assert time.monotonic() - started < 1.5
+
+
+class TestWarmStart:
+    """Test re-optimizing from a previous plan"""
+
+    def test_warm_start_keeps_good_plan(self):
+        """Test starting from a solved plan keeps its routes"""
+        locations = random_locations(40)
+        distance_matrix, bearing_matrix = calculate_distance_and_bearing_matrix(locations)
+        cost_matrix = build_cost_matrix(distance_matrix, bearing_matrix)
+        routes = assign_employees_to_shuttles(
+            locations, distance_matrix, bearing_matrix, [10] * 5
+        )
+
+        warm_routes = assign_employees_to_shuttles(
+            locations, distance_matrix, bearing_matrix, [10] * 5,
+            initial_routes=routes
+        )
+
+        assert calculate_route_cost(warm_routes, cost_matrix) <= calculate_route_cost(routes, cost_matrix)
+        assert verify_unique_assignments(warm_routes, 40)
+
+    def test_warm_start_inserts_new_employees(self):
+        """Test employees missing from the previous plan are added"""
+        locations = random_locations(20)
+        previous = [[0, 1, 2, 3, 4, 5], [0, 6, 7, 8, 9, 10], [0]]
+
+        routes = solve_shuttle_routes(locations, [8, 8, 8], initial_routes=previous)
+
+        assert verify_unique_assignments(routes, 20)
+        assert all(len(route) - 1 <= 8 for route in routes)
+
+
+class TestFleetPruning:
+    """Test solving on the shuttles the demand needs"""
+
+    def test_unused_shuttles_stay_at_hq(self):
+        locations = random_locations(12)
+
+        with patch("src.fleet.FLEET_PRUNING_SLACK", 0):
+            routes = solve_shuttle_routes(locations, [4, 12, 4, 4])
+
+        assert verify_unique_assignments(routes, 12)
+        assert routes[0] == routes[2] == routes[3] == [0]
+
+    def test_falls_back_to_full_fleet(self):
+        """Test a failed solve on the pruned fleet retries with every shuttle"""
+        locations = random_locations(12)
+        fleet_sizes = []
+
+        def solve_fleet(locations, shuttle_capacities, *args):
+            fleet_sizes.append(len(shuttle_capacities))
+            if len(fleet_sizes) == 1:
+                return None
+            return original(locations, shuttle_capacities, *args)
+
+        from src import assign_routes
+        original = assign_routes._solve_fleet
+        with patch("src.fleet.FLEET_PRUNING_SLACK", 0), \
+                patch("src.assign_routes._solve_fleet", side_effect=solve_fleet):
+            routes = solve_shuttle_routes(locations, [4, 12, 4, 4])
+
+        assert fleet_sizes == [1, 4]
+        assert verify_unique_assignments(routes, 12)
+
+
+class TestProgressReporting:
+    """Test improving solutions are reported while the search runs"""
+
+    def test_reports_improving_solutions(self):
+        locations = random_locations(40)
+        cost_matrix = calculate_cost_matrix(locations)
+        reports = []
+
+        routes = solve_shuttle_routes(
+            locations, [10] * 5, time_limit_seconds=1,
+            on_improvement=lambda routes, objective: reports.append((routes, objective))
+        )
+
+        assert reports
+        objectives = [objective for _, objective in reports]
+        assert objectives == sorted(set(objectives), reverse=True)
+        for reported, objective in reports:
+            assert len(reported) == 5
+            assert verify_unique_assignments(reported, 40)
+            assert calculate_route_cost(reported, cost_matrix) == objective
+        assert calculate_route_cost(routes, cost_matrix) <= objectives[-1]
+
+    def test_reports_merged_nodes_as_employees(self):
+        """Test reports from a merged, pruned solve use the caller's nodes and fleet"""
+        locations = random_locations(12)
+        # Employee 13 lives next door to employee 1
+        locations.append([locations[1][0] + 0.00001, locations[1][1]])
+        reports = []
+
+        with patch("src.fleet.FLEET_PRUNING_SLACK", 0):
+            solve_shuttle_routes(
+                locations, [4, 13, 4, 4],
+                on_improvement=lambda routes, objective: reports.append(routes)
+            )
+
+        assert reports
+        for reported in reports:
+            assert len(reported) == 4
+            assert verify_unique_assignments(reported, 13)
+
+
+class TestSharedCostMatrix:
+    """Test solving on a cost matrix computed once in shared memory"""
+
+    def test_fill_cost_matrix(self):
+        locations = random_locations(30)
+        shared = SharedArray((31, 31), np.int32)
+        try:
+            fill_cost_matrix(locations, shared)
+            np.testing.assert_array_equal(shared.array, calculate_cost_matrix(locations))
+        finally:
+            shared.release()
+
+    def test_solver_reads_shared_matrix(self):
+        """Test the matrix is not recomputed and covers the merged nodes"""
+        locations = random_locations(12)
+        locations.append([locations[1][0] + 0.00001, locations[1][1]])
+        model_locations, demands, _ = merge_model(locations, [13] * 2)
+        assert len(model_locations) == 13 and sum(demands) == 13
+
+        shared = SharedArray((13, 13), np.int32)
+        try:
+            fill_cost_matrix(model_locations, shared)
+            with patch("src.assign_routes.calculate_cost_matrix") as compute:
+                routes = solve_shuttle_routes(locations, [13] * 2, time_limit_seconds=0.5,
+                                              cost_matrix=shared)
+        finally:
+            shared.release()
+
+        compute.assert_not_called()
+        assert verify_unique_assignments(routes, 13)
+
+    def test_solver_reads_distance_store(self, tmp_path):
+        """Test merged nodes are costed from the store under their group IDs"""
+        locations = random_locations(12)
+        locations.append([locations[1][0] + 0.00001, locations[1][1]])
+        store = DistanceStore(str(tmp_path))
+
+        with patch("src.assign_routes.calculate_cost_matrix") as compute:
+            routes = solve_shuttle_routes(locations, [13] * 2, time_limit_seconds=0.5,
+                                          distance_store=store,
+                                          location_ids=location_ids(range(13)))
+
+        compute.assert_not_called()
+        assert verify_unique_assignments(routes, 13)
+        assert len(store) == 13
+
+    def test_mismatched_matrix_is_ignored(self):
+        locations = random_locations(12)
+        shared = SharedArray((5, 5), np.int32)
+        try:
+            routes = solve_shuttle_routes(locations, [12], time_limit_seconds=0.5,
+                                          cost_matrix=shared)
+        finally:
+            shared.release()
+
+        assert verify_unique_assignments(routes, 12)
+
+
+class TestNearestNeighbourArcs:
+    """Test the nearest-neighbour arcs searched on large shifts"""
+
+    def test_arcs_are_symmetric_neighbours(self):
+        locations = random_locations(50)
+
+        neighbours = nearest_neighbour_arcs(locations, num_neighbours=5)
+
+        assert len(neighbours) == 50
+        for node in range(1, 51):
+            adjacent = set(neighbours[node - 1].tolist())
+            assert len(adjacent) >= 5
+            assert 0 not in adjacent and node not in adjacent
+            # The neighbour relation is symmetric
+            assert all(node in neighbours[other - 1] for other in adjacent)
+
+    def test_arcs_include_seed_routes(self):
+        locations = random_locations(50)
+        seed_routes = [[0, 1, 50, 2, 49]]
+
+        neighbours = nearest_neighbour_arcs(locations, num_neighbours=2, seed_routes=seed_routes)
+
+        for from_node, to_node in [(1, 50), (50, 2), (2, 49)]:
+            assert to_node in neighbours[from_node - 1]
+
+    def test_sparse_solve_uses_neighbour_arcs(self):
+        """Test a sparse solve assigns everyone using only neighbour arcs"""
+        locations = random_locations(60)
+        seed_routes = sweep_routes(locations, [15] * 5)
+        neighbours = nearest_neighbour_arcs(locations, num_neighbours=6, seed_routes=seed_routes)
+
+        routes = assign_employees_to_shuttles(
+            locations, None, None, [15] * 5, time_limit_seconds=2,
+            initial_routes=seed_routes, cost_matrix=calculate_cost_matrix(locations),
+            neighbours=neighbours
+        )
+
+        assert verify_unique_assignments(routes, 60)
+        for route in routes:
+            for from_node, to_node in zip(route[1:], route[2:]):
+                assert to_node in neighbours[from_node - 1]
+
+    def test_solve_switches_to_sparse_above_threshold(self):
+        locations = random_locations(30)
+
+        with patch("src.assign_routes.SPARSE_GRAPH_THRESHOLD", 10), \
+                patch("src.assign_routes.assign_employees_to_shuttles",
+                      return_value=[[0]]) as mock_assign:
+            solve_shuttle_routes(locations, [30])
+
+        kwargs = mock_assign.call_args.kwargs
+        assert len(kwargs["neighbours"]) == 30
+        # Arcs are still priced from the full matrix
+        assert kwargs["cost_matrix"].shape == (31, 31)
+        # The search starts from a fallback plan made of neighbour arcs
+        assert verify_unique_assignments(kwargs["initial_routes"], 30)
+
+    def test_solve_searches_every_arc_below_threshold(self):
+        locations = random_locations(30)
+
+        with patch("src.assign_routes.SPARSE_GRAPH_THRESHOLD", 100), \
+                patch("src.assign_routes.assign_employees_to_shuttles",
+                      return_value=[[0]]) as mock_assign:
+            solve_shuttle_routes(locations, [30])
+
+        assert mock_assign.call_args.kwargs["neighbours"] is None
+
+
 class TestVerifyUniqueAssignments:
     """Test assignment verification functionality"""
 
@@ -0,0 +1,181 @@
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from src.cache import ResultCache, assign_cached_routes, canonical_key
+from src.main import app
+
+
+class TestCanonicalKey:
+    """Test order-independent request keys"""
+
+    def setup_method(self):
+        self.hq = [9.0222, 38.7468]
+        self.employees = [("emp1", 9.0322, 38.7568), ("emp2", 9.0422, 38.7668)]
+
+    def test_key_ignores_employee_and_shuttle_order(self):
+        key = canonical_key(self.hq, self.employees, [4, 2])
+        reordered = canonical_key(self.hq, list(reversed(self.employees)), [2, 4])
+        assert key == reordered
+
+    def test_key_rounds_coordinates(self):
+        key = canonical_key(self.hq, self.employees, [4], precision=3)
+        moved = [("emp1", 9.03221, 38.75679), ("emp2", 9.0422, 38.7668)]
+        assert canonical_key(self.hq, moved, [4], precision=3) == key
+
+    def test_key_changes_with_content(self):
+        key = canonical_key(self.hq, self.employees, [4, 2])
+        assert canonical_key(self.hq, self.employees, [4, 3]) != key
+        assert canonical_key([9.0, 38.7], self.employees, [4, 2]) != key
+        assert canonical_key(self.hq, self.employees[:1], [4, 2]) != key
+        assert canonical_key(self.hq, self.employees, [4, 2], improve=False) != key
+
+
+class TestResultCache:
+    """Test LRU eviction, TTL and counters"""
+
+    def test_hit_and_miss_counters(self):
+        results = ResultCache(max_entries=2, ttl_seconds=60)
+        assert results.get("a") is None
+        results.put("a", 1)
+        assert results.get("a") == 1
+        assert results.stats()["hits"] == 1
+        assert results.stats()["misses"] == 1
+
+    def test_peek_is_not_counted(self):
+        results = ResultCache(max_entries=2, ttl_seconds=60)
+        assert results.peek("a") is None
+        results.put("a", 1)
+        assert results.peek("a") == 1
+        assert results.stats()["hits"] == 0
+        assert results.stats()["misses"] == 0
+
+    def test_least_recently_used_is_evicted(self):
+        results = ResultCache(max_entries=2, ttl_seconds=60)
+        results.put("a", 1)
+        results.put("b", 2)
+        results.get("a")
+        results.put("c", 3)
+        assert results.get("b") is None
+        assert results.get("a") == 1
+        assert results.get("c") == 3
+        assert len(results) == 2
+
+    def test_entries_expire(self):
+        results = ResultCache(max_entries=2, ttl_seconds=60)
+        with patch("src.cache.time.monotonic", return_value=1000.0):
+            results.put("a", 1)
+        with patch("src.cache.time.monotonic", return_value=1061.0):
+            assert results.get("a") is None
+        assert len(results) == 0
+
+    def test_zero_size_disables_cache(self):
+        results = ResultCache(max_entries=0)
+        results.put("a", 1)
+        assert results.get("a") is None
+
+
+class TestAssignCachedRoutes:
+    """Test reusing a cached plan for another fleet ordering"""
+
+    def test_routes_follow_shuttle_capacity(self):
+        cached_routes = [(2, ["emp1", "emp2"]), (1, ["emp3"]), (1, [])]
+        routes = assign_cached_routes(cached_routes, [("s1", 1), ("s2", 2), ("s3", 1)])
+        assert routes == [
+            {"shuttle_id": "s1", "employees": ["emp3"]},
+            {"shuttle_id": "s2", "employees": ["emp1", "emp2"]},
+            {"shuttle_id": "s3", "employees": []},
+        ]
+
+
+class TestClusteringCache:
+    """Test the cache in front of /clustering"""
+
+    def test_repeated_request_is_served_from_cache(self):
+        client = TestClient(app)
+        request = {
+            "locations": {
+                "HQ": [9.0222, 38.7468],
+                "employees": [
+                    {"id": "emp1", "latitude": 9.0322, "longitude": 38.7568},
+                    {"id": "emp2", "latitude": 9.0422, "longitude": 38.7668},
+                ]
+            },
+            "shuttles": [{"id": "shuttle1", "capacity": 2}, {"id": "shuttle2", "capacity": 1}]
+        }
+        reordered = {
+            "locations": {
+                "HQ": request["locations"]["HQ"],
+                "employees": list(reversed(request["locations"]["employees"]))
+            },
+            "shuttles": list(reversed(request["shuttles"]))
+        }
+
+        with patch("src.main.assign_routes.solve_shuttle_routes",
+                   return_value=[[0, 1, 2], [0]]) as mock_solve:
+            first = client.post("/clustering", json=request).json()
+            second = client.post("/clustering", json=reordered).json()
+
+        assert mock_solve.call_count == 1
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["routes"] == [
+            {"shuttle_id": "shuttle2", "employees": []},
+            {"shuttle_id": "shuttle1", "employees": ["emp1", "emp2"]},
+        ]
+        stats = client.get("/cache/stats").json()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+
+class TestSingleFlight:
+    """Test coalescing of concurrent identical work"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        import asyncio
+        from src.cache import SingleFlight
+
+        in_flight = SingleFlight()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return "plan"
+
+        results = await asyncio.gather(*(in_flight.do("key", work) for _ in range(5)))
+
+        assert results == ["plan"] * 5
+        assert len(runs) == 1
+        assert "key" not in in_flight
+
+    @pytest.mark.asyncio
+    async def test_work_survives_until_last_caller_leaves(self):
+        import asyncio
+        from src.cache import SingleFlight
+
+        in_flight = SingleFlight()
+        started = asyncio.Event()
+        cancelled = []
+
+        async def work():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        first = asyncio.ensure_future(in_flight.do("key", work))
+        second = asyncio.ensure_future(in_flight.do("key", work))
+        await started.wait()
+
+        first.cancel()
+        await asyncio.sleep(0)
+        assert not cancelled
+        assert in_flight.waiters("key") == 1
+
+        second.cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert cancelled == [1]
@@ -0,0 +1,65 @@
+import pickle
+import time
+from src.cancellation import CancellationToken
+from src.assign_routes import (
+    calculate_distance_and_bearing_matrix,
+    assign_employees_to_shuttles
+)
+from conftest import random_locations
+
+
+class TestCancellationToken:
+    """Test the shared-memory cancellation flag"""
+
+    def test_cancel_sets_flag(self):
+        token = CancellationToken()
+        try:
+            assert not token.is_cancelled()
+            token.cancel()
+            assert token.is_cancelled()
+        finally:
+            token.release()
+
+    def test_pickled_token_shares_flag(self):
+        """Test a token unpickled elsewhere sees the same flag"""
+        token = CancellationToken()
+        attached = pickle.loads(pickle.dumps(token))
+        try:
+            assert not attached.is_cancelled()
+            token.cancel()
+            assert attached.is_cancelled()
+        finally:
+            attached.release()
+            token.release()
+
+    def test_released_token_counts_as_cancelled(self):
+        token = CancellationToken()
+        token.release()
+        token.cancel()
+        assert token.is_cancelled()
+
+
+class TestSolverCancellation:
+    """Test that a cancelled token stops the OR-Tools search"""
+
+    def test_cancelled_token_stops_search(self):
+        """Test the search stops at the first solution once cancelled"""
+        locations = random_locations(60)
+        distance_matrix, bearing_matrix = calculate_distance_and_bearing_matrix(locations)
+        token = CancellationToken()
+        token.cancel()
+
+        try:
+            started = time.monotonic()
+            routes = assign_employees_to_shuttles(
+                locations, distance_matrix, bearing_matrix, [15] * 5,
+                cancel_token=token
+            )
+            elapsed = time.monotonic() - started
+        finally:
+            token.release()
+
+        # The best solution found so far is still returned
+        assert routes is not None
+        assert sum(len(route) - 1 for route in routes) == 60
+        assert elapsed < 1.0
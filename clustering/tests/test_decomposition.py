@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from src import decomposition
+from src.assign_routes import verify_unique_assignments
+from src.decomposition import (
+    allocate_shuttles,
+    capacitated_assignment,
+    partition_quotas,
+    partition_by_sector,
+    partition_budget,
+    partition_by_kmeans,
+    should_decompose,
+    solve_partitioned,
+    stitch_routes
+)
+from conftest import random_locations
+
+
+def assert_valid_partitions(partitions, num_employees, shuttle_capacities):
+    nodes = sorted(node for partition_nodes, _ in partitions for node in partition_nodes)
+    shuttles = sorted(s for _, partition_shuttles in partitions for s in partition_shuttles)
+    assert nodes == list(range(1, num_employees + 1))
+    assert shuttles == list(range(len(shuttle_capacities)))
+    for partition_nodes, partition_shuttles in partitions:
+        assert len(partition_nodes) <= sum(shuttle_capacities[s] for s in partition_shuttles)
+
+
+class TestShouldDecompose:
+    """Test when requests are partitioned"""
+
+    def test_auto_uses_threshold(self):
+        assert not should_decompose("auto", decomposition.DECOMPOSITION_THRESHOLD)
+        assert should_decompose("auto", decomposition.DECOMPOSITION_THRESHOLD + 1)
+
+    def test_explicit_methods(self):
+        assert should_decompose("sector", 10)
+        assert should_decompose("kmeans", 10)
+        assert not should_decompose("none", 10000)
+
+
+class TestCapacityAllocation:
+    """Test shuttle grouping and employee quotas"""
+
+    def test_allocate_shuttles_balances_capacity(self):
+        capacities = [10, 8, 6, 4, 4, 2]
+        groups = allocate_shuttles(capacities, 2)
+        totals = [sum(capacities[s] for s in group) for group in groups]
+        assert sorted(s for group in groups for s in group) == list(range(6))
+        assert max(totals) - min(totals) <= 2
+
+    def test_partition_quotas_respect_capacity(self):
+        quotas = partition_quotas([10, 7, 3], 19)
+        assert sum(quotas) == 19
+        assert all(q <= c for q, c in zip(quotas, [10, 7, 3]))
+
+
+class TestPartitioners:
+    """Test sector and k-means partitioning"""
+
+    @pytest.mark.parametrize("partitioner", [partition_by_sector, partition_by_kmeans])
+    def test_partitions_cover_every_employee_once(self, partitioner):
+        locations = random_locations(200)
+        shuttle_capacities = [15, 12, 10] * 6
+
+        partitions = partitioner(locations, shuttle_capacities, partition_size=50)
+
+        assert len(partitions) == 4
+        assert_valid_partitions(partitions, 200, shuttle_capacities)
+
+    def test_capacitated_assignment_respects_quotas(self):
+        """Test points overflow to their next-nearest cluster with room"""
+        distances = np.array([[1.0, 5.0, 9.0],
+                              [2.0, 4.0, 9.0],
+                              [3.0, 6.0, 1.0],
+                              [1.5, 2.0, 8.0]])
+
+        labels = capacitated_assignment(distances, np.array([2, 1, 1]))
+
+        assert labels.tolist() == [0, 1, 2, 0]
+
+    def test_capacitated_assignment_fills_every_quota(self):
+        rng = np.random.default_rng(5)
+        distances = rng.uniform(size=(500, 7))
+        quotas = np.array([100, 90, 80, 70, 60, 50, 50])
+
+        labels = capacitated_assignment(distances, quotas)
+
+        assert (labels >= 0).all()
+        assert np.bincount(labels, minlength=7).tolist() == quotas.tolist()
+
+    def test_sector_partitions_are_contiguous(self):
+        """Test each sector covers a contiguous range of bearings"""
+        hq = [9.0, 38.0]
+        # Employees on a circle around the HQ, every 10 degrees
+        angles = np.radians(np.arange(0, 360, 10))
+        locations = [hq] + [[hq[0] + 0.05 * np.cos(a), hq[1] + 0.05 * np.sin(a)] for a in angles]
+
+        partitions = partition_by_sector(locations, [9, 9, 9, 9], partition_size=9)
+
+        for nodes, _ in partitions:
+            assert len(nodes) == 9
+            # Contiguous around the circle: at most one wrap-around break
+            ordered = sorted(nodes)
+            breaks = sum(1 for a, b in zip(ordered, ordered[1:] + [ordered[0] + 36]) if b - a != 1)
+            assert breaks <= 1
+
+
+class TestSolvePartitioned:
+    """Test solving partitions and stitching them together"""
+
+    def test_stitch_routes_maps_back_to_global_nodes(self):
+        partitions = [([4, 2], [1]), ([1, 3], [0, 2])]
+        partition_routes = [[[0, 2, 1]], [[0, 1], [0, 2]]]
+
+        routes = stitch_routes(partitions, partition_routes, 3)
+
+        assert routes == [[0, 1], [0, 2, 4], [0, 3]]
+
+    def test_partition_budget_splits_across_waves(self):
+        with patch("src.decomposition.solver_pool.configured_worker_count", return_value=4):
+            assert partition_budget(6.0, 4) == 6.0
+            assert partition_budget(6.0, 7) == 3.0
+            assert partition_budget(6.0, 9) == 2.0
+            assert partition_budget(None, 9) is None
+
+    def test_partition_budget_without_workers(self):
+        with patch("src.decomposition.solver_pool.configured_worker_count", return_value=0):
+            assert partition_budget(6.0, 9) == 6.0
+
+    def test_stitch_routes_propagates_failure(self):
+        assert stitch_routes([([1], [0])], [None], 1) is None
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("method", ["sector", "kmeans"])
+    async def test_solve_partitioned(self, method):
+        locations = random_locations(60)
+        shuttle_capacities = [8] * 9
+
+        routes = await solve_partitioned(
+            locations, shuttle_capacities, method=method,
+            partition_size=20, time_limit_seconds=0.5
+        )
+
+        assert len(routes) == 9
+        assert verify_unique_assignments(routes, 60)
+        for route, capacity in zip(routes, shuttle_capacities):
+            assert len(route) - 1 <= capacity
+
+    @pytest.mark.asyncio
+    async def test_solve_partitioned_insufficient_capacity(self):
+        routes = await solve_partitioned(random_locations(20), [5, 5])
+        assert routes is None
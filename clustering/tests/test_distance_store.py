@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from src.assign_routes import calculate_cost_matrix, calculate_distance_and_bearing_pairs
+from src.distance_store import DistanceStore, for_organization, location_ids
+from conftest import random_locations
+
+
+class CountingPairs:
+    """Distance function recording how many pairs it was asked for."""
+
+    def __init__(self):
+        self.pairs = 0
+
+    def __call__(self, from_locations, to_locations):
+        distance, bearing = calculate_distance_and_bearing_pairs(from_locations, to_locations)
+        self.pairs += distance.size
+        return distance, bearing
+
+
+class TestDistanceStore:
+    """Test the persistent per-organization distance matrices"""
+
+    def test_matches_computed_costs(self, tmp_path):
+        locations = random_locations(100)
+        store = DistanceStore(str(tmp_path))
+
+        costs = store.cost_matrix(location_ids(range(100)), locations)
+
+        np.testing.assert_array_equal(costs, calculate_cost_matrix(locations))
+
+    def test_gathers_subsets_in_request_order(self, tmp_path):
+        locations = random_locations(80)
+        ids = location_ids(range(80))
+        store = DistanceStore(str(tmp_path))
+        store.cost_matrix(ids, locations)
+
+        nodes = [0, 57, 3, 41, 12]
+        costs = store.cost_matrix([ids[n] for n in nodes], [locations[n] for n in nodes])
+
+        np.testing.assert_array_equal(costs, calculate_cost_matrix([locations[n] for n in nodes]))
+
+    def test_only_new_and_moved_locations_are_computed(self, tmp_path):
+        locations = random_locations(50)
+        ids = location_ids(range(50))
+        pairs = CountingPairs()
+        store = DistanceStore(str(tmp_path), pairs=pairs)
+        store.cost_matrix(ids, locations)
+
+        pairs.pairs = 0
+        store.cost_matrix(ids, locations)
+        assert pairs.pairs == 0
+
+        # One employee moved and one joined: one row and column each
+        locations[7] = [9.05, 38.8]
+        locations.append([9.06, 38.81])
+        ids = location_ids(range(51))
+        costs = store.cost_matrix(ids, locations)
+
+        assert pairs.pairs == 2 * 2 * 52
+        np.testing.assert_array_equal(costs, calculate_cost_matrix(locations))
+
+    def test_persists_and_grows(self, tmp_path):
+        locations = random_locations(200)
+        ids = location_ids(range(200))
+        DistanceStore(str(tmp_path)).cost_matrix(ids[:10], locations[:10])
+        DistanceStore(str(tmp_path)).cost_matrix(ids, locations)
+
+        pairs = CountingPairs()
+        store = DistanceStore(str(tmp_path), pairs=pairs)
+        costs = store.cost_matrix(ids, locations)
+
+        assert len(store) == 201
+        assert pairs.pairs == 0
+        np.testing.assert_array_equal(costs, calculate_cost_matrix(locations))
+
+    def test_starts_afresh_past_the_size_limit(self, tmp_path):
+        locations = random_locations(30)
+        store = DistanceStore(str(tmp_path), max_locations=40)
+        store.cost_matrix(location_ids(range(30)), locations)
+
+        ids = location_ids(range(100, 130))
+        costs = store.cost_matrix(ids, locations)
+
+        assert len(store) == 31
+        np.testing.assert_array_equal(costs, calculate_cost_matrix(locations))
+
+    def test_duplicate_ids_are_rejected(self, tmp_path):
+        with pytest.raises(ValueError):
+            DistanceStore(str(tmp_path)).cost_matrix(["HQ", "a", "a"], random_locations(2))
+
+    def test_one_store_per_organization(self, tmp_path):
+        assert for_organization("org-1") is None
+        assert for_organization(None, str(tmp_path)) is None
+        first = for_organization("org-1", str(tmp_path))
+        assert first.directory == for_organization("org-1", str(tmp_path)).directory
+        assert first.directory != for_organization("org-2", str(tmp_path)).directory
@@ -0,0 +1,31 @@
+from src.fleet import first_fit_decreasing, select_shuttles
+
+
+class TestFirstFitDecreasing:
+    """Test the bin-packing feasibility check"""
+
+    def test_packs_when_seats_allow(self):
+        assert first_fit_decreasing([3, 3, 2, 2], [5, 5])
+
+    def test_fails_when_groups_do_not_split(self):
+        # Enough seats in total, but no shuttle takes two groups of three
+        assert not first_fit_decreasing([3, 3, 3], [5, 4])
+
+
+class TestSelectShuttles:
+    """Test pruning the fleet to the shuttles the demand needs"""
+
+    def test_takes_largest_shuttles_first(self):
+        assert select_shuttles([4, 10, 6, 10], [1] * 12, slack=0) == [1, 3]
+
+    def test_slack_adds_spare_seats(self):
+        assert select_shuttles([4, 10, 6, 10], [1] * 12, slack=0.75) == [1, 2, 3]
+
+    def test_adds_shuttle_when_groups_do_not_pack(self):
+        assert select_shuttles([5, 4, 4], [3, 3, 3], slack=0) == [0, 1, 2]
+
+    def test_negative_slack_keeps_every_shuttle(self):
+        assert select_shuttles([4, 10, 6], [1] * 3, slack=-1) == [0, 1, 2]
+
+    def test_keeps_every_shuttle_when_demand_does_not_fit(self):
+        assert select_shuttles([4, 4], [1] * 10, slack=0) == [0, 1]
@@ -0,0 +1,91 @@
+import numpy as np
+from src.assign_routes import PairwiseCosts, calculate_route_cost, verify_unique_assignments
+from src.heuristics import (
+    fallback_routes,
+    nearest_neighbour_order,
+    sweep_order,
+    sweep_routes,
+    two_opt
+)
+from conftest import random_locations
+
+
+class TestSweep:
+    """Test the sweep construction heuristic"""
+
+    def test_sweep_order_starts_after_widest_gap(self):
+        # Employees due north, east and north-east of the HQ
+        locations = [[0.0, 0.0], [1.0, 0.0], [0.0, 1.0], [1.0, 1.0]]
+
+        assert sweep_order(locations).tolist() == [1, 3, 2]
+
+    def test_sweep_routes_respect_capacity(self):
+        locations = random_locations(40)
+
+        routes = sweep_routes(locations, [6, 15, 15, 10])
+
+        assert verify_unique_assignments(routes, 40)
+        assert [len(route) - 1 for route in routes] == [0, 15, 15, 10]
+
+    def test_sweep_routes_without_capacity(self):
+        assert sweep_routes(random_locations(10), [4, 4]) is None
+
+    def test_sweep_routes_with_demands(self):
+        locations = random_locations(10)
+        demands = [3, 1, 2, 1, 1, 2, 1, 1, 3, 1]
+
+        routes = sweep_routes(locations, [10, 10], demands)
+
+        loads = [sum(demands[node - 1] for node in route[1:]) for route in routes]
+        assert verify_unique_assignments(routes, 10)
+        assert all(load <= 10 for load in loads)
+
+
+def tour_cost(order, cost_matrix):
+    tour = list(order) + [0]
+    return sum(cost_matrix[a][b] for a, b in zip(tour, tour[1:]))
+
+
+class TestFallback:
+    """Test the NumPy fallback solver"""
+
+    def test_nearest_neighbour_takes_cheapest_next_stop(self):
+        cost_matrix = [
+            [0, 5, 1, 9],
+            [5, 0, 4, 2],
+            [1, 4, 0, 3],
+            [9, 2, 3, 0],
+        ]
+
+        assert nearest_neighbour_order(cost_matrix) == [0, 2, 3, 1]
+
+    def test_two_opt_reaches_local_optimum(self):
+        """Test no single reversal improves the result, with asymmetric costs"""
+        rng = np.random.default_rng(3)
+        cost_matrix = rng.integers(0, 100, size=(8, 8))
+        start = list(range(8))
+
+        order = two_opt(start, cost_matrix)
+
+        assert order[0] == 0 and sorted(order) == start
+        best = tour_cost(order, cost_matrix)
+        assert best <= tour_cost(start, cost_matrix)
+        for i in range(1, 8):
+            for j in range(i + 1, 8):
+                reversed_order = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                assert tour_cost(reversed_order, cost_matrix) >= best
+
+    def test_fallback_improves_sweep_plan(self):
+        locations = random_locations(60)
+        capacities = [10, 15, 15, 20, 10]
+        costs = PairwiseCosts(locations)
+
+        routes = fallback_routes(locations, capacities)
+
+        assert verify_unique_assignments(routes, 60)
+        assert all(len(route) - 1 <= cap for route, cap in zip(routes, capacities))
+        assert (calculate_route_cost(routes, costs)
+                < calculate_route_cost(sweep_routes(locations, capacities), costs))
+
+    def test_fallback_without_capacity(self):
+        assert fallback_routes(random_locations(10), [4, 4]) is None
@@ -0,0 +1,154 @@
+import asyncio
+import pytest
+from src.jobs import JobRegistry, JobStatus, JobSupersededError, job_key
+
+
+async def wait_forever(job):
+    await asyncio.Event().wait()
+
+
+class TestJobKey:
+    """Test job key construction"""
+
+    def test_job_key_with_organization_and_shift(self):
+        assert job_key("org1", "shift1") == ("org1", "shift1")
+
+    def test_job_key_without_organization(self):
+        assert job_key(None, "shift1") is None
+
+
+class TestJobRegistry:
+    """Test per-key job supersession"""
+
+    @pytest.mark.asyncio
+    async def test_job_lifecycle(self):
+        """Test a job records status and start time"""
+        registry = JobRegistry()
+
+        async def work(job):
+            assert job.status == JobStatus.RUNNING
+            return 42
+
+        job = registry.submit(job_key("org1", "shift1"), work)
+        assert registry.get(job.id) is job
+        assert job.started_at > 0
+
+        assert await job.task == 42
+        assert job.status == JobStatus.COMPLETED
+        assert job.finished_at >= job.started_at
+        assert registry.get(job.id) is None
+
+    @pytest.mark.asyncio
+    async def test_same_key_supersedes(self):
+        """Test a new job cancels the running job with the same key"""
+        registry = JobRegistry()
+        first = asyncio.create_task(registry.run(job_key("org1", "shift1"), wait_forever))
+        await asyncio.sleep(0)
+
+        async def work(job):
+            return "second"
+
+        assert await registry.run(job_key("org1", "shift1"), work) == "second"
+        with pytest.raises(JobSupersededError):
+            await first
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_concurrently(self):
+        """Test jobs for other organizations are left running"""
+        registry = JobRegistry()
+        first = registry.submit(job_key("org1", "shift1"), wait_forever)
+        second = registry.submit(job_key("org2", "shift1"), wait_forever)
+        third = registry.submit(job_key("org1", "shift2"), wait_forever)
+        await asyncio.sleep(0)
+
+        assert {job.id for job in registry.active_jobs()} == {first.id, second.id, third.id}
+        for job in (first, second, third):
+            assert job.status == JobStatus.RUNNING
+            job.cancel()
+        await asyncio.gather(first.task, second.task, third.task, return_exceptions=True)
+        assert first.status == JobStatus.CANCELLED
+        assert registry.active_jobs() == []
+
+    @pytest.mark.asyncio
+    async def test_unkeyed_jobs_never_supersede(self):
+        """Test requests without an organization do not cancel each other"""
+        registry = JobRegistry()
+        first = registry.submit(None, wait_forever)
+        second = registry.submit(None, wait_forever)
+        await asyncio.sleep(0)
+
+        assert not first.task.done()
+        assert not second.task.done()
+        first.cancel()
+        second.cancel()
+        await asyncio.gather(first.task, second.task, return_exceptions=True)
+
+    @pytest.mark.asyncio
+    async def test_failed_job(self):
+        """Test a raising job is marked failed"""
+        registry = JobRegistry()
+
+        async def work(job):
+            raise ValueError("boom")
+
+        job = registry.submit(None, work)
+        with pytest.raises(ValueError):
+            await job.task
+        assert job.status == JobStatus.FAILED
+
+
+class TestJobRetention:
+    """Test finished jobs stay retrievable when retained"""
+
+    @pytest.mark.asyncio
+    async def test_retained_job_outlives_its_task(self):
+        registry = JobRegistry()
+
+        async def work(job):
+            job.objective = 7
+            return 42
+
+        job = registry.submit(None, work, retain=True)
+        await job.task
+
+        assert registry.get(job.id) is job
+        assert job.objective == 7
+        assert registry.active_jobs() == []
+
+    @pytest.mark.asyncio
+    async def test_retention_evicts_oldest(self):
+        registry = JobRegistry(max_retained=2)
+
+        async def work(job):
+            return None
+
+        submitted = [registry.submit(None, work, retain=True) for _ in range(3)]
+        await asyncio.gather(*(job.task for job in submitted))
+
+        assert registry.get(submitted[0].id) is None
+        assert registry.get(submitted[2].id) is submitted[2]
+
+    @pytest.mark.asyncio
+    async def test_retention_expires(self):
+        registry = JobRegistry(retention_seconds=0)
+
+        async def work(job):
+            return None
+
+        job = registry.submit(None, work, retain=True)
+        await job.task
+
+        assert registry.get(job.id) is None
+
+    @pytest.mark.asyncio
+    async def test_remove_cancels_and_forgets(self):
+        registry = JobRegistry()
+        job = registry.submit(None, wait_forever, retain=True)
+        await asyncio.sleep(0)
+
+        assert registry.remove(job.id) is job
+        await asyncio.gather(job.task, return_exceptions=True)
+
+        assert job.status == JobStatus.CANCELLED
+        assert registry.get(job.id) is None
+        assert registry.remove(job.id) is None
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from src.assign_routes import (
+    build_cost_matrix,
+    calculate_distance_and_bearing_matrix,
+    calculate_route_cost,
+    verify_unique_assignments
+)
+from src.lns import (
+    improve_neighbourhood,
+    improve_routes,
+    route_centroids,
+    select_neighbourhoods
+)
+from conftest import random_locations
+
+
+def scrambled_routes(num_employees, num_shuttles, seed=0):
+    """A deliberately poor plan: employees dealt to shuttles at random"""
+    nodes = np.random.default_rng(seed).permutation(np.arange(1, num_employees + 1))
+    return [[0] + nodes[s::num_shuttles].tolist() for s in range(num_shuttles)]
+
+
+def plan_cost(locations, routes):
+    distance_matrix, bearing_matrix = calculate_distance_and_bearing_matrix(locations)
+    return calculate_route_cost(routes, build_cost_matrix(distance_matrix, bearing_matrix))
+
+
+class TestRouteCost:
+    """Test the route objective"""
+
+    def test_route_cost_includes_return_to_hq(self):
+        cost_matrix = np.array([[0, 1, 2], [3, 0, 4], [5, 6, 0]])
+        assert calculate_route_cost([[0, 1, 2], [0]], cost_matrix) == 1 + 4 + 5
+
+
+class TestNeighbourhoods:
+    """Test selection of adjacent routes"""
+
+    def test_neighbourhoods_are_disjoint_and_adjacent(self):
+        # Two clusters of routes, far apart
+        centroids = np.array([[0, 0], [1, 0], [100, 0], [101, 0], [np.nan, np.nan]])
+        routes = [[0, 1], [0, 2], [0, 3], [0, 4], [0]]
+
+        neighbourhoods = select_neighbourhoods(
+            centroids, routes, 2, routes_per_neighbourhood=2, rng=np.random.default_rng(0)
+        )
+
+        assert len(neighbourhoods) == 2
+        busy = [sorted(s for s in n if s != 4) for n in neighbourhoods]
+        assert sorted(busy) == [[0, 1], [2, 3]]
+        # The idle shuttle joins exactly one neighbourhood
+        assert sum(4 in n for n in neighbourhoods) == 1
+
+    def test_route_centroids_skip_empty_routes(self):
+        centroids = route_centroids([[9.0, 38.7], [9.1, 38.7], [9.0, 38.8]], [[0, 1, 2], [0]])
+        assert not np.isnan(centroids[0]).any()
+        assert np.isnan(centroids[1]).all()
+
+
+class TestImprovement:
+    """Test re-solving neighbourhoods"""
+
+    def test_improve_neighbourhood_never_worsens(self):
+        locations = random_locations(20)
+        routes = scrambled_routes(20, 3)
+
+        improved, saving = improve_neighbourhood(locations, [8, 8, 8], routes, time_limit_seconds=0.5)
+
+        assert saving > 0
+        assert plan_cost(locations, improved) == plan_cost(locations, routes) - saving
+        assert verify_unique_assignments(improved, 20)
+
+    @pytest.mark.asyncio
+    async def test_improve_routes_lowers_cost(self):
+        locations = random_locations(48)
+        shuttle_capacities = [8] * 8
+        routes = scrambled_routes(48, 6) + [[0], [0]]
+
+        reports = []
+        improved = await improve_routes(
+            locations, routes, shuttle_capacities,
+            time_limit_seconds=3, routes_per_neighbourhood=3, parallelism=2, seed=0,
+            on_improvement=lambda plan, saving: reports.append((plan, saving))
+        )
+
+        assert plan_cost(locations, improved) < plan_cost(locations, routes)
+        assert verify_unique_assignments(improved, 48)
+        # Each report carries what its round saved
+        assert reports
+        assert plan_cost(locations, reports[-1][0]) == (
+            plan_cost(locations, routes) - sum(saving for _, saving in reports)
+        )
+        for route, capacity in zip(improved, shuttle_capacities):
+            assert len(route) - 1 <= capacity
+
+    @pytest.mark.asyncio
+    async def test_improve_routes_disabled(self):
+        routes = [[0, 1]]
+        assert await improve_routes(random_locations(1), routes, [1], time_limit_seconds=0) is routes
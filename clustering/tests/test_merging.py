@@ -0,0 +1,107 @@
+import numpy as np
+from src.assign_routes import solve_shuttle_routes, verify_unique_assignments
+from src.assign_routes import project_to_plane
+from src.merging import (
+    expand_routes,
+    group_colocated,
+    group_ids,
+    merge_locations,
+    merge_routes,
+    place_stops
+)
+
+HQ = [9.0222, 38.7468]
+
+
+class TestGrouping:
+    """Test merging of co-located employees"""
+
+    def test_groups_employees_within_radius(self):
+        # Two employees about 3 m apart (from demo_map.py), one far away
+        locations = [HQ, [9.03457270903528, 38.84610715018231],
+                     [9.0322, 38.7568], [9.034572932288537, 38.84613217184764]]
+
+        groups = group_colocated(locations, radius_meters=15)
+
+        assert groups == [[1, 3], [2]]
+
+    def test_radius_zero_disables_merging(self):
+        locations = [HQ, [9.03, 38.75], [9.03, 38.75]]
+
+        assert group_colocated(locations, radius_meters=0) == [[1], [2]]
+
+    def test_group_size_is_capped(self):
+        locations = [HQ] + [[9.03, 38.75]] * 5
+
+        groups = group_colocated(locations, radius_meters=15, max_group_size=2)
+
+        assert groups == [[1, 2], [3, 4], [5]]
+
+    def test_merge_locations_and_demands(self):
+        locations = [HQ, [9.0, 38.0], [9.5, 38.5], [9.0002, 38.0002]]
+
+        merged, demands = merge_locations(locations, [[1, 3], [2]])
+
+        assert merged[0] == HQ
+        assert np.allclose(merged[1], [9.0001, 38.0001])
+        assert demands == [2, 1]
+
+    def test_routes_round_trip(self):
+        groups = [[1, 3], [2], [4, 5]]
+
+        assert expand_routes([[0, 3, 1], [0, 2]], groups) == [[0, 4, 5, 1, 3], [0, 2]]
+        assert merge_routes([[0, 4, 1], [0, 3, 2, 5]], groups) == [[0, 3, 1], [0, 2]]
+
+    def test_group_ids_name_members(self):
+        ids = ["HQ", "a", "b", "c"]
+
+        assert group_ids(ids, [[3, 1], [2]]) == ["HQ", "group:a,c", "b"]
+        assert group_ids(ids, [[3, 1], [2]], prefix="stop") == ["HQ", "stop:a,c", "stop:b"]
+
+
+class TestPlaceStops:
+    """Test greedy placement of shared walking-distance stops"""
+
+    @staticmethod
+    def neighbourhood(num_employees, seed=8):
+        # Employees spread over about 1 km around a point
+        rng = np.random.default_rng(seed)
+        employees = rng.uniform([9.030, 38.760], [9.039, 38.769], size=(num_employees, 2))
+        return [HQ] + employees.tolist()
+
+    def test_every_employee_walks_at_most_the_radius(self):
+        locations = self.neighbourhood(120)
+
+        groups, stops = place_stops(locations, walking_radius_meters=250)
+
+        assert sorted(node for group in groups for node in group) == list(range(1, 121))
+        assert len(stops) == len(groups) < 120 / 3
+        for group, stop in zip(groups, stops):
+            points = project_to_plane([stop] + [locations[node] for node in group])
+            assert np.all(np.linalg.norm(points[1:] - points[0], axis=1) <= 0.25 + 1e-9)
+
+    def test_stop_size_is_capped(self):
+        locations = self.neighbourhood(40)
+
+        groups, _ = place_stops(locations, walking_radius_meters=2000, max_group_size=15)
+
+        assert [len(group) for group in groups] == [15, 15, 10]
+
+
+class TestMergedSolve:
+    """Test solving with merged pickup nodes"""
+
+    def test_solve_keeps_groups_together_within_capacity(self):
+        rng = np.random.default_rng(4)
+        spots = rng.uniform([8.9, 38.6], [9.15, 38.95], size=(8, 2))
+        # Every spot has three employees within a couple of metres
+        employees = np.repeat(spots, 3, axis=0) + rng.uniform(-1e-5, 1e-5, size=(24, 2))
+        locations = [HQ] + employees.tolist()
+
+        routes = solve_shuttle_routes(locations, [7, 7, 7, 7], time_limit_seconds=2)
+
+        assert verify_unique_assignments(routes, 24)
+        assert all(len(route) - 1 <= 7 for route in routes)
+        for spot in range(8):
+            members = {3 * spot + 1, 3 * spot + 2, 3 * spot + 3}
+            assert sum(bool(members & set(route)) for route in routes) == 1
@@ -0,0 +1,67 @@
+import numpy as np
+from src.plan_edits import insert_cheapest, insertion_costs, routes_from_plan
+
+
+class TestRoutesFromPlan:
+    """Test mapping a previous plan onto the current request"""
+
+    def test_maps_ids_to_nodes(self):
+        plan = [
+            {"shuttle_id": "s2", "employees": ["b", "a"]},
+            {"shuttle_id": "s1", "employees": ["c"]},
+        ]
+        routes, unplaced = routes_from_plan(plan, ["a", "b", "c"], ["s1", "s2"], [2, 2])
+        assert routes == [[0, 3], [0, 2, 1]]
+        assert unplaced == []
+
+    def test_drops_removed_employees_and_shuttles(self):
+        plan = [
+            {"shuttle_id": "s1", "employees": ["gone", "a", "a"]},
+            {"shuttle_id": "retired", "employees": ["b"]},
+        ]
+        routes, unplaced = routes_from_plan(plan, ["a", "b", "new"], ["s1", "s2"], [3, 3])
+        assert routes == [[0, 1], [0]]
+        assert unplaced == [2, 3]
+
+    def test_respects_reduced_capacity(self):
+        plan = [{"shuttle_id": "s1", "employees": ["a", "b", "c"]}]
+        routes, unplaced = routes_from_plan(plan, ["a", "b", "c"], ["s1"], [2])
+        assert routes == [[0, 1, 2]]
+        assert unplaced == [3]
+
+
+class TestInsertCheapest:
+    """Test cheapest feasible insertion"""
+
+    def setup_method(self):
+        # Nodes on a line: HQ at 0, then 1, 2, 3 at distances 1, 2, 3
+        positions = np.array([0, 1, 2, 3])
+        self.cost_matrix = np.abs(positions[:, None] - positions[None, :]) * 10
+
+    def test_insertion_costs(self):
+        costs = insertion_costs([0, 1, 3], 2, self.cost_matrix)
+        assert costs.tolist() == [20, 0, 0]
+
+    def test_inserts_between_neighbours(self):
+        routes = insert_cheapest([[0, 1, 3], [0]], [2], self.cost_matrix, [3, 3])
+        assert routes == [[0, 1, 2, 3], [0]]
+
+    def test_skips_full_shuttles(self):
+        routes = insert_cheapest([[0, 1, 3], [0]], [2], self.cost_matrix, [2, 3])
+        assert routes == [[0, 1, 3], [0, 2]]
+
+    def test_returns_none_without_capacity(self):
+        assert insert_cheapest([[0, 1, 3]], [2], self.cost_matrix, [2]) is None
+
+    def test_reports_touched_shuttles(self):
+        touched = set()
+        routes = insert_cheapest([[0, 1], [0], [0, 3]], [2], self.cost_matrix, [1, 3, 3],
+                                 touched=touched)
+        assert routes == [[0, 1], [0], [0, 2, 3]]
+        assert touched == {2}
+
+    def test_respects_node_demands(self):
+        # Node 2 needs three seats and only fits on the second shuttle
+        routes = insert_cheapest([[0, 1], [0]], [2], self.cost_matrix, [3, 3],
+                                 demands=[1, 3, 1])
+        assert routes == [[0, 1], [0, 2]]
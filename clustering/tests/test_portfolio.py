@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from src.assign_routes import SOLVER_STRATEGIES, calculate_cost_matrix
+from src.portfolio import portfolio_strategies, solve_portfolio
+
+LOCATIONS = [[9.0222, 38.7468], [9.0322, 38.7568], [9.0422, 38.7668], [9.0122, 38.7368]]
+
+
+def fake_solve(routes_by_strategy):
+    """Solver stand-in returning fixed routes per strategy."""
+    def solve(locations, shuttle_capacities, cancel_token=None, strategy=None, **kwargs):
+        name = next(name for name, params in SOLVER_STRATEGIES.items() if params is strategy)
+        return routes_by_strategy.get(name)
+    return solve
+
+
+class TestPortfolioStrategies:
+    """Test which strategies a portfolio launches"""
+
+    def test_capped_at_worker_count(self):
+        with patch("src.portfolio.solver_pool.configured_worker_count", return_value=2):
+            assert portfolio_strategies(["savings_gls", "cheapest_arc_tabu", "insertion_gls"]) == [
+                "savings_gls", "cheapest_arc_tabu"
+            ]
+
+    def test_unknown_strategies_are_skipped(self):
+        with patch("src.portfolio.solver_pool.configured_worker_count", return_value=4):
+            assert portfolio_strategies(["nope", "savings_gls"]) == ["savings_gls"]
+
+
+class TestSolvePortfolio:
+    """Test racing strategies and picking the cheapest plan"""
+
+    @pytest.mark.asyncio
+    async def test_cheapest_plan_wins(self):
+        routes_by_strategy = {
+            # Zig-zags between opposite sides of the HQ
+            "cheapest_arc_gls": [[0, 3, 2, 1], [0]],
+            "savings_gls": [[0, 3], [0, 1, 2]],
+            "cheapest_arc_tabu": None,
+        }
+        with patch("src.portfolio.assign_routes.solve_shuttle_routes", fake_solve(routes_by_strategy)):
+            routes, strategy = await solve_portfolio(
+                LOCATIONS, [3, 3], strategies=list(routes_by_strategy)
+            )
+
+        assert strategy == "savings_gls"
+        assert routes == [[0, 3], [0, 1, 2]]
+
+    @pytest.mark.asyncio
+    async def test_no_plan_from_any_strategy(self):
+        with patch("src.portfolio.assign_routes.solve_shuttle_routes", fake_solve({})):
+            assert await solve_portfolio(LOCATIONS, [1], strategies=["savings_gls"]) == (None, None)
+
+    @pytest.mark.asyncio
+    async def test_strategies_share_one_cost_matrix(self):
+        """Test the matrix is built once and every strategy reads the same segment"""
+        seen = []
+
+        def solve(locations, shuttle_capacities, cost_matrix=None, **kwargs):
+            seen.append((cost_matrix.name, cost_matrix.array.copy()))
+            return [[0, 1, 2, 3], [0]]
+
+        with patch("src.portfolio.assign_routes.solve_shuttle_routes", solve):
+            await solve_portfolio(LOCATIONS, [3, 3], strategies=["savings_gls", "cheapest_arc_tabu"])
+
+        assert len({name for name, _ in seen}) == 1
+        for _, matrix in seen:
+            np.testing.assert_array_equal(matrix, calculate_cost_matrix(LOCATIONS))
@@ -0,0 +1,67 @@
+import asyncio
+import pickle
+import pytest
+from src.progress import ProgressBoard, watch
+
+
+class TestProgressBoard:
+    """Test the shared-memory board of improving solutions"""
+
+    def test_read_before_publish(self):
+        board = ProgressBoard(8)
+        try:
+            assert board.read() is None
+        finally:
+            board.release()
+
+    def test_publish_replaces_solution(self):
+        board = ProgressBoard(8)
+        try:
+            board.publish([[0, 2, 1], [0], [0, 3]], 120)
+            board.publish([[0, 1, 2], [0, 3], [0]], 95)
+
+            sequence, routes, objective = board.read()
+            assert routes == [[0, 1, 2], [0, 3], [0]]
+            assert objective == 95
+            assert sequence == 4
+        finally:
+            board.release()
+
+    def test_pickled_board_shares_solution(self):
+        """Test a board unpickled in a worker publishes to the same segment"""
+        board = ProgressBoard(8)
+        attached = pickle.loads(pickle.dumps(board))
+        try:
+            attached.publish([[0, 1], [0, 2]], 42)
+            assert board.read()[1:] == ([[0, 1], [0, 2]], 42)
+        finally:
+            attached.release()
+            board.release()
+
+    def test_oversized_solution_is_ignored(self):
+        board = ProgressBoard(2)
+        try:
+            board.publish([[0, 1, 2, 3]], 10)
+            assert board.read() is None
+        finally:
+            board.release()
+
+    @pytest.mark.asyncio
+    async def test_watch_reports_each_solution_once(self):
+        board = ProgressBoard(4)
+        seen = []
+        watcher = asyncio.create_task(watch(
+            board, lambda routes, objective: seen.append((routes, objective)), 0.01,
+            transform=lambda routes: [route[1:] for route in routes]
+        ))
+        try:
+            board.publish([[0, 2, 1]], 30)
+            await asyncio.sleep(0.05)
+            board.publish([[0, 1, 2]], 20)
+            await asyncio.sleep(0.05)
+        finally:
+            watcher.cancel()
+            await asyncio.gather(watcher, return_exceptions=True)
+            board.release()
+
+        assert seen == [([[2, 1]], 30), ([[1, 2]], 20)]
@@ -0,0 +1,159 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from src.assign_routes import (
+    build_cost_matrix,
+    calculate_cost_matrix,
+    calculate_distance_and_bearing_matrix,
+    calculate_distance_and_bearing_pairs,
+    travel_distance_and_bearing_pairs
+)
+from src.road_network import RoadNetwork, build_network
+
+# A 4 x 4 street grid about 220 m apart; the top row is one-way eastbound
+ORIGIN = (9.0, 38.7)
+STEP = 0.002
+
+
+def grid_node(row, col):
+    return 1 + row * 4 + col
+
+
+def write_osm(path):
+    nodes = [
+        f'<node id="{grid_node(r, c)}" lat="{ORIGIN[0] + r * STEP}" lon="{ORIGIN[1] + c * STEP}"/>'
+        for r in range(4) for c in range(4)
+    ]
+    # A lone driveway nobody can reach, and a footpath that does not count
+    nodes += [f'<node id="100" lat="{ORIGIN[0] + 0.05}" lon="{ORIGIN[1]}"/>',
+              f'<node id="101" lat="{ORIGIN[0] + 0.05}" lon="{ORIGIN[1] + 0.001}"/>']
+
+    def way(way_id, refs, **tags):
+        return (f'<way id="{way_id}">' + "".join(f'<nd ref="{ref}"/>' for ref in refs)
+                + "".join(f'<tag k="{k}" v="{v}"/>' for k, v in tags.items()) + "</way>")
+
+    ways = [way(10 + r, [grid_node(r, c) for c in range(4)], highway="residential",
+                **({"oneway": "yes"} if r == 3 else {})) for r in range(4)]
+    ways += [way(20 + c, [grid_node(r, c) for r in range(4)], highway="residential")
+             for c in range(4)]
+    ways += [way(30, [100, 101], highway="service", oneway="yes"),
+             way(31, [grid_node(0, 0), grid_node(3, 3)], highway="footway")]
+    path.write_text('<?xml version="1.0"?><osm version="0.6">' + "".join(nodes + ways) + "</osm>")
+
+
+def location(row, col):
+    return [ORIGIN[0] + row * STEP, ORIGIN[1] + col * STEP]
+
+
+def segment_km():
+    distance, _ = calculate_distance_and_bearing_pairs(location(0, 0), location(0, 1))
+    return float(distance)
+
+
+@pytest.fixture
+def network(tmp_path):
+    write_osm(tmp_path / "grid.osm")
+    build_network(str(tmp_path / "grid.osm"), str(tmp_path / "network"))
+    return RoadNetwork(str(tmp_path / "network"))
+
+
+class TestBuildNetwork:
+    """Test preprocessing of an OSM extract"""
+
+    def test_keeps_connected_drivable_roads(self, network):
+        assert len(network) == 16
+        # 4 two-way streets north-south, 3 two-way and 1 one-way east-west
+        assert len(network.targets) == 2 * 12 + 2 * 9 + 3
+
+    def test_network_is_memory_mapped(self, network):
+        assert isinstance(network.weights, np.memmap)
+
+
+class TestRoadDistances:
+    """Test shortest road distances between locations"""
+
+    def test_follows_streets(self, network):
+        distance = network.distances(location(0, 0), location(2, 3))
+
+        # Five blocks around the grid instead of the diagonal
+        assert distance == pytest.approx(5 * segment_km(), rel=0.01)
+
+    def test_one_way_street_is_asymmetric(self, network):
+        with_traffic = network.distances(location(3, 0), location(3, 3))
+        against = network.distances(location(3, 3), location(3, 0))
+
+        assert with_traffic == pytest.approx(3 * segment_km(), rel=0.01)
+        assert against == pytest.approx(5 * segment_km(), rel=0.01)
+
+    def test_locations_are_snapped_to_the_nearest_node(self, network):
+        off_road = [location(1, 1)[0] + 0.0003, location(1, 1)[1]]
+
+        distance = network.distances(off_road, location(1, 2))
+
+        walk, _ = calculate_distance_and_bearing_pairs(off_road, location(1, 1))
+        assert distance == pytest.approx(walk + segment_km(), rel=0.01)
+
+    def test_broadcasts_like_haversine_pairs(self, network):
+        points = np.array([location(r, c) for r in range(4) for c in range(4)])
+
+        matrix = network.distances(points[:, np.newaxis], points[np.newaxis, :])
+        arcs = network.distances(points[[0, 5, 15]], points[[15, 5, 0]])
+
+        assert matrix.shape == (16, 16)
+        np.testing.assert_allclose(arcs, matrix[[0, 5, 15], [15, 5, 0]])
+        assert np.all(np.diag(matrix) == 0)
+
+    def test_row_cache_is_bounded_by_bytes(self, network):
+        # Room for two rows of 16 float32 distances
+        with patch("src.road_network.ROAD_NETWORK_CACHE_MB", 2 * 16 * 4 / 2 ** 20):
+            paths = network.shortest_paths(range(10))
+            assert len(network._rows) == 2
+            assert list(network._rows) == [8, 9]
+
+        np.testing.assert_array_equal(paths, network.shortest_paths(range(10)))
+
+    def test_search_blocks_fit_the_budget(self, network):
+        # Room for the search rows of three sources at 12 bytes per node
+        with patch("src.road_network.ROAD_NETWORK_CACHE_MB", 3 * 16 * 12 / 2 ** 20), \
+                patch.object(network, "_search", wraps=network._search) as search:
+            network.shortest_paths(range(10))
+
+        assert [len(call.args[0]) for call in search.call_args_list] == [3, 3, 3, 1]
+
+    def test_snap_cache_is_bounded(self, network):
+        points = [location(r, c) for r in range(4) for c in range(4)]
+        with patch("src.road_network.SNAP_CACHE_ENTRIES", 4):
+            nodes, _ = network.snap(points)
+
+        assert len(network._snapped) == 4
+        assert list(network._snapped) == [tuple(point) for point in points[-4:]]
+        np.testing.assert_array_equal(nodes, network.snap(points)[0])
+
+    def test_shortest_paths_to_targets(self, network):
+        paths = network.shortest_paths([0, 5, 0])
+        targets = [15, 3]
+
+        np.testing.assert_array_equal(network.shortest_paths([0, 5, 0], targets), paths[:, targets])
+
+
+class TestRoadCosts:
+    """Test the solver's matrices switch to road distances"""
+
+    def test_travel_distances_use_the_network(self, network):
+        with patch("src.road_network._network", network):
+            distance, bearing = travel_distance_and_bearing_pairs(location(0, 0), location(2, 3))
+
+        _, straight_bearing = calculate_distance_and_bearing_pairs(location(0, 0), location(2, 3))
+        assert distance == pytest.approx(5 * segment_km(), rel=0.01)
+        assert bearing == straight_bearing
+
+    def test_cost_matrices_agree(self, network):
+        locations = [location(0, 0), location(3, 3), location(1, 2), location(3, 0), location(2, 1)]
+
+        with patch("src.road_network._network", network):
+            costs = calculate_cost_matrix(locations)
+            distance_matrix, bearing_matrix = calculate_distance_and_bearing_matrix(locations)
+
+        np.testing.assert_array_equal(costs, build_cost_matrix(distance_matrix, bearing_matrix))
+        assert not np.array_equal(costs, calculate_cost_matrix(locations))
+        assert distance_matrix[3, 1] < distance_matrix[1, 3]
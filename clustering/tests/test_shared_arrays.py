@@ -0,0 +1,42 @@
+import pickle
+import pytest
+import numpy as np
+from src.shared_arrays import SharedArray
+
+
+class TestSharedArray:
+    """Test the shared-memory array handed to solver workers"""
+
+    def test_copy_of_holds_values(self):
+        shared = SharedArray.copy_of([[9.0, 38.7], [9.1, 38.8]])
+        try:
+            assert shared.shape == (2, 2)
+            assert shared.dtype == np.float64
+            np.testing.assert_array_equal(shared.array, [[9.0, 38.7], [9.1, 38.8]])
+        finally:
+            shared.release()
+
+    def test_pickled_array_shares_memory(self):
+        """Test an array unpickled elsewhere reads and writes the same segment"""
+        shared = SharedArray((3, 3), np.int32)
+        payload = pickle.dumps(shared)
+        attached = pickle.loads(payload)
+        try:
+            attached.array[1, 2] = 42
+            assert shared.array[1, 2] == 42
+            # The segment is sent by name, not by value
+            assert len(payload) < 200
+        finally:
+            attached.release()
+            shared.release()
+
+    def test_release_is_idempotent(self):
+        shared = SharedArray((4,), np.int64)
+        shared.release()
+        shared.release()
+
+    def test_released_array_has_no_view(self):
+        shared = SharedArray((4,), np.int64)
+        shared.release()
+        with pytest.raises(ValueError):
+            shared.array
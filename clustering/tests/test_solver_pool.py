@@ -0,0 +1,143 @@
+import asyncio
+import os
+import time
+import numpy as np
+import pytest
+import httpx
+from unittest.mock import patch
+from src import solver_pool
+from src.main import app
+
+
+@pytest.fixture
+def process_pool(monkeypatch):
+    """Run solves in a real two-worker process pool"""
+    solver_pool.shutdown()
+    monkeypatch.setenv("SOLVER_WORKERS", "2")
+    yield
+    solver_pool.shutdown()
+
+
+class TestConfiguredWorkerCount:
+    """Test solver pool sizing"""
+
+    def test_defaults_to_cpu_count(self, monkeypatch):
+        """Test pool is sized to the number of cores by default"""
+        monkeypatch.delenv("SOLVER_WORKERS", raising=False)
+        assert solver_pool.configured_worker_count() == (os.cpu_count() or 1)
+
+    def test_reads_environment(self, monkeypatch):
+        """Test pool size can be configured"""
+        monkeypatch.setenv("SOLVER_WORKERS", "3")
+        assert solver_pool.configured_worker_count() == 3
+
+    def test_zero_runs_in_process(self, monkeypatch):
+        """Test a size of 0 disables the process pool"""
+        solver_pool.shutdown()
+        monkeypatch.setenv("SOLVER_WORKERS", "0")
+        assert solver_pool.get_executor() is None
+
+
+class TestRunSolver:
+    """Test running solver functions off the event loop"""
+
+    @pytest.mark.asyncio
+    async def test_runs_in_worker_process(self, process_pool):
+        """Test solves run in a separate process"""
+        worker_pid = await solver_pool.run_solver(os.getpid)
+        assert worker_pid != os.getpid()
+
+    @pytest.mark.asyncio
+    async def test_health_responds_during_solve(self):
+        """Test /health is served while a solve is running"""
+        def slow_solve(locations, shuttle_capacities, cancel_token=None, **kwargs):
+            time.sleep(1.0)
+            return [[0, 1], [0, 2]]
+
+        request = {
+            "locations": {
+                "HQ": [9.0222, 38.7468],
+                "employees": [
+                    {"id": "emp1", "latitude": 9.0322, "longitude": 38.7568},
+                    {"id": "emp2", "latitude": 9.0422, "longitude": 38.7668},
+                ]
+            },
+            "shuttles": [
+                {"id": "shuttle1", "capacity": 2},
+                {"id": "shuttle2", "capacity": 1}
+            ]
+        }
+
+        transport = httpx.ASGITransport(app=app)
+        with patch("src.main.assign_routes.solve_shuttle_routes", slow_solve):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                solve = asyncio.create_task(client.post("/clustering", json=request))
+                await asyncio.sleep(0.1)
+
+                started = time.monotonic()
+                health = await client.get("/health")
+                assert health.status_code == 200
+                assert time.monotonic() - started < 0.5
+                assert not solve.done()
+
+                response = await solve
+                assert response.status_code == 200
+
+
+class TestCancellableSolver:
+    """Test that cancelling a solve frees its worker"""
+
+    @pytest.mark.asyncio
+    async def test_cancel_frees_worker(self, monkeypatch):
+        """Test a cancelled solve stops well before its time limit"""
+        from src import assign_routes
+
+        rng = np.random.default_rng(0)
+        locations = [[9.0222, 38.7468]] + (
+            rng.uniform([8.9, 38.6], [9.15, 38.95], size=(150, 2)).tolist()
+        )
+        solver_pool.shutdown()
+        monkeypatch.setenv("SOLVER_WORKERS", "1")
+        try:
+            # Warm up the single worker so process start-up is not timed
+            await solver_pool.run_solver(os.getpid)
+
+            solve = asyncio.create_task(solver_pool.run_cancellable_solver(
+                assign_routes.solve_shuttle_routes,
+                locations,
+                [15] * 11
+            ))
+            await asyncio.sleep(1.0)
+            solve.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await solve
+
+            # The only worker must be free again almost immediately
+            started = time.monotonic()
+            await solver_pool.run_solver(os.getpid)
+            assert time.monotonic() - started < 1.0
+        finally:
+            solver_pool.shutdown()
+
+
+class TestCancelOnDisconnect:
+    """Test client disconnects cancel the running job"""
+
+    @pytest.mark.asyncio
+    async def test_disconnect_cancels_job(self):
+        from src.main import cancel_on_disconnect
+        from src.jobs import JobRegistry, JobCancelledError
+
+        class DisconnectedRequest:
+            async def is_disconnected(self):
+                return True
+
+        async def wait_forever(job):
+            await asyncio.Event().wait()
+
+        registry = JobRegistry()
+        job = registry.submit(None, wait_forever)
+        await cancel_on_disconnect(DisconnectedRequest(), job)
+
+        with pytest.raises(JobCancelledError):
+            await registry.wait(job)
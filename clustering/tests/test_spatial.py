@@ -0,0 +1,55 @@
+import numpy as np
+from src.spatial import GridIndex, nearest_neighbours
+
+
+def brute_force_neighbours(points, k):
+    distances = np.linalg.norm(points[:, None, :] - points[None, :, :], axis=2)
+    np.fill_diagonal(distances, np.inf)
+    return np.sort(distances, axis=1)[:, :k]
+
+
+class TestNearestNeighbours:
+    """Test grid-based k-nearest-neighbour queries"""
+
+    def test_matches_brute_force(self):
+        points = np.random.default_rng(1).uniform(0, 10, size=(300, 2))
+
+        neighbours = nearest_neighbours(points, 8)
+
+        distances = np.linalg.norm(points[:, None, :] - points[neighbours], axis=2)
+        assert neighbours.shape == (300, 8)
+        assert np.allclose(distances, brute_force_neighbours(points, 8))
+
+    def test_clustered_points(self):
+        """Test two dense clusters far apart still find true neighbours"""
+        rng = np.random.default_rng(2)
+        points = np.vstack([rng.uniform(0, 1, (100, 2)), rng.uniform(50, 50.01, (60, 2))])
+
+        neighbours = nearest_neighbours(points, 5)
+
+        distances = np.linalg.norm(points[:, None, :] - points[neighbours], axis=2)
+        assert np.allclose(distances, brute_force_neighbours(points, 5))
+
+    def test_k_capped_and_identical_points(self):
+        neighbours = nearest_neighbours(np.zeros((4, 2)), 10)
+
+        assert neighbours.shape == (4, 3)
+        assert all(i not in row for i, row in enumerate(neighbours))
+
+    def test_within_radius(self):
+        points = np.random.default_rng(3).uniform(0, 10, size=(200, 2))
+        index = GridIndex(points, cell_size=0.7)
+
+        found = index.within(points[5], 1.5)
+
+        expected = np.flatnonzero(np.linalg.norm(points - points[5], axis=1) <= 1.5)
+        assert sorted(found.tolist()) == expected.tolist()
+
+    def test_closest_to_any_point(self):
+        points = np.random.default_rng(4).uniform(0, 10, size=(200, 2))
+        index = GridIndex(points, cell_size=0.5)
+
+        for query in ([3.3, 7.1], [-4.0, 25.0], [10.2, 0.0]):
+            expected = np.argmin(np.linalg.norm(points - query, axis=1))
+            assert index.closest(query) == expected
+        assert GridIndex(np.empty((0, 2)), 1.0).closest([0.0, 0.0]) == -1
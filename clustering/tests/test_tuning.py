@@ -0,0 +1,90 @@
+import json
+import numpy as np
+import pytest
+from src.assign_routes import SOLVER_STRATEGIES
+from src.tuning import (
+    candidate_strategies,
+    load_profile,
+    select_parameters,
+    strategy_name,
+    synthetic_instance,
+    tune,
+    tune_bucket
+)
+
+TUNED = {"first_solution": "SAVINGS", "metaheuristic": "GUIDED_LOCAL_SEARCH", "gls_lambda": 0.1}
+PROFILE = [
+    {"max_employees": 100, "strategy": TUNED, "time_limit_seconds": 1.0},
+    {"max_employees": None, "strategy": SOLVER_STRATEGIES["cheapest_arc_gls"], "time_limit_seconds": 10.0},
+]
+
+
+class TestProfile:
+    """Test loading profiles and picking parameters by size"""
+
+    def test_select_by_size(self):
+        assert select_parameters(100, PROFILE) == (TUNED, 1.0)
+        assert select_parameters(101, PROFILE) == (SOLVER_STRATEGIES["cheapest_arc_gls"], 10.0)
+
+    def test_no_matching_bucket(self):
+        assert select_parameters(500, PROFILE[:1]) == (None, None)
+        assert select_parameters(10, []) == (None, None)
+
+    def test_load_sorts_buckets(self, tmp_path):
+        path = tmp_path / "profile.json"
+        path.write_text(json.dumps({"buckets": PROFILE[::-1]}))
+
+        assert load_profile(str(path)) == PROFILE
+
+    def test_load_rejects_unknown_strategy(self, tmp_path):
+        path = tmp_path / "profile.json"
+        bucket = dict(PROFILE[0], strategy=dict(TUNED, metaheuristic="HILL_CLIMBING"))
+        path.write_text(json.dumps({"buckets": [bucket]}))
+
+        with pytest.raises(ValueError):
+            load_profile(str(path))
+
+    def test_strategy_names(self):
+        assert strategy_name(SOLVER_STRATEGIES["savings_gls"]) == "savings_gls"
+        assert strategy_name(TUNED) == "SAVINGS/GUIDED_LOCAL_SEARCH/0.1"
+
+
+class TestTuner:
+    """Test the offline parameter grid search"""
+
+    def test_candidates_vary_lambda_for_gls_only(self):
+        candidates = candidate_strategies([0.5, 0.9])
+
+        gls = [c for c in candidates if c["metaheuristic"] == "GUIDED_LOCAL_SEARCH"]
+        others = [c for c in candidates if c["metaheuristic"] != "GUIDED_LOCAL_SEARCH"]
+        assert {c["gls_lambda"] for c in gls} == {0.5, 0.9}
+        assert len(others) == len(SOLVER_STRATEGIES) - 3
+        assert len(candidates) == len({tuple(sorted(c.items())) for c in candidates})
+
+    def test_tune_writes_one_bucket_per_populated_size(self):
+        rng = np.random.default_rng(0)
+        instances = [synthetic_instance(8, rng), synthetic_instance(30, rng)]
+
+        profile = tune(instances, buckets=[10, 20], lambdas=[0.5], time_limits=[0.2],
+                       log=lambda message: None)
+
+        buckets = profile["buckets"]
+        assert [bucket["max_employees"] for bucket in buckets] == [10, None]
+        for bucket in buckets:
+            assert bucket["time_limit_seconds"] == 0.2
+            assert bucket["gap"] >= 0
+            assert bucket["strategy"] in candidate_strategies([0.5])
+
+    def test_tune_bucket_skips_unsolvable_instances(self):
+        rng = np.random.default_rng(1)
+        solvable = synthetic_instance(8, rng)
+        short_of_seats = (solvable[0], [2])
+        strategies = candidate_strategies([0.5])[:2]
+        messages = []
+
+        tuned = tune_bucket([solvable, short_of_seats], strategies, [0.2], log=messages.append)
+
+        assert tuned["strategy"] in strategies
+        assert tuned["gap"] >= 0
+        assert any("skipping instance 1" in message for message in messages)
+        assert tune_bucket([short_of_seats], strategies, [0.2], log=messages.append) is None